@@ -1,29 +1,315 @@
-from django.contrib import admin
-from main.models import CustomUser, Project, Profile, Internship, Internship, Course, CourseMaterial, Timetable, InternshipApplication
+import io
 
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.template.response import TemplateResponse
+from django.urls import path, reverse_lazy
+from django.utils.functional import cached_property
+from main.models import CustomUser, Project, Profile, Internship, Internship, Course, CourseMaterial, Timetable, InternshipApplication, OutboxMessage, ChunkedUpload, MediaJob, TransitionLog
+from main.transitions import MACHINES, machines_for, transition
+from .bulk import FORMATS, export_response, import_rows, read_rows, resource_for_model
+from .media import attach_upload
+from .renditions import SOURCE_FIELDS
+from .search import parse_terms, search_query
 
 
-admin.site.register(CustomUser)
-admin.site.register(Project)
-admin.site.register(Profile)
-admin.site.register(Internship)
-admin.site.register(InternshipApplication)
+def estimated_row_count(queryset):
+    """The Postgres planner's row estimate for the queryset's table; None elsewhere or before the first ANALYZE."""
+    db = connections[queryset.db]
+    if db.vendor != 'postgresql':
+        return None
+    with db.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None
 
 
+class EstimatedCountPaginator(Paginator):
+    """Counts an unfiltered changelist from pg_class.reltuples once the table is large, instead of COUNT(*)."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_row_count(queryset)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class BoundedRelatedFieldListFilter(admin.RelatedFieldListFilter):
+    """A related-object filter listing at most ADMIN_FILTER_MAX_CHOICES objects (plus the selected one)."""
+
+    def field_choices(self, field, request, model_admin):
+        related = field.related_model._default_manager.order_by(*(self.field_admin_ordering(field, request, model_admin) or ['pk']))
+        choices = [(obj.pk, str(obj)) for obj in related[:settings.ADMIN_FILTER_MAX_CHOICES]]
+        if self.lookup_val and not any(str(pk) in self.lookup_val for pk, _ in choices):
+            choices += [(obj.pk, str(obj)) for obj in related.filter(pk__in=self.lookup_val)]
+        return choices
+
+
+def known_values_filter(field_name, values):
+    """A list filter over a fixed set of `values`, instead of SELECT DISTINCT over the whole table."""
+
+    class KnownValuesFilter(admin.SimpleListFilter):
+        title = field_name.replace('_', ' ')
+        parameter_name = field_name
+
+        def lookups(self, request, model_admin):
+            return [(value, value) for value in values]
+
+        def queryset(self, request, queryset):
+            return queryset.filter(**{field_name: self.value()}) if self.value() else queryset
+
+    return KnownValuesFilter
+
+
+class BaseAdmin(admin.ModelAdmin):
+    """Changelist defaults for every model here: one count per page, estimated for large tables."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if isinstance(self.list_select_related, (list, tuple)) and 'course' in self.list_select_related:
+            # Joined courses are shown by title; Course.objects already defers this for direct queries.
+            queryset = queryset.defer('course__search_vector')
+        return queryset
+
+
+@admin.register(CustomUser)
+class CustomUserAdmin(BaseAdmin):
+    list_display = ('email', 'internship_id', 'is_intern', 'is_staff', 'date_joined')
+    list_filter = ('is_intern', 'is_staff', 'is_active')
+    search_fields = ('email', '=internship_id')
+    ordering = ('email',)  # unique index; also orders the autocomplete results
+
+
+@admin.register(Profile)
+class ProfileAdmin(BaseAdmin):
+    list_display = ('user', 'first_name', 'last_name', 'updated_at')
+    list_select_related = ('user',)
+    search_fields = ('first_name', 'last_name', 'user__email')
+    autocomplete_fields = ('user',)
+
+
+@admin.register(InternshipApplication)
+class InternshipApplicationAdmin(BaseAdmin):
+    list_display = ('email', 'mode', 'created_at')
+    list_filter = ('mode',)
+    search_fields = ('email',)
+
+
+class BulkImportForm(forms.Form):
+    file = forms.FileField()
+    format = forms.ChoiceField(choices=[(fmt, fmt.upper()) for fmt in FORMATS])
+
+
+class BulkImportExportMixin:
+    """Adds streaming CSV/JSON Lines export actions and an import page to a ModelAdmin."""
+    change_list_template = 'admin/bulk_change_list.html'
+    actions = ['export_csv', 'export_jsonl']
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name=f'{opts.app_label}_{opts.model_name}_import'),
+        ] + super().get_urls()
+
+    @admin.action(description="Export selected rows as CSV")
+    def export_csv(self, request, queryset):
+        return export_response(resource_for_model(self.model), queryset, 'csv')
+
+    @admin.action(description="Export selected rows as JSON Lines")
+    def export_jsonl(self, request, queryset):
+        return export_response(resource_for_model(self.model), queryset, 'jsonl')
+
+    def import_view(self, request):
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            raise PermissionDenied
+        resource = resource_for_model(self.model)
+        form = BulkImportForm(request.POST or None, request.FILES or None)
+        result = None
+        if request.method == 'POST' and form.is_valid():
+            # Read the upload as a text stream; it is never loaded whole.
+            stream = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            result = import_rows(resource, read_rows(stream, form.cleaned_data['format']), user_id=request.user.pk)
+            level = messages.WARNING if result.errors else messages.SUCCESS
+            self.message_user(
+                request, f"Created {result.created}, updated {result.updated}, {len(result.errors)} rows rejected.", level,
+            )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f"Import {self.model._meta.verbose_name_plural}",
+            'form': form,
+            'columns': resource.fields,
+            'result': result,
+        }
+        return TemplateResponse(request, 'admin/bulk_import.html', context)
+
+
+def transition_action(machine, target):
+    @admin.action(description=f"Set {machine.field.replace('_', ' ')} to {target}")
+    def action(modeladmin, request, queryset):
+        result = transition(
+            modeladmin.model, machine.field, queryset.values_list('pk', flat=True), target,
+            user_id=request.user.pk, note="admin action",
+        )
+        level = messages.WARNING if result.skipped else messages.SUCCESS
+        modeladmin.message_user(
+            request,
+            f"Moved {result.moved} to {target}; skipped {len(result.skipped)} not in "
+            f"{' or '.join(machine.sources(target))}.",
+            level,
+        )
+    action.__name__ = f'transition_{machine.field}_{target.lower()}'
+    return action
+
+
+class TransitionActionsMixin:
+    """Bulk actions for every state the model's machines can move a row to, one guarded UPDATE per batch."""
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if self.has_change_permission(request):
+            for machine in machines_for(self.model):
+                for target in machine.targets:
+                    action = transition_action(machine, target)
+                    actions[action.__name__] = (action, action.__name__, action.short_description)
+        return actions
+
+
+@admin.register(Project)
+class ProjectAdmin(TransitionActionsMixin, BaseAdmin):
+    list_display = ('title', 'email', 'status', 'payment_status', 'created_at')
+    list_filter = ('status', 'payment_status')
+    search_fields = ('title', 'email')
+    autocomplete_fields = ('user',)
+
+
+@admin.register(Internship)
+class InternshipAdmin(TransitionActionsMixin, BulkImportExportMixin, BaseAdmin):
+    list_display = ('intern', 'course', 'status', 'starting_date', 'completion_date')
+    list_filter = ('status', ('course', BoundedRelatedFieldListFilter))
+    # __str__ reads intern.email and course.title
+    list_select_related = ('intern', 'course')
+    search_fields = ('intern__email', 'course__title')
+    autocomplete_fields = ('intern', 'course')
+
+
+@admin.register(TransitionLog)
+class TransitionLogAdmin(BaseAdmin):
+    list_display = ('model', 'object_id', 'field', 'source', 'target', 'user', 'created_at')
+    list_filter = (
+        known_values_filter('model', sorted({machine.model_label for machine in MACHINES.values()})),
+        known_values_filter('field', sorted({machine.field for machine in MACHINES.values()})),
+        known_values_filter('target', sorted({target for machine in MACHINES.values() for target in machine.targets})),
+    )
+    list_select_related = ('user',)
+    search_fields = ('=object_id', '=batch')
+
+    # Append-only audit trail.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(BaseAdmin):
+    list_display = ('subject', 'recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('recipient', 'idempotency_key')
+    readonly_fields = ('idempotency_key', 'attempts', 'last_error', 'created_at', 'sent_at')
+
+@admin.register(MediaJob)
+class MediaJobAdmin(BaseAdmin):
+    list_display = ('model', 'object_id', 'source', 'status', 'attempts', 'next_attempt_at', 'finished_at')
+    list_filter = ('status', known_values_filter('model', sorted(model._meta.label for model in SOURCE_FIELDS)))
+    search_fields = ('source', 'idempotency_key')
+    readonly_fields = ('idempotency_key', 'attempts', 'last_error', 'created_at', 'finished_at')
+
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(BulkImportExportMixin, BaseAdmin):
     list_display = ('title', 'category', 'created_at')
     list_filter = ('category',)
     search_fields = ('title', 'description')
 
+    def get_search_results(self, request, queryset, search_term):
+        # The GIN-indexed vector instead of ILIKE '%term%' scans; other databases keep search_fields.
+        terms = parse_terms(search_term)
+        if connections[queryset.db].vendor == 'postgresql' and terms:
+            return queryset.filter(search_vector=search_query(terms)), False
+        return super().get_search_results(request, queryset, search_term)
+
+class CourseMaterialAdminForm(forms.ModelForm):
+    # Set by api/js/chunked_upload.js once a large file has been uploaded in chunks.
+    upload = forms.ModelChoiceField(
+        queryset=ChunkedUpload.objects.none(),
+        required=False,
+        widget=forms.HiddenInput(attrs={'data-upload-url': reverse_lazy('chunked-upload')}),
+    )
+
+    class Meta:
+        model = CourseMaterial
+        fields = '__all__'
+
+    class Media:
+        js = ('api/js/chunked_upload.js',)
+
+    uploader = None  # set per request by CourseMaterialAdmin.get_form
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['file'].required = False
+        if self.uploader is not None:
+            # Only the staff member's own finished uploads can be attached.
+            self.fields['upload'].queryset = ChunkedUpload.objects.filter(status='complete', user=self.uploader)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload = cleaned_data.get('upload')
+        if upload is not None:
+            # Lets model validation check the extension; the file is moved into place on save.
+            self.instance.file.name = upload.filename
+        elif not cleaned_data.get('file') and not self.instance.file:
+            self.add_error('file', forms.Field.default_error_messages['required'])
+        return cleaned_data
+
+
 @admin.register(CourseMaterial)
-class CourseMaterialAdmin(admin.ModelAdmin):
+class CourseMaterialAdmin(BulkImportExportMixin, BaseAdmin):
+    form = CourseMaterialAdminForm
     list_display = ('title', 'material_type', 'course', 'uploaded_at')
-    list_filter = ('material_type', 'course')
+    list_filter = ('material_type', ('course', BoundedRelatedFieldListFilter))
+    list_select_related = ('course',)
     search_fields = ('title', 'course__title')
+    autocomplete_fields = ('course',)
+
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        return type(form.__name__, (form,), {'uploader': request.user})
+
+    def save_model(self, request, obj, form, change):
+        upload = form.cleaned_data.get('upload')
+        if upload is not None:
+            attach_upload(upload, obj.file)
+        super().save_model(request, obj, form, change)
 
 @admin.register(Timetable)
-class TimetableAdmin(admin.ModelAdmin):
+class TimetableAdmin(BulkImportExportMixin, BaseAdmin):
     list_display = ('title', 'course', 'start_time', 'end_time', 'is_live_session')
-    list_filter = ('course', 'is_live_session')
-    search_fields = ('title', 'course__title')
\ No newline at end of file
+    list_filter = (('course', BoundedRelatedFieldListFilter), 'is_live_session')
+    list_select_related = ('course',)
+    search_fields = ('title', 'course__title')
+    autocomplete_fields = ('course',)
\ No newline at end of file
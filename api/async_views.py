@@ -0,0 +1,148 @@
+"""
+Async versions of the polled read endpoints, routed when API_ASYNC_VIEWS is on.
+
+They are meant for the ASGI entry point (`src.asgi`) under uvicorn, where a
+slow client holds a coroutine instead of a worker thread. The dashboard
+read model row, conditional GET validators and the profile lookup use the
+async ORM. Cursor pagination and the serializers are synchronous DRF code,
+so pages are built through `sync_to_async`. ProfileView builds its internships and projects on separate
+threads, each with its own connection, so the two queries run concurrently.
+
+Responses are negotiated over the same renderers and checked against the
+same throttles as the sync views, so JSON and MessagePack clients can use
+either route. The browsable API is the exception: it renders through a full
+APIView, so these views do not offer it.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from main.models import Internship, InternDashboard, Profile, Project
+from .authentication import StatelessJWTAuthentication
+from .cache import get_timetable_page
+from .conditional import async_conditional_get, respond_conditionally
+from .dashboard import UNBUILT, dashboard_page, dashboard_state, get_dashboard
+from .metrics import timed_render
+from .pagination import paginate, CreatedAtCursorPagination, ProjectsCursorPagination
+from .serializers import InternshipSerializer, ProfileSerializer, ProjectSerializer
+from .views import profile_querysets, timetable_querysets
+
+
+async def in_own_thread(func, *args):
+    """Run synchronous ORM code on a pool thread, releasing its connection afterwards."""
+    def run():
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+    return await sync_to_async(run, thread_sensitive=False)()
+
+
+class AsyncAPIView(View):
+    """The parts of APIView these endpoints need: JWT authentication, throttling and content negotiation."""
+    authentication_class = StatelessJWTAuthentication
+    renderer_classes = [
+        renderer for renderer in api_settings.DEFAULT_RENDERER_CLASSES if not issubclass(renderer, BrowsableAPIRenderer)
+    ]
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.renderer = None
+        authenticator = self.authentication_class()
+        try:
+            self.renderer = DefaultContentNegotiation().select_renderer(
+                Request(request), [renderer() for renderer in self.renderer_classes],
+            )[0]
+            result = await sync_to_async(authenticator.authenticate)(request)
+            if result is None:
+                raise exceptions.NotAuthenticated()
+            request.user, request.auth = result
+            await self.check_throttles(request)
+        except exceptions.APIException as exc:
+            response = self.respond(
+                exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}, exc.status_code,
+            )
+            if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            if getattr(exc, 'wait', None):
+                response['Retry-After'] = str(exc.wait)
+            return response
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def check_throttles(self, request):
+        drf_request = self.drf_request(request)
+        waits = []
+        for throttle in [throttle_class() for throttle_class in self.throttle_classes]:
+            if not await sync_to_async(throttle.allow_request)(drf_request, self):
+                waits.append(throttle.wait())
+        if waits:
+            raise exceptions.Throttled(max((wait for wait in waits if wait is not None), default=None))
+
+    def drf_request(self, request):
+        """Wrap `request` for the paginators and serializers, which read `query_params`."""
+        drf_request = Request(request)
+        drf_request.user = request.user
+        return drf_request
+
+    def respond(self, data, status_code=status.HTTP_200_OK):
+        # A request that failed negotiation is answered in the default format, as DRF does.
+        renderer = self.renderer or self.renderer_classes[0]()
+        with timed_render():
+            content = renderer.render(data)
+        content_type = f'{renderer.media_type}; charset={renderer.charset}' if renderer.charset else renderer.media_type
+        response = HttpResponse(content, content_type=content_type, status=status_code)
+        if len(self.renderer_classes) > 1:
+            patch_vary_headers(response, ('Accept',))
+        return response
+
+
+class AsyncDashboardView(AsyncAPIView):
+    async def get(self, request):
+        user_id = request.user.pk
+        dashboard = await InternDashboard.objects.filter(intern_id=user_id).afirst()
+        if dashboard is None or dashboard.version == UNBUILT:
+            dashboard = await sync_to_async(get_dashboard)(user_id)
+        drf_request = self.drf_request(request)
+        return respond_conditionally(
+            request,
+            dashboard_state(dashboard),
+            lambda: self.respond(dashboard_page(drf_request, dashboard, CreatedAtCursorPagination)),
+        )
+
+
+class AsyncProfileView(AsyncAPIView):
+    @async_conditional_get(profile_querysets)
+    async def get(self, request):
+        user_id = request.user.pk
+        drf_request = self.drf_request(request)
+        profile, created = await Profile.objects.aget_or_create(user_id=user_id)
+
+        def internships():
+            queryset = Internship.objects.filter(intern_id=user_id)
+            return InternshipSerializer(queryset, many=True, context={'request': drf_request}).data
+
+        def projects():
+            queryset = Project.objects.filter(user_id=user_id)
+            return paginate(drf_request, self, queryset, ProjectSerializer, ProjectsCursorPagination)
+
+        profile_data = ProfileSerializer(profile).data
+        profile_data['internships'], profile_data['projects'] = await asyncio.gather(
+            in_own_thread(internships), in_own_thread(projects),
+        )
+        return self.respond(profile_data)
+
+
+class AsyncCourseTimetableView(AsyncAPIView):
+    @async_conditional_get(timetable_querysets)
+    async def get(self, request, course_id):
+        data = await sync_to_async(get_timetable_page)(course_id, self.drf_request(request), self)
+        return self.respond(data)
@@ -0,0 +1,135 @@
+"""
+JWT authentication that trusts the access token instead of loading the user.
+
+`CustomTokenObtainPairSerializer.get_token` puts `is_intern` and
+`internship_id` into the token, which covers what most views need. Other
+attributes load the `CustomUser` row once, on first access.
+"""
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from main.hashers import check_password_hash, hash_password
+
+TOKEN_CLAIMS = ('is_intern', 'internship_id')
+
+
+class TokenBackedUser(TokenUser):
+    """A user built from token claims; falls back to the database row for anything else."""
+
+    @cached_property
+    def instance(self):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.get(pk=self.id)
+        except UserModel.DoesNotExist:
+            raise AuthenticationFailed("User not found", code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code='user_inactive')
+        return user
+
+    @property
+    def is_intern(self):
+        return self.token.get('is_intern', False)
+
+    @property
+    def internship_id(self):
+        return self.token.get('internship_id')
+
+    # Permission checks must reflect the database, not defaults baked into TokenUser.
+    is_staff = property(lambda self: self.instance.is_staff)
+    is_superuser = property(lambda self: self.instance.is_superuser)
+    username = property(lambda self: self.instance.get_username())
+    groups = property(lambda self: self.instance.groups)
+    user_permissions = property(lambda self: self.instance.user_permissions)
+
+    def get_group_permissions(self, obj=None):
+        return self.instance.get_group_permissions(obj)
+
+    def get_all_permissions(self, obj=None):
+        return self.instance.get_all_permissions(obj)
+
+    def has_perm(self, perm, obj=None):
+        return self.instance.has_perm(perm, obj)
+
+    def has_perms(self, perm_list, obj=None):
+        return self.instance.has_perms(perm_list, obj)
+
+    def has_module_perms(self, module):
+        return self.instance.has_module_perms(module)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_') or attr in ('token', 'instance'):
+            raise AttributeError(attr)
+        return getattr(self.instance, attr)
+
+
+_blacklist_lock = threading.Lock()
+_blacklist_checks = {}  # jti -> (checked_at, blacklisted)
+
+
+def is_blacklisted(jti):
+    """`BlacklistedToken` lookup, remembered in-process for JWT_BLACKLIST_CACHE_TTL seconds."""
+    if not apps.is_installed('rest_framework_simplejwt.token_blacklist'):
+        return False
+
+    now = time.monotonic()
+    ttl = settings.JWT_BLACKLIST_CACHE_TTL
+    checked = _blacklist_checks.get(jti)
+    if checked is not None and now - checked[0] < ttl:
+        return checked[1]
+
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+    blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+    with _blacklist_lock:
+        if len(_blacklist_checks) >= settings.JWT_BLACKLIST_CACHE_SIZE:
+            for key in [key for key, (at, _) in _blacklist_checks.items() if now - at >= ttl]:
+                del _blacklist_checks[key]
+            if len(_blacklist_checks) >= settings.JWT_BLACKLIST_CACHE_SIZE:
+                _blacklist_checks.clear()
+        _blacklist_checks[jti] = (now, blacklisted)
+    return blacklisted
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        if is_blacklisted(validated_token[api_settings.JTI_CLAIM]):
+            raise InvalidToken("Token is blacklisted")
+        return TokenBackedUser(validated_token)
+
+
+class PooledHashingBackend(ModelBackend):
+    """`ModelBackend` that verifies passwords on the hashing pool and upgrades stale hashes."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash once anyway so unknown emails take as long as wrong passwords.
+            hash_password(password)
+            return None
+        valid, must_update = check_password_hash(password, user.password)
+        if not valid or not self.user_can_authenticate(user):
+            return None
+        if must_update:
+            user.password = hash_password(password)
+            user.save(update_fields=['password'])
+        return user
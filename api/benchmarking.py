@@ -0,0 +1,76 @@
+"""Helpers shared by the bench_* management commands."""
+import json
+import statistics
+import threading
+import time
+
+from django.db import connections
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values` (which need not be sorted)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies):
+    """Latency summary in milliseconds."""
+    return {
+        'count': len(latencies),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(max(latencies, default=0) * 1000, 2),
+    }
+
+
+def run_concurrently(func, items, concurrency):
+    """
+    Call `func(item)` for every item from `concurrency` threads.
+
+    Returns (elapsed_seconds, latencies, errors), where errors counts calls
+    that raised or returned False. Each thread closes its own database
+    connections when it is done.
+    """
+    chunks = [items[i::concurrency] for i in range(concurrency)]
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        local_latencies, local_errors = [], 0
+        try:
+            for item in chunk:
+                started = time.perf_counter()
+                try:
+                    ok = func(item) is not False
+                except Exception:
+                    ok = False
+                local_latencies.append(time.perf_counter() - started)
+                local_errors += not ok
+        finally:
+            connections.close_all()
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks if chunk]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, sum(errors)
+
+
+def write_report(report, path, stdout):
+    """Write `report` as JSON to `path`, or to the command's stdout when no path is given."""
+    payload = json.dumps(report, indent=2)
+    if path:
+        with open(path, 'w', encoding='utf-8') as fh:
+            fh.write(payload + '\n')
+    else:
+        stdout.write(payload)
@@ -0,0 +1,266 @@
+"""
+Streaming bulk import/export for the catalogue and internships.
+
+Imports read CSV or JSON Lines one row at a time, validate rows in batches
+(foreign keys and existing ids are resolved with one query per batch) and
+write each batch with bulk_create/bulk_update in its own transaction.
+Status changes on existing rows are checked against the state machines in
+`main.transitions` and applied through `transition`, so they are guarded,
+logged and announced like every other status change.
+Exports walk the table with ``.iterator()`` so memory stays flat.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.dispatch import Signal
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from main.models import Course, CourseMaterial, Timetable, Internship
+from main.transitions import machines_for, transition
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+# Sent after each imported batch is committed; bulk writes skip post_save.
+bulk_written = Signal()  # sender=model, instances=[...]
+# Sent inside each batch's transaction, for receivers that must move with the rows.
+bulk_saved = Signal()  # sender=model, created=[...], updated=[...], previous={pk: row before the update}
+
+
+class Resource:
+    """How one model maps to flat rows. `lookups` names the natural key used for a foreign key column."""
+
+    def __init__(self, model, fields, lookups=None):
+        self.model = model
+        self.fields = fields
+        self.lookups = lookups or {}
+        self.foreign_keys = [
+            name for name in fields if name != 'id' and self.model._meta.get_field(name).is_relation
+        ]
+
+    @property
+    def export_columns(self):
+        return [f'{name}__{self.lookups[name]}' if name in self.lookups else name for name in self.fields]
+
+    @property
+    def update_fields(self):
+        names = [name for name in self.fields if name != 'id']
+        if any(f.name == 'updated_at' for f in self.model._meta.fields):
+            names.append('updated_at')  # bulk_update() does not run auto_now
+        return names
+
+    def key_field(self, name):
+        """The field a foreign key column is matched against."""
+        related = self.model._meta.get_field(name).related_model
+        lookup = self.lookups.get(name, 'pk')
+        return related._meta.pk if lookup == 'pk' else related._meta.get_field(lookup)
+
+    def resolve_foreign_keys(self, rows):
+        resolved = {}
+        for name in self.foreign_keys:
+            related = self.model._meta.get_field(name).related_model
+            lookup = self.lookups.get(name, 'pk')
+            # Keys that do not parse are left out of the query and reported by build().
+            values = {_coerce(self.key_field(name), row.get(name)) for _, row in rows} - {None}
+            matches = related._default_manager.filter(**{f'{lookup}__in': values}).values_list(lookup, 'pk')
+            resolved[name] = {str(key): pk for key, pk in matches}
+        return resolved
+
+    @property
+    def machines(self):
+        return [machine for machine in machines_for(self.model) if machine.field in self.fields]
+
+    def build(self, rows):
+        """
+        Validate a batch; returns ``(to_create, to_update, errors, lines)``
+        where `lines` maps each updated pk to its line. Updated instances carry
+        the stored states in ``_loaded_states``, so ``clean()`` rejects moves
+        along undeclared edges.
+        """
+        errors = [(line, {NON_FIELD_ERRORS: row.messages}) for line, row in rows if isinstance(row, ValidationError)]
+        rows = [(line, row) for line, row in rows if not isinstance(row, ValidationError)]
+        pk_field = self.model._meta.pk
+        resolved = self.resolve_foreign_keys(rows)
+        ids = {_coerce(pk_field, row.get('id')) for _, row in rows} - {None}
+        states = [machine.field for machine in self.machines]
+        existing = {
+            pk: dict(zip(states, values))
+            for pk, *values in self.model._default_manager.filter(pk__in=ids).values_list('pk', *states)
+        }
+
+        to_create, to_update, lines = [], [], {}
+        for line, row in rows:
+            problems = {}
+            values = {name: row.get(name) for name in self.fields if name not in self.foreign_keys and name != 'id'}
+            for name in self.foreign_keys:
+                key = row.get(name)
+                parsed = _coerce(self.key_field(name), key)
+                if key in (None, ''):
+                    problems[name] = ["This field is required."]
+                elif parsed is None or str(parsed) not in resolved[name]:
+                    problems[name] = [f"No {name} matches {key!r}."]
+                else:
+                    values[f'{name}_id'] = resolved[name][str(parsed)]
+
+            row_id = row.get('id')
+            pk = _coerce(pk_field, row_id)
+            if row_id not in (None, '') and pk is None:
+                problems['id'] = [f"{row_id!r} is not a valid id."]
+            elif pk is not None and pk not in existing:
+                problems['id'] = [f"No {self.model._meta.verbose_name} with id {row_id}."]
+
+            instance = self.model(**{k: (None if v == '' else v) for k, v in values.items()})
+            instance.pk = pk
+            if pk in existing:
+                instance._loaded_states = existing[pk]
+            try:
+                # Model.clean() only runs once every field has parsed cleanly.
+                instance.clean_fields(exclude=self.foreign_keys)
+                instance.clean()
+            except ValidationError as e:
+                found = e.message_dict if hasattr(e, 'error_dict') else {NON_FIELD_ERRORS: e.messages}
+                for name, messages in found.items():
+                    problems.setdefault(name, []).extend(messages)
+
+            if problems:
+                errors.append((line, problems))
+            elif instance.pk is None:
+                to_create.append(instance)
+            else:
+                instance.updated_at = timezone.now()
+                to_update.append(instance)
+                lines[instance.pk] = line
+        errors.sort(key=lambda error: error[0])
+        return to_create, to_update, errors, lines
+
+
+def _coerce(field, value):
+    """`value` as `field` stores it, or None if it is empty or does not parse."""
+    if value in (None, ''):
+        return None
+    try:
+        return field.to_python(value)
+    except (TypeError, ValidationError):
+        return None
+
+
+RESOURCES = {
+    'courses': Resource(Course, ['id', 'title', 'description', 'category', 'language', 'framework']),
+    'materials': Resource(CourseMaterial, ['id', 'course', 'title', 'material_type', 'file']),
+    'timetables': Resource(Timetable, ['id', 'course', 'title', 'start_time', 'end_time', 'is_live_session', 'location']),
+    'internships': Resource(
+        Internship,
+        ['id', 'intern', 'course', 'starting_date', 'completion_date', 'status'],
+        lookups={'intern': 'email'},
+    ),
+}
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    errors: list = field(default_factory=list)  # [(line, {field: [messages]})]
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row)`` from a text stream without reading it all."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            # A malformed line is passed on as its error so the import reports it with the rest.
+            try:
+                row = json.loads(text)
+            except json.JSONDecodeError as e:
+                row = ValidationError(f"Invalid JSON: {e.msg}.")
+            if not isinstance(row, (dict, ValidationError)):
+                row = ValidationError("Each line must be a JSON object.")
+            yield line, row
+    else:
+        raise ValueError(f"Unsupported format {fmt!r}, expected one of {FORMATS}")
+
+
+def import_rows(resource, rows, batch_size=500, user_id=None):
+    """Import `rows`; status changes are logged as made by `user_id`."""
+    result = ImportResult()
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        to_create, to_update, errors, lines = resource.build(batch)
+        result.errors.extend(errors)
+        with transaction.atomic():
+            manager = resource.model._default_manager
+            previous = {}
+            if to_update and (resource.machines or bulk_saved.has_listeners(resource.model)):
+                previous = manager.select_for_update().in_bulk([instance.pk for instance in to_update])
+            # The bulk write keeps each stored state; `transition` then moves the rows that change.
+            moves = {}
+            for instance in to_update:
+                for machine in resource.machines:
+                    target = getattr(instance, machine.field)
+                    source = getattr(previous[instance.pk], machine.field)
+                    if target != source:
+                        moves.setdefault((machine.field, target), []).append(instance)
+                        setattr(instance, machine.field, source)
+            created = manager.bulk_create(to_create)
+            manager.bulk_update(to_update, resource.update_fields)
+            bulk_saved.send(sender=resource.model, created=created, updated=to_update, previous=previous)
+            for (field, target), instances in moves.items():
+                moved = transition(
+                    resource.model, field, [instance.pk for instance in instances], target, user_id=user_id, note="imported",
+                )
+                for instance in instances:
+                    if instance.pk in moved.skipped:
+                        # Changed by someone else since the batch was validated.
+                        result.errors.append((lines[instance.pk], {field: [f"Cannot move from {instance.__dict__[field]} to {target}."]}))
+                    else:
+                        setattr(instance, field, target)
+            transaction.on_commit(
+                lambda instances=created + to_update: bulk_written.send(sender=resource.model, instances=instances)
+            )
+        result.created += len(to_create)
+        result.updated += len(to_update)
+    return result
+
+
+class Echo:
+    """File-like object whose write() just hands the value back, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_export(resource, queryset, fmt, chunk_size=2000):
+    columns = resource.export_columns
+    rows = queryset.order_by('pk').values_list(*columns).iterator(chunk_size=chunk_size)
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(resource.fields)
+        for row in rows:
+            yield writer.writerow(row)
+    elif fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps(dict(zip(resource.fields, row)), cls=DjangoJSONEncoder) + '\n'
+    else:
+        raise ValueError(f"Unsupported format {fmt!r}, expected one of {FORMATS}")
+
+
+def export_response(resource, queryset, fmt):
+    response = StreamingHttpResponse(stream_export(resource, queryset, fmt), content_type=CONTENT_TYPES[fmt])
+    filename = f'{resource.model._meta.model_name}s.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def resource_for_model(model):
+    return next(resource for resource in RESOURCES.values() if resource.model is model)
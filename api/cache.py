@@ -0,0 +1,139 @@
+"""
+Versioned read-through cache for the course catalogue.
+
+Serialized course and timetable payloads are kept in the per-process
+``default`` cache and in the ``shared`` cache. Every course has a version
+number that only lives in the shared cache; payload keys embed it, so
+bumping the version after a write makes the old entries unreachable for
+every worker at once.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _local():
+    return caches['default']
+
+
+def _shared():
+    return caches['shared']
+
+
+def _version_key(course_id):
+    return f'catalogue:course:{course_id}:version'
+
+
+def _new_version():
+    # Seeded from the clock so a version evicted from the shared cache never
+    # restarts at a number that old payloads were stored under.
+    return time.time_ns() // 1000
+
+
+def _record(hits, misses):
+    with _stats_lock:
+        _stats['hits'] += hits
+        _stats['misses'] += misses
+
+
+def cache_stats():
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats['hits'] = _stats['misses'] = 0
+
+
+def get_course_versions(course_ids):
+    keys = {_version_key(course_id): course_id for course_id in course_ids}
+    versions = {keys[key]: value for key, value in _shared().get_many(keys).items()}
+    missing = [key for key, course_id in keys.items() if course_id not in versions]
+    if missing:
+        for key in missing:
+            _shared().add(key, _new_version(), None)
+        # Re-read so racing workers all settle on whichever value won the add().
+        versions.update({keys[key]: value for key, value in _shared().get_many(missing).items()})
+    return versions
+
+
+def bump_course_version(course_id):
+    try:
+        _shared().incr(_version_key(course_id))
+    except ValueError:
+        _shared().set(_version_key(course_id), _new_version(), None)
+
+
+def invalidate_course(course_id):
+    """Bump the course version once the current transaction commits."""
+    # Bumping before commit would let a reader cache pre-commit rows under the new version.
+    transaction.on_commit(lambda: bump_course_version(course_id))
+
+
+def read_through(kind, course_ids, loader):
+    """
+    Return ``{course_id: payload}`` for ``kind``, calling ``loader`` with the
+    ids that neither cache tier holds for the current course version.
+    """
+    course_ids = list(dict.fromkeys(course_ids))
+    if not course_ids:
+        return {}
+
+    timeout = settings.CATALOGUE_CACHE_TIMEOUT
+    versions = get_course_versions(course_ids)
+    keys = {f'catalogue:course:{course_id}:v{versions[course_id]}:{kind}': course_id for course_id in course_ids}
+
+    found = _local().get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        from_shared = _shared().get_many(missing)
+        if from_shared:
+            _local().set_many(from_shared, timeout)
+            found.update(from_shared)
+
+    missing_ids = [course_id for key, course_id in keys.items() if key not in found]
+    _record(hits=len(keys) - len(missing_ids), misses=len(missing_ids))
+    if missing_ids:
+        loaded = loader(missing_ids)
+        fresh = {key: loaded[course_id] for key, course_id in keys.items() if key not in found and course_id in loaded}
+        _local().set_many(fresh, timeout)
+        _shared().set_many(fresh, timeout)
+        found.update(fresh)
+
+    return {keys[key]: payload for key, payload in found.items()}
+
+
+def _load_courses(course_ids):
+    from main.models import Course
+    from api.serializers import CourseSerializer
+
+    queryset = CourseSerializer.setup_eager_loading(Course.objects.filter(pk__in=course_ids))
+    return {course.pk: dict(CourseSerializer(course).data) for course in queryset}
+
+
+def get_course_payloads(course_ids):
+    return read_through('course', course_ids, _load_courses)
+
+
+def get_timetable_page(course_id, request, view):
+    """Paginated CourseTimetableView payload; every distinct page URL is cached separately."""
+    from main.models import Timetable
+    from api.pagination import paginate, StartTimeCursorPagination
+    from api.serializers import TimetableSerializer
+
+    def load(course_ids):
+        queryset = Timetable.objects.filter(course_id=course_id)
+        return {course_id: paginate(request, view, queryset, TimetableSerializer, StartTimeCursorPagination)}
+
+    page = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return read_through(f'timetable:{page}', [course_id], load)[course_id]
@@ -0,0 +1,102 @@
+"""
+Conditional GET support for the polled read endpoints.
+
+Validators are computed from cheap aggregates (row count and latest
+``updated_at``) of the querysets that feed a response, so an unchanged
+resource is answered with 304 before anything is serialized.
+
+Only an ETag is sent. A Last-Modified date taken from ``max(updated_at)``
+would not move when a row is deleted or when a derived field changes with
+the date, so ``If-Modified-Since`` would answer 304 for a changed resource.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import CharField, DateTimeField, F, Func, IntegerField, Value
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+
+def _state_query(name, queryset):
+    # COUNT/MAX written as plain functions so Django adds no GROUP BY: the
+    # query always yields exactly one row, even when nothing matches.
+    return queryset.order_by().values(
+        name=Value(name, output_field=CharField()),
+        count=Func(F('pk'), function='COUNT', output_field=IntegerField()),
+        updated=Func(F('updated_at'), function='MAX', output_field=DateTimeField()),
+    )
+
+
+def collect_state(**querysets):
+    """Return ``{name: (count, latest updated_at)}`` for every queryset in one round-trip."""
+    queries = [_state_query(name, queryset) for name, queryset in querysets.items()]
+    combined = queries[0].union(*queries[1:], all=True) if len(queries) > 1 else queries[0]
+    return {row['name']: (row['count'], row['updated']) for row in combined}
+
+
+async def acollect_state(**querysets):
+    """Async `collect_state`, for the ASGI views."""
+    queries = [_state_query(name, queryset) for name, queryset in querysets.items()]
+    combined = queries[0].union(*queries[1:], all=True) if len(queries) > 1 else queries[0]
+    return {row['name']: (row['count'], row['updated']) async for row in combined}
+
+
+def _etag(request, state):
+    # The date is part of the fingerprint: derived fields such as an
+    # internship's effective status change at midnight without a write.
+    fingerprint = repr((request.user.pk, request.get_full_path(), timezone.localdate(), sorted(state.items())))
+    return quote_etag(hashlib.sha1(fingerprint.encode()).hexdigest())
+
+
+def _finalize(response, etag):
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def respond_conditionally(request, state, build_response):
+    """
+    Answer with 304 when the validators derived from `state` match the
+    request, otherwise with ``build_response()``. `state` maps names to
+    ``(counter, last updated_at)`` pairs, as `collect_state` returns.
+    """
+    etag = _etag(request, state)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build_response()
+    return _finalize(response, etag)
+
+
+def conditional_get(get_querysets):
+    """
+    Decorate an ``APIView.get`` so a matching ``If-None-Match`` header
+    short-circuits with 304.
+
+    ``get_querysets(request, *args, **kwargs)`` returns the named querysets
+    whose aggregates describe the response.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            state = collect_state(**get_querysets(request, *args, **kwargs))
+            return respond_conditionally(request, state, lambda: method(view, request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def async_conditional_get(get_querysets):
+    """`conditional_get` for async ``get`` handlers."""
+    def decorator(method):
+        @wraps(method)
+        async def wrapper(view, request, *args, **kwargs):
+            state = await acollect_state(**get_querysets(request, *args, **kwargs))
+            etag = _etag(request, state)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await method(view, request, *args, **kwargs)
+            return _finalize(response, etag)
+        return wrapper
+    return decorator
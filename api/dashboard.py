@@ -0,0 +1,231 @@
+"""
+Per-intern dashboard read model.
+
+Each intern's dashboard is one `InternDashboard` row whose document holds
+the rendered internship rows and the payloads of their courses, each keyed
+by id. Signal handlers in `api.signals` patch the affected fragments in the
+same transaction as the write. An internship change re-renders one row, and
+a course, material or timetable change re-renders that course once for
+every dashboard that shows it. DashboardView and OngoingInternships read the
+row and page through it in memory.
+
+Documents are created on first read: an empty `UNBUILT` row is committed
+first, then filled in under its row lock. Writers lock every row they could
+patch but skip unbuilt ones, so a write either commits before the build
+reads the tables or waits for the lock and patches the built document.
+`rebuild_dashboards` regenerates documents, and `check_dashboards` compares
+them against the live query.
+"""
+import time
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.utils import timezone
+
+from main.models import Course, Internship, InternDashboard
+from main.transitions import effective_status
+from .pagination import paginate_rows
+from .serializers import CourseSerializer, InternshipRowSerializer, parse_fields, prune
+
+
+# Version of a row that has been claimed by a first read but not built yet.
+UNBUILT = 0
+
+
+def _new_version():
+    # Clock based, so a rebuilt document never reuses an older version.
+    return time.time_ns() // 1000
+
+
+def render_internships(internships):
+    return {str(row['id']): row for row in InternshipRowSerializer(internships, many=True).data}
+
+
+def render_courses(course_ids):
+    queryset = CourseSerializer.setup_eager_loading(Course.objects.filter(pk__in=course_ids))
+    return {str(course.pk): CourseSerializer(course).data for course in queryset}
+
+
+def build_documents(intern_ids, course_payloads=None):
+    """Render ``{intern_id: document}`` from the live tables for every id in `intern_ids`."""
+    course_payloads = {} if course_payloads is None else course_payloads
+    # Token users carry their id as a string.
+    intern_ids = [int(intern_id) for intern_id in intern_ids]
+    documents = {intern_id: {'internships': {}, 'courses': {}} for intern_id in intern_ids}
+    internships = list(Internship.objects.filter(intern_id__in=intern_ids).order_by('pk'))
+    missing = {internship.course_id for internship in internships} - {int(pk) for pk in course_payloads}
+    if missing:
+        course_payloads.update(render_courses(missing))
+    for internship in internships:
+        document = documents[internship.intern_id]
+        document['internships'].update(render_internships([internship]))
+        course_key = str(internship.course_id)
+        document['courses'][course_key] = course_payloads[course_key]
+    return documents
+
+
+def get_dashboard(intern_id):
+    """The intern's dashboard row, built on first access."""
+    dashboard = InternDashboard.objects.filter(intern_id=intern_id).first()
+    if dashboard is None or dashboard.version == UNBUILT:
+        dashboard = _build_dashboard(int(intern_id))
+    return dashboard
+
+
+def _build_dashboard(intern_id):
+    # The empty row is committed before anything is read, so every writer
+    # from here on finds it and queues behind the lock taken below.
+    InternDashboard.objects.get_or_create(
+        intern_id=intern_id, defaults={'document': {'internships': {}, 'courses': {}}, 'version': UNBUILT},
+    )
+    with transaction.atomic():
+        dashboard = InternDashboard.objects.select_for_update().get(intern_id=intern_id)
+        if dashboard.version == UNBUILT:
+            dashboard.document = build_documents([intern_id])[intern_id]
+            dashboard.version = _new_version()
+            dashboard.save(update_fields=['document', 'version', 'updated_at'])
+    return dashboard
+
+
+def _prune_courses(document):
+    used = {str(row['course']) for row in document['internships'].values()}
+    for key in set(document['courses']) - used:
+        del document['courses'][key]
+
+
+def refresh_internship(internship_id, intern_ids):
+    """Re-render one internship row in the dashboards of `intern_ids` (its owner, before and after a change)."""
+    internship = Internship.objects.filter(pk=internship_id).first()
+    key = str(internship_id)
+    with transaction.atomic():
+        for dashboard in InternDashboard.objects.select_for_update().filter(intern_id__in=intern_ids):
+            if dashboard.version == UNBUILT:
+                continue
+            document = dashboard.document
+            document['internships'].pop(key, None)
+            if internship is not None and internship.intern_id == dashboard.intern_id:
+                document['internships'].update(render_internships([internship]))
+                course_key = str(internship.course_id)
+                if course_key not in document['courses']:
+                    document['courses'].update(render_courses([internship.course_id]))
+            _prune_courses(document)
+            dashboard.version += 1
+            dashboard.save(update_fields=['document', 'version', 'updated_at'])
+
+
+def refresh_internships(internship_ids):
+    """Re-render many internship rows in their owners' existing dashboards, with one bulk write."""
+    by_intern = defaultdict(list)
+    for internship in Internship.objects.filter(pk__in=internship_ids).order_by('pk'):
+        by_intern[internship.intern_id].append(internship)
+    now = timezone.now()
+    with transaction.atomic():
+        changed = []
+        for dashboard in InternDashboard.objects.select_for_update().filter(intern_id__in=list(by_intern)):
+            if dashboard.version == UNBUILT:
+                continue
+            document = dashboard.document
+            internships = by_intern[dashboard.intern_id]
+            document['internships'].update(render_internships(internships))
+            missing = {internship.course_id for internship in internships} - {int(key) for key in document['courses']}
+            if missing:
+                document['courses'].update(render_courses(missing))
+            dashboard.version += 1
+            dashboard.updated_at = now
+            changed.append(dashboard)
+        InternDashboard.objects.bulk_update(changed, ['document', 'version', 'updated_at'], batch_size=500)
+
+
+def refresh_courses(course_ids):
+    """Re-render the given courses once and patch them into every dashboard that shows them."""
+    course_ids = set(course_ids)
+    if not course_ids:
+        return
+    payloads = render_courses(course_ids)
+    keys = {str(course_id) for course_id in course_ids}
+    intern_ids = Internship.objects.filter(course_id__in=course_ids).values('intern_id')
+    now = timezone.now()
+    with transaction.atomic():
+        changed = []
+        for dashboard in InternDashboard.objects.select_for_update().filter(intern_id__in=intern_ids):
+            if dashboard.version == UNBUILT:
+                continue
+            courses = dashboard.document['courses']
+            for key in keys & set(courses):
+                if key in payloads:
+                    courses[key] = payloads[key]
+                else:
+                    del courses[key]
+            dashboard.version += 1
+            dashboard.updated_at = now
+            changed.append(dashboard)
+        InternDashboard.objects.bulk_update(changed, ['document', 'version', 'updated_at'], batch_size=500)
+
+
+def rebuild_dashboards(intern_ids, batch_size=200):
+    """Regenerate (or create) the dashboards of `intern_ids`; returns how many were written."""
+    intern_ids = list(intern_ids)
+    course_payloads = {}
+    written = 0
+    for start in range(0, len(intern_ids), batch_size):
+        batch = intern_ids[start:start + batch_size]
+        documents = build_documents(batch, course_payloads)
+        now = timezone.now()
+        InternDashboard.objects.bulk_create(
+            [InternDashboard(intern_id=intern_id, document=document, version=_new_version(), updated_at=now)
+             for intern_id, document in documents.items()],
+            update_conflicts=True,
+            unique_fields=['intern'],
+            update_fields=['document', 'version', 'updated_at'],
+        )
+        written += len(batch)
+    return written
+
+
+def _current_status(row, today):
+    # Stored rows hold the status as of their last render; the dates may have moved it since.
+    return effective_status(
+        row['status'], date.fromisoformat(row['starting_date']), date.fromisoformat(row['completion_date']), today,
+    )
+
+
+def _as_of(document, today):
+    """`document` with every internship's status brought up to `today`."""
+    internships = {key: {**row, 'status': _current_status(row, today)} for key, row in document['internships'].items()}
+    return {**document, 'internships': internships}
+
+
+def stale_dashboards(intern_ids, batch_size=200):
+    """Yield ids from `intern_ids` whose stored dashboard differs from the live query."""
+    intern_ids = list(intern_ids)
+    course_payloads = {}
+    today = timezone.localdate()
+    for start in range(0, len(intern_ids), batch_size):
+        batch = intern_ids[start:start + batch_size]
+        stored = dict(
+            InternDashboard.objects.filter(intern_id__in=batch).exclude(version=UNBUILT).values_list('intern_id', 'document')
+        )
+        for intern_id, document in build_documents(batch, course_payloads).items():
+            if intern_id in stored and _as_of(stored[intern_id], today) != _as_of(document, today):
+                yield intern_id
+
+
+def dashboard_state(dashboard):
+    """Validator state for `conditional.respond_conditionally`."""
+    return {'dashboard': (dashboard.version, dashboard.updated_at)}
+
+
+def dashboard_page(request, dashboard, pagination_class):
+    """One cursor page of the dashboard's internships, with courses inlined and ``?fields=`` applied."""
+    document = dashboard.document
+    today = timezone.localdate()
+    rows = [
+        {**row, 'status': _current_status(row, today), 'course': document['courses'].get(str(row['course']))}
+        for row in document['internships'].values()
+    ]
+    page = paginate_rows(request, rows, pagination_class)
+    fields = request.query_params.get('fields')
+    if fields:
+        page['results'] = prune(page['results'], parse_fields(fields))
+    return page
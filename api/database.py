@@ -0,0 +1,42 @@
+"""Connection pool statistics for the current process."""
+from django.db import connections
+
+
+def pool_stats():
+    """
+    Return ``{alias: stats}`` for every configured database.
+
+    Pools are per process, so these numbers describe the worker that serves
+    the call. Aliases without a pool report only ``pooled: False``.
+    """
+    stats = {}
+    for alias in connections:
+        connection = connections[alias]
+        pool = getattr(connection, 'pool', None)
+        if pool is None:
+            stats[alias] = {'vendor': connection.vendor, 'pooled': False}
+            continue
+        raw = pool.get_stats()
+        size, available = raw.get('pool_size', 0), raw.get('pool_available', 0)
+        requests = raw.get('requests_num', 0)
+        wait_ms = raw.get('requests_wait_ms', 0)
+        stats[alias] = {
+            'vendor': connection.vendor,
+            'pooled': True,
+            'min_size': pool.min_size,
+            'max_size': pool.max_size,
+            'size': size,
+            'in_use': size - available,
+            'available': available,
+            'waiting': raw.get('requests_waiting', 0),
+            'requests': requests,
+            # Requests that found every connection in use and had to queue.
+            'overflow': raw.get('requests_queued', 0),
+            'timeouts': raw.get('requests_errors', 0),
+            'wait_ms_total': wait_ms,
+            'wait_ms_avg': round(wait_ms / requests, 2) if requests else 0.0,
+            'connections_opened': raw.get('connections_num', 0),
+            'connections_errors': raw.get('connections_errors', 0),
+            'connections_lost': raw.get('connections_lost', 0),
+        }
+    return stats
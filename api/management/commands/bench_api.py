@@ -0,0 +1,204 @@
+import json
+import random
+import re
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from api.benchmarking import summarize, run_concurrently, write_report
+from api.seeding import SEED_DOMAIN
+from api.views import CustomTokenObtainPairSerializer
+from main.models import CustomUser, Internship
+
+# Weighted request mix; placeholders are filled from the simulated user's own data.
+DEFAULT_MIX = [
+    {'name': 'dashboard', 'path': '/api/dashboard/', 'weight': 30},
+    {'name': 'profile', 'path': '/api/profile/', 'weight': 15},
+    {'name': 'ongoing-internships', 'path': '/api/internships/', 'weight': 10},
+    {'name': 'course-details', 'path': '/api/internships/{internship_id}/', 'weight': 10},
+    {'name': 'course-timetable', 'path': '/api/courses/{course_id}/timetable/', 'weight': 15},
+    {'name': 'upcoming-sessions', 'path': '/api/sessions/upcoming/', 'weight': 10},
+    {'name': 'course-calendar', 'path': '/api/courses/{course_id}/calendar.ics', 'weight': 5},
+]
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+OK_STATUSES = {200, 201, 204, 304}
+
+
+def load_mix(path):
+    """
+    Read a request mix from a JSON Lines file. Each line is an object with
+    `path` and optionally `name`, `method`, `weight` and `body`; lines
+    without a `path` (other JSONL content) are ignored.
+    """
+    mix = []
+    with open(path, encoding='utf-8') as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, dict) and entry.get('path'):
+                entry.setdefault('name', entry['path'])
+                mix.append(entry)
+    if not mix:
+        raise CommandError(f"{path} has no request entries (objects with a `path`).")
+    return mix
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(endpoints, baseline):
+    """Relative change per endpoint against a previous report."""
+    changes = {}
+    for name, stats in endpoints.items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        changes[name] = {
+            key: round((stats[key] - before[key]) / before[key] * 100, 1) if before[key] else None
+            for key in ('p50_ms', 'p95_ms', 'per_sec')
+        }
+        if stats['queries_per_request'] is not None and before.get('queries_per_request') is not None:
+            changes[name]['queries_per_request'] = round(stats['queries_per_request'] - before['queries_per_request'], 2)
+    return changes
+
+
+class Command(BaseCommand):
+    help = "Replay a weighted request mix as seeded users and report throughput, latency and queries per endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--users', type=int, default=200, help="Seeded users to act as.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed for the request order and user choice.")
+        parser.add_argument('--mix', help="JSON Lines request mix (see load_mix); defaults to the read endpoints.")
+        parser.add_argument('--url', help="Base URL of a running server; default is the WSGI app in-process.")
+        parser.add_argument('--warmup', type=int, default=50, help="Unmeasured requests sent first.")
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+        parser.add_argument('--baseline', help="A previous report to compare against.")
+
+    def handle(self, *args, **options):
+        mix = load_mix(options['mix']) if options['mix'] else DEFAULT_MIX
+        actors = self.actors(options['users'])
+        if not actors:
+            raise CommandError("No seeded users with an ongoing internship; run `seed_data` first.")
+
+        rng = random.Random(options['seed'])
+        weights = [entry.get('weight', 1) for entry in mix]
+        plan = [(rng.choices(mix, weights)[0], rng.choice(actors)) for _ in range(options['warmup'] + options['requests'])]
+
+        samples = defaultdict(lambda: {'latencies': [], 'errors': 0, 'queries': []})
+        lock = threading.Lock()
+        send = self.remote_sender(options['url']) if options['url'] else self.local_sender()
+
+        def run(item):
+            entry, actor = item
+            path = entry['path'].format(**actor['values'])
+            started = time.perf_counter()
+            status, server_timing = send(entry.get('method', 'GET'), path, entry.get('body'), actor['token'])
+            elapsed = time.perf_counter() - started
+            queries = QUERIES_RE.search(server_timing or '')
+            with lock:
+                sample = samples[entry['name']]
+                sample['latencies'].append(elapsed)
+                sample['errors'] += status not in OK_STATUSES
+                if queries:
+                    sample['queries'].append(int(queries.group(1)))
+            return status in OK_STATUSES
+
+        with override_settings(METRICS_SERVER_TIMING=True, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            run_concurrently(run, plan[:options['warmup']], options['concurrency'])
+            samples.clear()
+            elapsed, latencies, errors = run_concurrently(run, plan[options['warmup']:], options['concurrency'])
+
+        endpoints = {}
+        for name, sample in sorted(samples.items()):
+            queries = sample['queries']
+            endpoints[name] = {
+                'per_sec': round(len(sample['latencies']) / elapsed, 2),
+                'errors': sample['errors'],
+                'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+                **summarize(sample['latencies']),
+            }
+        report = {
+            'revision': git_revision(),
+            'started_at': timezone.now().isoformat(),
+            'target': options['url'] or 'in-process',
+            'database': settings.DATABASES['default']['ENGINE'],
+            'concurrency': options['concurrency'],
+            'seed': options['seed'],
+            'overall': {'per_sec': round(len(latencies) / elapsed, 2), 'errors': errors, **summarize(latencies)},
+            'endpoints': endpoints,
+        }
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as fh:
+                report['change_pct'] = compare(endpoints, json.load(fh))
+        for name, stats in endpoints.items():
+            self.stderr.write(
+                f"{name}: {stats['per_sec']}/s p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms "
+                f"queries={stats['queries_per_request']} errors={stats['errors']}"
+            )
+        write_report(report, options['output'], self.stdout)
+
+    def actors(self, limit):
+        """Seeded users with an ongoing internship, each with a token and path values."""
+        internships = (
+            Internship.objects.effective_status_in(['Ongoing']).filter(intern__email__endswith=f'@{SEED_DOMAIN}')
+            .order_by('intern_id', 'pk').values_list('intern_id', 'pk', 'course_id')
+        )
+        chosen = {}
+        for intern_id, internship_id, course_id in internships:
+            if intern_id not in chosen and len(chosen) < limit:
+                chosen[intern_id] = {'internship_id': internship_id, 'course_id': course_id}
+        users = CustomUser.objects.in_bulk(list(chosen))
+        return [
+            {
+                'token': str(CustomTokenObtainPairSerializer.get_token(users[intern_id]).access_token),
+                'values': values,
+            }
+            for intern_id, values in chosen.items()
+        ]
+
+    def local_sender(self):
+        local = threading.local()
+
+        def send(method, path, body, token):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            response = local.client.generic(
+                method, path, json.dumps(body) if body is not None else '', content_type='application/json',
+                headers={'Authorization': f'Bearer {token}'},
+            )
+            return response.status_code, response.get('Server-Timing')
+
+        return send
+
+    def remote_sender(self, base_url):
+        def send(method, path, body, token):
+            request = urllib.request.Request(
+                base_url.rstrip('/') + path,
+                data=json.dumps(body).encode() if body is not None else None,
+                method=method,
+                headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'},
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                    return response.status, response.headers.get('Server-Timing')
+            except urllib.error.HTTPError as e:
+                return e.code, e.headers.get('Server-Timing')
+
+        return send
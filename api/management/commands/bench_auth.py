@@ -0,0 +1,64 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from api.benchmarking import run_concurrently, summarize, write_report
+from api.views import LoginView, RegisterView
+
+
+class Command(BaseCommand):
+    help = "Measure signups/sec and login latency at several concurrency levels."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8, 16])
+        parser.add_argument('--requests', type=int, default=64, help="Signups (and logins) per concurrency level.")
+        parser.add_argument('--password', default='bench-Password-123')
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark users afterwards.")
+
+    # Every request comes from one address; the signup throttle would cap the run.
+    @override_settings(THROTTLE_ENABLED=False)
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        register, login = RegisterView.as_view(), LoginView.as_view()
+        password = options['password']
+        run_id = uuid.uuid4().hex[:8]
+
+        def signup(email):
+            request = factory.post('/api/register/', {'email': email, 'password': password}, format='json')
+            return register(request).status_code == 201
+
+        def sign_in(email):
+            request = factory.post('/api/token/', {'email': email, 'password': password}, format='json')
+            return login(request).status_code == 200
+
+        report = {
+            'hasher': settings.PASSWORD_HASHERS[0],
+            'argon2': {
+                'time_cost': settings.ARGON2_TIME_COST,
+                'memory_cost_kib': settings.ARGON2_MEMORY_COST,
+                'parallelism': settings.ARGON2_PARALLELISM,
+            },
+            'hashing_threads': settings.PASSWORD_HASHING_THREADS,
+            'levels': [],
+        }
+        try:
+            for concurrency in options['concurrency']:
+                emails = [f'bench-{run_id}-{concurrency}-{i}@example.invalid' for i in range(options['requests'])]
+                elapsed, latencies, errors = run_concurrently(signup, emails, concurrency)
+                signups = {'signups_per_sec': round(len(emails) / elapsed, 2), 'errors': errors, **summarize(latencies)}
+                elapsed, latencies, errors = run_concurrently(sign_in, emails, concurrency)
+                logins = {'logins_per_sec': round(len(emails) / elapsed, 2), 'errors': errors, **summarize(latencies)}
+                report['levels'].append({'concurrency': concurrency, 'signup': signups, 'login': logins})
+                self.stderr.write(
+                    f"c={concurrency}: {signups['signups_per_sec']} signups/s, "
+                    f"login p50={logins['p50_ms']}ms p95={logins['p95_ms']}ms"
+                )
+        finally:
+            if not options['keep']:
+                get_user_model().objects.filter(email__startswith=f'bench-{run_id}-').delete()
+        write_report(report, options['output'], self.stdout)
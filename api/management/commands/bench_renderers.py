@@ -0,0 +1,80 @@
+import io
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.benchmarking import write_report
+from api.dashboard import build_documents
+from api.renderers import MessagePackParser, MessagePackRenderer, ORJSONParser, ORJSONRenderer
+from main.models import Internship
+
+OPTIONS = {
+    'drf-json': (JSONRenderer, JSONParser),
+    'orjson': (ORJSONRenderer, ORJSONParser),
+    'msgpack': (MessagePackRenderer, MessagePackParser),
+}
+
+
+def dashboard_payload(rows):
+    """A dashboard page with `rows` internships and their courses inlined, as DashboardView returns it."""
+    intern_ids = list(Internship.objects.order_by('intern_id').values_list('intern_id', flat=True).distinct()[:rows])
+    results = []
+    for document in build_documents(intern_ids).values():
+        results += [{**row, 'course': document['courses'][str(row['course'])]} for row in document['internships'].values()]
+    return {'next': None, 'previous': None, 'results': results[:rows]}
+
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return {'min_ms': round(min(times) * 1000, 3), 'median_ms': round(statistics.median(times) * 1000, 3)}
+
+
+def peak_allocation(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    help = "Compare render/parse time, size and peak allocation of a large dashboard payload per renderer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help="Internship rows in the payload.")
+        parser.add_argument('--repeat', type=int, default=25)
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+
+    def handle(self, *args, **options):
+        payload = dashboard_payload(options['rows'])
+        if not payload['results']:
+            raise CommandError("No internships to build a payload from; run `seed_data` first.")
+        reference = JSONParser().parse(io.BytesIO(JSONRenderer().render(payload)))
+
+        report = {'rows': len(payload['results']), 'repeat': options['repeat'], 'renderers': {}}
+        for name, (renderer_class, parser_class) in OPTIONS.items():
+            renderer, parser = renderer_class(), parser_class()
+            body = renderer.render(payload, renderer.media_type)
+            report['renderers'][name] = {
+                'bytes': len(body),
+                'render': timed(lambda: renderer.render(payload, renderer.media_type), options['repeat']),
+                'render_peak_alloc_bytes': peak_allocation(lambda: renderer.render(payload, renderer.media_type)),
+                'parse': timed(lambda: parser.parse(io.BytesIO(body)), options['repeat']),
+                'parse_peak_alloc_bytes': peak_allocation(lambda: parser.parse(io.BytesIO(body))),
+                'same_data': parser.parse(io.BytesIO(body)) == reference,
+            }
+            stats = report['renderers'][name]
+            self.stderr.write(
+                f"{name}: {stats['bytes']} bytes, render {stats['render']['median_ms']}ms "
+                f"(peak {stats['render_peak_alloc_bytes']} B), parse {stats['parse']['median_ms']}ms"
+            )
+        write_report(report, options['output'], self.stdout)
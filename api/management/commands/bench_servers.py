@@ -0,0 +1,134 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarking import summarize, write_report
+from api.views import CustomTokenObtainPairSerializer
+
+SERVERS = {
+    'wsgi': lambda port, workers: [
+        sys.executable, '-m', 'gunicorn', 'src.wsgi:application',
+        '--workers', str(workers), '--threads', '4', '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+    ],
+    'asgi': lambda port, workers: [
+        sys.executable, '-m', 'uvicorn', 'src.asgi:application',
+        '--workers', str(workers), '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning',
+    ],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"Server on port {port} did not start within {timeout}s")
+
+
+async def slow_request(port, raw_request, delay, chunks):
+    """Send `raw_request` in `chunks` pieces and read the response 1 KiB at a time, pausing `delay` between each."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        step = max(1, len(raw_request) // chunks)
+        for start in range(0, len(raw_request), step):
+            writer.write(raw_request[start:start + step])
+            await writer.drain()
+            await asyncio.sleep(delay)
+        status_line = await reader.readline()
+        while await reader.read(1024):
+            await asyncio.sleep(delay)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def run_load(port, raw_request, concurrency, duration, delay, chunks):
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def client():
+        nonlocal errors
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                ok = await slow_request(port, raw_request, delay, chunks) == 200
+            except (OSError, ValueError, IndexError):
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies, errors
+
+
+class Command(BaseCommand):
+    help = "Compare WSGI (gunicorn) and ASGI (uvicorn) throughput under many concurrent slow clients."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['wsgi', 'asgi'])
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 200])
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds of load per concurrency level.")
+        parser.add_argument('--client-delay', type=float, default=0.05, help="Pause between each chunk a client sends or reads.")
+        parser.add_argument('--chunks', type=int, default=4, help="Pieces each request is trickled in.")
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--path', default='/api/dashboard/')
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+
+    def handle(self, *args, **options):
+        user, created = get_user_model().objects.get_or_create(email='bench-servers@example.invalid')
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        raw_request = (
+            f"GET {options['path']} HTTP/1.1\r\nHost: localhost\r\n"
+            f"Authorization: Bearer {token}\r\nConnection: close\r\n\r\n"
+        ).encode()
+
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        report = {'path': options['path'], 'client_delay': options['client_delay'], 'workers': options['workers'], 'servers': {}}
+        try:
+            for name in options['servers']:
+                port = free_port()
+                server_env = {**env, 'API_ASYNC_VIEWS': str(name == 'asgi')}
+                process = subprocess.Popen(SERVERS[name](port, options['workers']), env=server_env)
+                try:
+                    wait_for_port(port)
+                    levels = []
+                    for concurrency in options['concurrency']:
+                        elapsed, latencies, errors = asyncio.run(run_load(
+                            port, raw_request, concurrency, options['duration'], options['client_delay'], options['chunks'],
+                        ))
+                        level = {
+                            'concurrency': concurrency,
+                            'requests_per_sec': round(len(latencies) / elapsed, 2),
+                            'errors': errors,
+                            **summarize(latencies),
+                        }
+                        levels.append(level)
+                        self.stderr.write(
+                            f"{name} c={concurrency}: {level['requests_per_sec']} req/s, "
+                            f"p50={level['p50_ms']}ms p99={level['p99_ms']}ms errors={errors}"
+                        )
+                    report['servers'][name] = levels
+                finally:
+                    process.terminate()
+                    process.wait(timeout=30)
+        finally:
+            if created:
+                user.delete()
+        write_report(report, options['output'], self.stdout)
@@ -0,0 +1,88 @@
+import threading
+import uuid
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.benchmarking import run_concurrently, summarize, write_report
+from api.throttling import reset_throttles
+from api.views import SubmitInitialApplicationView
+from main.models import InternshipApplication, OutboxMessage
+
+
+class Command(BaseCommand):
+    help = "Measure application-submit latency for legitimate clients, alone and during a flood."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Legitimate submissions per phase.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Concurrent legitimate clients.")
+        parser.add_argument('--flood-threads', type=int, default=8)
+        parser.add_argument('--attackers', type=int, default=4, help="Distinct addresses the flood comes from.")
+        parser.add_argument('--unthrottled', action='store_true', help="Also run the flood with throttling off.")
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        view = SubmitInitialApplicationView.as_view()
+        run_id = uuid.uuid4().hex[:8]
+        user = get_user_model().objects.create_user(email=f'bench-{run_id}@example.invalid', password=None)
+
+        def submit(address, email):
+            request = factory.post(
+                '/api/submit-initial-application/', {'email': email, 'mode': 'remote'}, format='json', REMOTE_ADDR=address,
+            )
+            force_authenticate(request, user=user)
+            return view(request).status_code
+
+        def flood(worker, stop, statuses):
+            sent = 0
+            while not stop.is_set():
+                # A fresh email every time, so only the address identifies the attacker.
+                code = submit(f'192.0.2.{(worker + sent) % options["attackers"] + 1}', f'flood-{run_id}-{worker}-{sent}@example.invalid')
+                statuses[code] += 1
+                sent += 1
+
+        def run_phase(name, flooding, throttled):
+            with override_settings(THROTTLE_ENABLED=throttled):
+                reset_throttles()
+                stop, statuses = threading.Event(), Counter()
+                attackers = [threading.Thread(target=flood, args=(i, stop, statuses)) for i in range(options['flood_threads'] if flooding else 0)]
+                for thread in attackers:
+                    thread.start()
+                items = list(range(options['requests']))
+                try:
+                    elapsed, latencies, errors = run_concurrently(
+                        lambda i: submit(f'10.0.{i // 250}.{i % 250 + 1}', f'legit-{run_id}-{name}-{i}@example.invalid') == 201,
+                        items,
+                        options['concurrency'],
+                    )
+                finally:
+                    stop.set()
+                    for thread in attackers:
+                        thread.join()
+            result = {
+                'phase': name,
+                'throttled': throttled,
+                'legitimate': {'per_sec': round(len(items) / elapsed, 2), 'errors': errors, **summarize(latencies)},
+                'flood': {'sent': sum(statuses.values()), 'accepted': statuses[201], 'rejected': statuses[429]},
+            }
+            self.stderr.write(
+                f"{name}: legit p50={result['legitimate']['p50_ms']}ms p95={result['legitimate']['p95_ms']}ms, "
+                f"flood {result['flood']['accepted']} accepted / {result['flood']['rejected']} rejected"
+            )
+            return result
+
+        phases = [('baseline', False, True), ('flood', True, True)]
+        if options['unthrottled']:
+            phases.append(('flood-unthrottled', True, False))
+        try:
+            report = {'phases': [run_phase(*phase) for phase in phases]}
+        finally:
+            pattern = f'-{run_id}-'
+            OutboxMessage.objects.filter(recipient__contains=pattern).delete()
+            InternshipApplication.objects.filter(email__contains=pattern).delete()
+            user.delete()
+        write_report(report, options['output'], self.stdout)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.dashboard import rebuild_dashboards, stale_dashboards
+from main.models import InternDashboard
+
+
+class Command(BaseCommand):
+    help = "Compare stored dashboards with the live query; exits non-zero when any differ."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Rebuild the dashboards that differ.")
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        intern_ids = InternDashboard.objects.order_by('pk').values_list('intern_id', flat=True)
+        stale = list(stale_dashboards(intern_ids, options['batch_size']))
+        for intern_id in stale:
+            self.stdout.write(f"stale: intern {intern_id}")
+        if stale and options['fix']:
+            rebuild_dashboards(stale, options['batch_size'])
+            self.stdout.write(f"rebuilt={len(stale)}")
+        elif stale:
+            raise CommandError(f"{len(stale)} dashboards differ from the live query.")
+        else:
+            self.stdout.write(f"checked={len(intern_ids)} stale=0")
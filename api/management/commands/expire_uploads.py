@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.media import expire_uploads
+
+
+class Command(BaseCommand):
+    help = "Remove chunked uploads abandoned for CHUNKED_UPLOAD_EXPIRY_SECONDS, and stray part files; run hourly."
+
+    def handle(self, *args, **options):
+        uploads, files = expire_uploads()
+        self.stdout.write(f"uploads={uploads} files={files}")
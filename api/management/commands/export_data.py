@@ -0,0 +1,23 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from api.bulk import FORMATS, RESOURCES, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream every row of a resource to stdout or a file as CSV or JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=sorted(RESOURCES))
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', help="Write to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        resource = RESOURCES[options['resource']]
+        chunks = stream_export(resource, resource.model._default_manager.all(), options['format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+                out.writelines(chunks)
+        else:
+            sys.stdout.writelines(chunks)
@@ -0,0 +1,28 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk import FORMATS, RESOURCES, import_rows, read_rows
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV or JSON Lines file into courses, materials, timetables or internships."
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=sorted(RESOURCES))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').replace('ndjson', 'jsonl')
+        if fmt not in FORMATS:
+            raise CommandError(f"Cannot tell the format of {options['path']}; pass --format.")
+
+        with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+            result = import_rows(RESOURCES[options['resource']], read_rows(stream, fmt), options['batch_size'])
+
+        for line, problems in result.errors:
+            for name, messages in problems.items():
+                self.stderr.write(f"line {line}: {name}: {' '.join(messages)}")
+        self.stdout.write(f"created={result.created} updated={result.updated} errors={len(result.errors)}")
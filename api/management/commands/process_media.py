@@ -0,0 +1,28 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.renditions import process_batch
+
+
+class Command(BaseCommand):
+    help = "Render thumbnails, WebP variants and video poster frames for queued uploads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit.")
+        parser.add_argument('--workers', type=int, default=settings.MEDIA_WORKERS, help="Threads rendering in parallel.")
+        parser.add_argument('--batch-size', type=int, default=settings.MEDIA_JOB_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when the queue is empty.")
+
+    def handle(self, *args, **options):
+        with ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='media') as executor:
+            while True:
+                done, failed = process_batch(executor, options['batch_size'])
+                if done or failed:
+                    self.stdout.write(f"done={done} failed={failed}")
+                    continue
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.dashboard import rebuild_dashboards
+from main.models import Internship, InternDashboard
+
+
+class Command(BaseCommand):
+    help = "Regenerate the dashboard read model from the live tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('intern_ids', nargs='*', type=int, help="Only these interns (default: everyone with an internship or a dashboard).")
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        intern_ids = options['intern_ids']
+        if not intern_ids:
+            intern_ids = sorted(
+                set(Internship.objects.values_list('intern_id', flat=True))
+                | set(InternDashboard.objects.values_list('intern_id', flat=True))
+            )
+        written = rebuild_dashboards(intern_ids, options['batch_size'])
+        self.stdout.write(f"rebuilt={written}")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.stats import compute_counters, rebuild_counters, stored_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the staff statistics counters from the live tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only compare; exits non-zero when any counter differs.")
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            self.stdout.write(f"counters={rebuild_counters()}")
+            return
+        live, stored = compute_counters(), stored_counters()
+        drifted = sorted(key for key in live.keys() | stored.keys() if live.get(key, 0) != stored.get(key, 0))
+        for metric, key in drifted:
+            self.stdout.write(f"drift: {metric}[{key}] stored={stored.get((metric, key), 0)} live={live.get((metric, key), 0)}")
+        if drifted:
+            raise CommandError(f"{len(drifted)} counters differ from the live tables.")
+        self.stdout.write(f"checked={len(live)} drift=0")
@@ -0,0 +1,20 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from main.transitions import reconcile_internships
+
+
+class Command(BaseCommand):
+    help = "Store the status each internship's dates imply (Pending -> Ongoing -> Completed); run nightly."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help="Reconcile as of this day (default: today).")
+        parser.add_argument('--batch-size', type=int, help="Rows per guarded UPDATE (default: TRANSITION_BATCH_SIZE).")
+
+    def handle(self, *args, **options):
+        results = reconcile_internships(options['date'], options['batch_size'])
+        self.stdout.write(' '.join(
+            f"{target.lower()}={result.moved} skipped_{target.lower()}={len(result.skipped)}"
+            for target, result in results.items()
+        ))
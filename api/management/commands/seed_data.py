@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.dashboard import rebuild_dashboards
+from api.seeding import SEED_DOMAIN, flush_seed, seed
+from main.models import Internship
+
+
+class Command(BaseCommand):
+    help = "Create reproducible benchmark data (users, courses, materials, timetables, internships, projects)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--flush', action='store_true', help="Delete previously seeded rows first.")
+        parser.add_argument('--dashboards', action='store_true', help="Build the seeded interns' dashboards up front.")
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            self.stdout.write(f"deleted={flush_seed()}")
+        counts = seed(options['users'], options['seed'], options['batch_size'])
+        self.stdout.write(' '.join(f'{name}={count}' for name, count in counts.items()))
+        if options['dashboards']:
+            intern_ids = Internship.objects.filter(intern__email__endswith=f'@{SEED_DOMAIN}').values_list('intern_id', flat=True)
+            self.stdout.write(f"dashboards={rebuild_dashboards(sorted(set(intern_ids)))}")
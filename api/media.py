@@ -0,0 +1,255 @@
+"""
+Protected delivery and resumable uploads for course material files.
+
+Downloads honour a single HTTP byte range. The range is served from a
+`FileRange` that keeps the file's descriptor, so gunicorn's
+wsgi.file_wrapper can sendfile() it without copying through Python. With
+MEDIA_ACCEL_REDIRECT_PREFIX set, nginx serves the file instead.
+
+Uploads are appended to a part file one Content-Range chunk at a time and
+moved into storage once complete, so no worker ever holds a whole video.
+Each chunk is read from the client into its own staging file with no
+transaction open. A guarded UPDATE then claims the chunk's range, and only
+the request that claimed it copies the staged bytes into the part file
+before committing. Uploads left untouched for CHUNKED_UPLOAD_EXPIRY_SECONDS
+are removed with their files by `expire_uploads`.
+"""
+import io
+import mimetypes
+import os
+import re
+import shutil
+import uuid
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.http import FileResponse, HttpResponse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from main.models import ChunkedUpload
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class UploadError(Exception):
+    def __init__(self, status, detail, upload=None):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.upload = upload
+
+
+def parse_range(header, size):
+    """
+    Return the inclusive (start, end) of a single-range header, or None when
+    the whole file should be sent (no header, or one we choose to ignore).
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+class FileRange:
+    """
+    A window of `file` from `start` for `length` bytes.
+
+    Positions are absolute offsets in the underlying file, which is left
+    seeked to `start`, so anything using fileno() (sendfile) begins there.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.start = start
+        self.end = start + length
+        self.name = getattr(file, 'name', '')
+        file.seek(start)
+
+    def read(self, size=-1):
+        remaining = self.end - self.file.tell()
+        if remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        return self.file.read(size)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_END:
+            position = self.end + offset
+        elif whence == io.SEEK_CUR:
+            position = self.file.tell() + offset
+        else:
+            position = offset
+        return self.file.seek(min(max(position, self.start), self.end))
+
+    def tell(self):
+        return self.file.tell()
+
+    def seekable(self):
+        return True
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def serve_file(request, field_file):
+    """Response for `field_file`, honouring Range/If-Range, or an X-Accel-Redirect hand-off."""
+    filename = os.path.basename(field_file.name)
+    prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX
+    if prefix:
+        content_type, encoding = mimetypes.guess_type(filename)
+        response = HttpResponse(content_type=content_type or 'application/octet-stream')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(field_file.name)
+        return response
+
+    storage = field_file.storage
+    size = field_file.size
+    last_modified = http_date(storage.get_modified_time(field_file.name).timestamp())
+
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range or if_range == last_modified:
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = storage.open(field_file.name, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, filename=filename)
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end - start + 1), filename=filename, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = last_modified
+    return response
+
+
+def append_chunk(upload_id, user_id, content_range, stream):
+    """
+    Write the chunk described by `content_range` ("bytes start-end/total")
+    from `stream` to the upload's part file and return the updated upload.
+
+    A chunk must start at the upload's current offset; anything else raises
+    UploadError(409) carrying the upload, so the client can resume from there.
+    """
+    match = CONTENT_RANGE_RE.match(content_range or '')
+    if match is None:
+        raise UploadError(400, "A Content-Range header of the form 'bytes start-end/total' is required.")
+    start, end, total = map(int, match.groups())
+    length = end - start + 1
+    if length <= 0:
+        raise UploadError(400, "Content-Range end is before its start.")
+    if length > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadError(413, f"Chunks are limited to {settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE} bytes.")
+
+    upload = ChunkedUpload.objects.get(pk=upload_id, user_id=user_id)
+    if total != upload.size or end >= upload.size:
+        raise UploadError(400, "Content-Range does not match the upload size.", upload)
+    if upload.status == 'complete' or start != upload.offset:
+        raise UploadError(409, "Chunk does not start at the upload offset.", upload)
+
+    os.makedirs(os.path.dirname(upload.path), exist_ok=True)
+    staged = f'{upload.path}.{uuid.uuid4().hex}'
+    try:
+        with open(staged, 'wb') as chunk:
+            written = 0
+            while written < length:
+                data = stream.read(min(COPY_BUFFER_SIZE, length - written)) if stream is not None else b''
+                if not data:
+                    break
+                chunk.write(data)
+                written += len(data)
+        if written != length:
+            raise UploadError(400, "Request body is shorter than its Content-Range.", upload)
+
+        upload.offset = end + 1
+        upload.status = 'complete' if upload.offset == upload.size else 'uploading'
+        upload.updated_at = timezone.now()
+        with transaction.atomic():
+            # Holds the row until commit, so a racing request for the same
+            # range finds the offset moved and claims nothing.
+            claimed = ChunkedUpload.objects.filter(pk=upload.pk, offset=start, status='uploading').update(
+                offset=upload.offset, status=upload.status, updated_at=upload.updated_at,
+            )
+            if not claimed:
+                upload.refresh_from_db()
+                raise UploadError(409, "Chunk does not start at the upload offset.", upload)
+            with open(staged, 'rb') as chunk, open(upload.path, 'r+b' if os.path.exists(upload.path) else 'wb') as part:
+                # Drop anything a failed earlier attempt left past the offset.
+                part.truncate(start)
+                part.seek(start)
+                shutil.copyfileobj(chunk, part, COPY_BUFFER_SIZE)
+    finally:
+        os.remove(staged)
+    return upload
+
+
+class AssembledUpload(File):
+    # FileSystemStorage moves files that expose temporary_file_path() instead of copying them.
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def attach_upload(upload, field_file):
+    """Move a completed upload into `field_file`'s storage (without saving the model) and discard the upload."""
+    with open(upload.path, 'rb') as part:
+        field_file.save(upload.filename, AssembledUpload(part, name=upload.filename), save=False)
+    upload.delete()
+
+
+def expire_uploads(now=None):
+    """
+    Delete uploads, finished or not, that no chunk has touched for
+    CHUNKED_UPLOAD_EXPIRY_SECONDS, and every file in CHUNKED_UPLOAD_DIR as
+    old as that which is not a remaining upload's part file. Returns
+    ``(uploads, files)`` removed.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.CHUNKED_UPLOAD_EXPIRY_SECONDS)
+    uploads, _ = ChunkedUpload.objects.filter(updated_at__lt=cutoff).delete()
+    # Read after the delete, so the files of the uploads just removed count as strays.
+    keep = {f'{pk}.part' for pk in ChunkedUpload.objects.values_list('pk', flat=True)}
+    files = 0
+    try:
+        entries = list(os.scandir(settings.CHUNKED_UPLOAD_DIR))
+    except FileNotFoundError:
+        entries = []
+    for entry in entries:
+        if entry.name in keep or not entry.is_file() or entry.stat().st_mtime >= cutoff.timestamp():
+            continue
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            continue
+        files += 1
+    return uploads, files
@@ -0,0 +1,273 @@
+"""
+Per-request performance metrics and their Prometheus exposition.
+
+`MetricsMiddleware` times every request and labels it with its URL name
+from `api/urls.py`. It records:
+- wall time;
+- the number of SQL queries and the time spent in them;
+- render time (the serializer data being encoded by the DRF renderer);
+- response size.
+
+Queries are counted by an execute wrapper installed on each new database
+connection (see `api.signals`). The wrapper adds to the current request's
+`RequestTimings`, found through a context variable. That variable also
+follows `sync_to_async` threads, so the async views are counted as well.
+
+Values are kept in fixed-bucket histograms in process memory, so each
+worker reports its own requests. With METRICS_SERVER_TIMING on, each
+response also carries a Server-Timing header.
+"""
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .cache import cache_stats
+from .database import pool_stats
+from .throttling import throttle_stats
+
+_current = ContextVar('api_request_timings', default=None)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class RequestTimings:
+    __slots__ = ('queries', 'sql_seconds', 'render_seconds', 'render_started', '_lock')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.render_seconds = 0.0
+        self.render_started = None
+        # The async views run queries on several threads at once.
+        self._lock = threading.Lock()
+
+    def add_query(self, seconds):
+        with self._lock:
+            self.queries += 1
+            self.sql_seconds += seconds
+
+
+def _label_text(names, values):
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+class Histogram:
+    def __init__(self, name, description, buckets, labels=('endpoint', 'method')):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        for label_values, (counts, total) in sorted(series.items()):
+            labels = _label_text(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    def __init__(self, name, description, labels):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        lines += [f'{self.name}{{{_label_text(self.labels, labels)}}} {value}' for labels, value in values]
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+REQUESTS = Counter('api_requests_total', "Requests served.", ('endpoint', 'method', 'status'))
+DURATION = Histogram('api_request_duration_seconds', "Wall time per request.", LATENCY_BUCKETS)
+SQL_QUERIES = Histogram('api_request_sql_queries', "SQL queries per request.", QUERY_COUNT_BUCKETS)
+SQL_DURATION = Histogram('api_request_sql_duration_seconds', "Time spent in SQL per request.", LATENCY_BUCKETS)
+RENDER_DURATION = Histogram('api_request_render_duration_seconds', "Time spent rendering the response body.", LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram('api_response_size_bytes', "Response body size.", SIZE_BUCKETS)
+METRICS = (REQUESTS, DURATION, SQL_QUERIES, SQL_DURATION, RENDER_DURATION, RESPONSE_SIZE)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper: time the query against the current request, if there is one."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(time.perf_counter() - started)
+
+
+def instrument(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def timed_render():
+    """Count the enclosed block as render time, for responses built without a TemplateResponse."""
+    timings = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.render_seconds += time.perf_counter() - started
+
+
+def _response_size(response):
+    if response.has_header('Content-Length'):
+        return int(response['Content-Length'])
+    return 0 if response.streaming else len(response.content)
+
+
+class MetricsMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        timings, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings, started)
+
+    def start(self):
+        timings = RequestTimings()
+        return timings, _current.set(timings), time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook; the post-render callback marks the end.
+        timings = _current.get()
+        if timings is not None:
+            timings.render_started = time.perf_counter()
+
+            def rendered(response):
+                timings.render_seconds += time.perf_counter() - timings.render_started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, timings, started):
+        elapsed = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        labels = ((match.url_name if match and match.url_name else 'unmatched'), request.method)
+        REQUESTS.inc(labels + (str(response.status_code),))
+        DURATION.observe(labels, elapsed)
+        SQL_QUERIES.observe(labels, timings.queries)
+        SQL_DURATION.observe(labels, timings.sql_seconds)
+        RENDER_DURATION.observe(labels, timings.render_seconds)
+        RESPONSE_SIZE.observe(labels, _response_size(response))
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={timings.sql_seconds * 1000:.2f};desc="{timings.queries} queries", '
+                f'render;dur={timings.render_seconds * 1000:.2f}, '
+                f'total;dur={elapsed * 1000:.2f}'
+            )
+        return response
+
+
+def _family(name, kind, description, samples):
+    lines = [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+    return lines + [f'{name}{{{labels}}} {value}' if labels else f'{name} {value}' for labels, value in samples]
+
+
+def exposition():
+    """All metrics in the Prometheus text format."""
+    lines = []
+    for metric in METRICS:
+        lines += metric.expose()
+    cache = cache_stats()
+    lines += _family('api_catalogue_cache_lookups_total', 'counter', "Catalogue cache lookups.", [
+        ('result="hit"', cache['hits']), ('result="miss"', cache['misses']),
+    ])
+    lines += _family('api_throttle_rejections_total', 'counter', "Requests rejected by a throttle.", [
+        (f'scope="{scope}"', count) for scope, count in sorted(throttle_stats()['rejections'].items())
+    ])
+    pools = {alias: stats for alias, stats in pool_stats().items() if stats['pooled']}
+    # Size, in use and waiting describe the pool now; overflow and timeouts
+    # are running totals of requests that had to queue or gave up waiting.
+    for key, name, kind in [
+        ('size', 'api_db_pool_size', 'gauge'),
+        ('in_use', 'api_db_pool_in_use', 'gauge'),
+        ('waiting', 'api_db_pool_waiting', 'gauge'),
+        ('overflow', 'api_db_pool_overflow_total', 'counter'),
+        ('timeouts', 'api_db_pool_timeouts_total', 'counter'),
+    ]:
+        lines += _family(name, kind, f"Connection pool {key.replace('_', ' ')}.", [
+            (f'alias="{alias}"', stats[key]) for alias, stats in sorted(pools.items())
+        ])
+    return '\n'.join(lines) + '\n'
+
+
+def scrape_allowed(request):
+    """Prometheus authenticates with a static bearer token; without one configured, only DEBUG exposes metrics."""
+    token = settings.METRICS_TOKEN
+    if not token:
+        return settings.DEBUG
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    return hmac.compare_digest(header, f'Bearer {token}')
+
+
+def reset_metrics():
+    for metric in METRICS:
+        metric.clear()
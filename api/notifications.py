@@ -0,0 +1,104 @@
+"""
+Database-backed email outbox.
+
+Views enqueue messages in the same transaction as the write that triggers
+them; the `process_outbox` worker delivers them in batches, so request
+latency never depends on the mail server.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from main.models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(idempotency_key, recipient, subject, body):
+    """Queue an email; a second call with the same key is a no-op."""
+    # ON CONFLICT DO NOTHING: one round-trip, and duplicates never raise.
+    OutboxMessage.objects.bulk_create(
+        [OutboxMessage(idempotency_key=idempotency_key, recipient=recipient, subject=subject, body=body)],
+        ignore_conflicts=True,
+    )
+
+
+def enqueue_application_email(application):
+    enqueue_email(
+        f'application:{application.pk}',
+        application.email,
+        "Complete Your Internship Application",
+        f"Thank you for your interest! Please complete your application here: {settings.APPLICATION_FORM_URL}",
+    )
+
+
+def enqueue_project_email(project):
+    enqueue_email(
+        f'project:{project.pk}',
+        project.email,
+        f"We received your project request: {project.title}",
+        "Thank you for reaching out! Our team will review your project and get back to you shortly.",
+    )
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(settings.OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), settings.OUTBOX_MAX_BACKOFF_SECONDS))
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to `batch_size` due messages to this worker.
+
+    Claimed rows get `next_attempt_at` pushed past the lease period, so a
+    worker that dies mid-batch only delays its messages instead of losing them.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = OutboxMessage.objects.filter(status='pending', next_attempt_at__lte=now).order_by('next_attempt_at')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:batch_size])
+        OutboxMessage.objects.filter(pk__in=ids).update(
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS),
+        )
+    return list(OutboxMessage.objects.filter(pk__in=ids).order_by('next_attempt_at', 'pk'))
+
+
+def deliver_batch(batch_size=None):
+    """Send one batch over a single mail connection; returns ``(sent, failed)``."""
+    messages = claim_batch(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not messages:
+        return 0, 0
+
+    sent, failed = [], []
+    try:
+        with get_connection() as mail_connection:
+            for message in messages:
+                try:
+                    EmailMessage(message.subject, message.body, settings.DEFAULT_FROM_EMAIL, [message.recipient],
+                                 connection=mail_connection).send()
+                    sent.append(message.pk)
+                except Exception as e:
+                    logger.warning("Outbox message %s failed (attempt %s): %s", message.pk, message.attempts, e)
+                    failed.append((message, e))
+    except Exception as e:
+        # Opening or closing the connection failed; every message not yet accounted for is retried.
+        logger.warning("Outbox mail connection failed: %s", e)
+        done = set(sent) | {message.pk for message, _ in failed}
+        failed += [(message, e) for message in messages if message.pk not in done]
+
+    now = timezone.now()
+    OutboxMessage.objects.filter(pk__in=sent).update(status='sent', sent_at=now, last_error='')
+    for message, error in failed:
+        if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            changes = {'status': 'failed'}
+        else:
+            changes = {'next_attempt_at': now + retry_delay(message.attempts)}
+        OutboxMessage.objects.filter(pk=message.pk).update(last_error=str(error), **changes)
+    return len(sent), len(failed)
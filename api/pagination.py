@@ -0,0 +1,85 @@
+import base64
+import json
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Newest first, keyset-paginated on (created_at, id)."""
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class StartTimeCursorPagination(CursorPagination):
+    """Chronological timetable entries, keyset-paginated on (start_time, id)."""
+    ordering = ('start_time', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class ProjectsCursorPagination(CreatedAtCursorPagination):
+    # ProfileView embeds this list, so it gets its own cursor parameter.
+    cursor_query_param = 'projects_cursor'
+    page_size_query_param = 'projects_page_size'
+
+
+def paginate(request, view, queryset, serializer_class, pagination_class):
+    """Return the paginated payload for `queryset` as a plain dict."""
+    if hasattr(serializer_class, 'setup_eager_loading'):
+        queryset = serializer_class.setup_eager_loading(queryset)
+    paginator = pagination_class()
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    serializer = serializer_class(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data).data
+
+
+def paginate_rows(request, rows, pagination_class):
+    """
+    Cursor-paginate already rendered rows (dicts) the way `pagination_class`
+    paginates a queryset: same ordering, page size parameters and payload
+    shape. Cursors hold the boundary row's ordering values.
+    """
+    paginator = pagination_class()
+    page_size = paginator.get_page_size(request)
+    fields = [name.lstrip('-') for name in paginator.ordering]
+    descending = paginator.ordering[0].startswith('-')
+
+    def key(row):
+        return tuple(row[name] for name in fields)
+
+    def after(row_key, position):
+        return row_key < position if descending else row_key > position
+
+    rows = sorted(rows, key=key, reverse=descending)
+    start = 0
+    encoded = request.query_params.get(paginator.cursor_query_param)
+    if encoded:
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position, reverse = tuple(cursor['p']), cursor['r']
+            if len(position) != len(fields):
+                raise ValueError
+            # Forged positions whose values do not compare with the rows' raise TypeError here.
+            if reverse:
+                end = next((i for i, row in enumerate(rows) if not after(position, key(row))), len(rows))
+                start = max(0, end - page_size)
+            else:
+                start = next((i for i, row in enumerate(rows) if after(key(row), position)), len(rows))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(paginator.invalid_cursor_message)
+    page = rows[start:start + page_size]
+
+    def link(row, reverse):
+        value = base64.urlsafe_b64encode(json.dumps({'p': key(row), 'r': reverse}).encode()).decode()
+        return replace_query_param(request.build_absolute_uri(), paginator.cursor_query_param, value)
+
+    return {
+        'next': link(page[-1], False) if page and start + page_size < len(rows) else None,
+        'previous': link(page[0], True) if page and start > 0 else None,
+        'results': page,
+    }
@@ -0,0 +1,107 @@
+"""
+orjson and MessagePack renderers and parsers.
+
+They replace DRF's stdlib-json JSONRenderer/JSONParser through
+REST_FRAMEWORK in settings. The JSON output is byte-compatible with DRF's
+for everything our serializers produce: UTF-8 rather than \\u escapes,
+datetimes as ISO 8601 with ``Z`` for UTC, Decimals as numbers. Clients
+that send ``Accept: application/msgpack`` get the same structure as
+MessagePack. Dates and datetimes become ISO strings there too, so both
+formats decode to identical data.
+"""
+import datetime
+import decimal
+import uuid
+
+import msgpack
+import orjson
+from django.db.models.query import QuerySet
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def encode_default(obj):
+    """The types DRF's JSONEncoder handles that orjson and msgpack do not."""
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return _isoformat(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if isinstance(obj, QuerySet):
+        return tuple(obj)
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, '__iter__'):
+        return tuple(item for item in obj)
+    raise TypeError(f"Type is not serializable: {type(obj).__name__}")
+
+
+def _isoformat(value):
+    text = value.isoformat()
+    return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        options = ORJSON_OPTIONS
+        # Honour ``Accept: application/json; indent=4`` like JSONRenderer (orjson only indents by 2).
+        if accepted_media_type and 'indent' in accepted_media_type:
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=encode_default, option=options)
+
+
+class ORJSONParser(BaseParser):
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+def _msgpack_default(obj):
+    # msgpack's datetime support needs tz-aware values and a reader that
+    # knows the timestamp extension; ISO strings match the JSON payloads.
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return _isoformat(obj)
+    return encode_default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True, datetime=False)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError, ValueError) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
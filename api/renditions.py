@@ -0,0 +1,211 @@
+"""
+Background renditions for uploaded images and videos.
+
+Saving a profile picture or an image/video course material queues a
+`MediaJob` in the same transaction. The `process_media` worker renders
+downscaled JPEG and WebP copies (a poster frame first, for videos) on a
+thread pool and stores them under ``renditions/``. Pillow never copies EXIF
+or other metadata into the renditions. Only claiming jobs and saving the
+results touch the database, and both happen on the worker's main thread.
+"""
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from main.models import CourseMaterial, MediaJob, Profile
+
+logger = logging.getLogger(__name__)
+
+# Models with renditions, and the file field they are made from.
+SOURCE_FIELDS = {
+    Profile: 'profile_pic',
+    CourseMaterial: 'file',
+}
+
+
+class NoPosterFrame(Exception):
+    """ffmpeg is not installed or could not decode a frame."""
+
+
+def source_file(instance):
+    """The file renditions should be made from, or None if the instance has none."""
+    if isinstance(instance, CourseMaterial) and instance.material_type not in ('image', 'video'):
+        return None
+    field_file = getattr(instance, SOURCE_FIELDS[type(instance)])
+    return field_file if field_file else None
+
+
+def needs_renditions(instance):
+    field_file = source_file(instance)
+    return field_file is not None and instance.renditions.get('source') != field_file.name
+
+
+def enqueue_renditions(instance):
+    """Queue a rendition job for the instance's current file; repeats are no-ops."""
+    field_file = source_file(instance)
+    label = instance._meta.label
+    MediaJob.objects.bulk_create(
+        [MediaJob(
+            idempotency_key=f'{label}:{instance.pk}:{field_file.name}',
+            model=label,
+            object_id=instance.pk,
+            field=field_file.field.name,
+            source=field_file.name,
+        )],
+        ignore_conflicts=True,
+    )
+
+
+def _flatten(image):
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_image(image, prefix):
+    """Save every MEDIA_RENDITIONS size of `image` as JPEG and WebP; return their descriptions."""
+    # Lets the JPEG decoder scale down while decoding instead of after.
+    image.draft('RGB', (max(settings.MEDIA_RENDITIONS.values()),) * 2)
+    image = _flatten(image)
+    sizes = {}
+    for name, edge in settings.MEDIA_RENDITIONS.items():
+        copy = image.copy()
+        copy.thumbnail((edge, edge), Image.LANCZOS)
+        entry = {'width': copy.width, 'height': copy.height}
+        for fmt, ext, options in (
+            ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+            ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+        ):
+            buffer = io.BytesIO()
+            copy.save(buffer, fmt, **options)
+            entry[ext] = default_storage.save(f'{prefix}-{name}.{ext}', ContentFile(buffer.getvalue()))
+        sizes[name] = entry
+    return sizes
+
+
+def poster_frame(name):
+    """Decode one frame of the video `name` with ffmpeg and return it as an image."""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise NoPosterFrame("ffmpeg is not installed")
+    try:
+        path, cleanup = default_storage.path(name), None
+    except NotImplementedError:
+        # Remote storage: ffmpeg needs a local copy.
+        with default_storage.open(name, 'rb') as src, tempfile.NamedTemporaryFile(delete=False) as dst:
+            shutil.copyfileobj(src, dst)
+        path, cleanup = dst.name, dst.name
+    try:
+        command = [
+            ffmpeg, '-v', 'error', '-ss', str(settings.MEDIA_POSTER_OFFSET_SECONDS), '-i', path,
+            '-frames:v', '1', '-f', 'image2pipe', '-vcodec', 'png', '-',
+        ]
+        result = subprocess.run(command, capture_output=True, timeout=120)
+        if not result.stdout:
+            # Shorter than the offset: fall back to the first frame.
+            command[3] = '0'
+            result = subprocess.run(command, capture_output=True, timeout=120)
+        if not result.stdout:
+            raise NoPosterFrame(result.stderr.decode(errors='replace').strip() or "no frame decoded")
+        return Image.open(io.BytesIO(result.stdout))
+    finally:
+        if cleanup:
+            os.unlink(cleanup)
+
+
+def build_renditions(job):
+    """Render the files for `job`. Touches storage only, so it is safe on a pool thread."""
+    model = apps.get_model(job.model)
+    prefix = f'renditions/{model._meta.model_name}/{job.object_id}/{os.path.splitext(os.path.basename(job.source))[0]}'
+    renditions = {'source': job.source}
+    if model is CourseMaterial and os.path.splitext(job.source)[1].lower() in ('.mp4', '.mov', '.avi'):
+        try:
+            frame = poster_frame(job.source)
+        except NoPosterFrame as e:
+            logger.info("No poster frame for %s: %s", job.source, e)
+            return renditions
+        buffer = io.BytesIO()
+        _flatten(frame).save(buffer, 'JPEG', quality=85)
+        renditions['poster'] = default_storage.save(f'{prefix}-poster.jpg', ContentFile(buffer.getvalue()))
+        renditions['sizes'] = render_image(frame, prefix)
+    else:
+        with default_storage.open(job.source, 'rb') as f, Image.open(f) as image:
+            renditions['sizes'] = render_image(image, prefix)
+    return renditions
+
+
+def rendition_files(renditions):
+    files = [renditions['poster']] if renditions.get('poster') else []
+    for entry in renditions.get('sizes', {}).values():
+        files += [entry[ext] for ext in ('jpg', 'webp') if ext in entry]
+    return files
+
+
+def save_renditions(job, renditions):
+    """Store `renditions` on the job's instance, unless its file changed meanwhile."""
+    model = apps.get_model(job.model)
+    instance = model.objects.filter(pk=job.object_id).first()
+    if instance is None or getattr(instance, job.field).name != job.source:
+        for name in rendition_files(renditions):
+            default_storage.delete(name)
+        return
+    stale = set(rendition_files(instance.renditions)) - set(rendition_files(renditions))
+    instance.renditions = renditions
+    # A regular save, so the course payload cache is invalidated as well.
+    instance.save(update_fields=['renditions', 'updated_at'])
+    for name in stale:
+        default_storage.delete(name)
+
+
+def claim_jobs(batch_size):
+    """Lease up to `batch_size` due jobs to this worker (see `notifications.claim_batch`)."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = MediaJob.objects.filter(status='pending', next_attempt_at__lte=now).order_by('next_attempt_at')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:batch_size])
+        MediaJob.objects.filter(pk__in=ids).update(
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=settings.MEDIA_JOB_LEASE_SECONDS),
+        )
+    return list(MediaJob.objects.filter(pk__in=ids).order_by('next_attempt_at', 'pk'))
+
+
+def process_batch(executor, batch_size=None):
+    """Render one batch of jobs on `executor`; returns ``(done, failed)``."""
+    jobs = claim_jobs(batch_size or settings.MEDIA_JOB_BATCH_SIZE)
+    futures = [(job, executor.submit(build_renditions, job)) for job in jobs]
+    done = failed = 0
+    for job, future in futures:
+        try:
+            save_renditions(job, future.result())
+        except Exception as e:
+            logger.warning("Media job %s failed (attempt %s): %s", job.pk, job.attempts, e)
+            if job.attempts >= settings.MEDIA_JOB_MAX_ATTEMPTS:
+                changes = {'status': 'failed'}
+            else:
+                changes = {'next_attempt_at': timezone.now() + timedelta(seconds=30 * 2 ** (job.attempts - 1))}
+            MediaJob.objects.filter(pk=job.pk).update(last_error=str(e), **changes)
+            failed += 1
+        else:
+            MediaJob.objects.filter(pk=job.pk).update(status='done', finished_at=timezone.now(), last_error='')
+            done += 1
+    return done, failed
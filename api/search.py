@@ -0,0 +1,184 @@
+"""
+Course search with facet counts.
+
+On Postgres, each course has a weighted `search_vector`, maintained by
+triggers (migrations 0011 and 0015) and served by a GIN index. Weights: A
+for the title, B for category, language and framework, C for the
+description and D for its material titles. Other databases use
+`InvertedIndex`, built in process from the same fields and rebuilt
+whenever the catalogue's count/updated_at fingerprint changes.
+
+Both backends read the same words: runs of letters and digits
+(`TOKEN_RE`), lowercased and neither stemmed nor stop-worded, so
+"vue.js", "software_dev" and "e-commerce" are two words each everywhere.
+They match the same courses, with two known differences. First, on a
+database whose LC_CTYPE is C, Postgres treats non-ASCII letters as
+separators, so create production databases with a UTF-8 locale. Second,
+ts_rank also weighs how often a word occurs, so courses with close scores
+can come back in a different order.
+
+Every term must match, and each matches as a prefix so partial words work
+while typing. Facet counts come from one grouped query over the text
+matches. Each dimension is counted with only the other dimensions'
+filters applied, so a selected category still shows its alternatives.
+"""
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Count, F, Value, FloatField
+
+from main.models import Course, CourseMaterial
+from .conditional import collect_state
+
+FACETS = ('category', 'language', 'framework')
+MAX_TERMS = 8
+# ts_rank's default weights, so both backends order results alike.
+WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+TOKEN_RE = re.compile(r'[^\W_]+')  # main_search_words() in migration 0015 splits the same way
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def parse_terms(text):
+    return TOKEN_RE.findall((text or '').lower())[:MAX_TERMS]
+
+
+def _matches(text, terms):
+    tokens = TOKEN_RE.findall((text or '').lower())
+    return all(any(token.startswith(term) for token in tokens) for term in terms)
+
+
+class InvertedIndex:
+    """``token -> {course_id: weight}`` over the same fields as the Postgres vector."""
+
+    def __init__(self, state, courses, material_titles):
+        self.state = state
+        self.courses = {course['id']: course for course in courses}
+        postings = defaultdict(dict)
+        for course in courses:
+            fields = (
+                ('A', course['title']),
+                ('B', ' '.join(course[facet] for facet in FACETS)),
+                ('C', course['description']),
+                ('D', ' '.join(material_titles.get(course['id'], ()))),
+            )
+            for weight, text in fields:
+                for token in TOKEN_RE.findall((text or '').lower()):
+                    posting = postings[token]
+                    posting[course['id']] = max(posting.get(course['id'], 0), WEIGHTS[weight])
+        self.tokens = sorted(postings)
+        self.postings = dict(postings)
+
+    def _prefix(self, term):
+        hits = {}
+        for token in self.tokens[bisect_left(self.tokens, term):]:
+            if not token.startswith(term):
+                break
+            for course_id, weight in self.postings[token].items():
+                hits[course_id] = max(hits.get(course_id, 0), weight)
+        return hits
+
+    def match(self, terms):
+        """``{course_id: score}`` for courses matching every term (all courses when there are none)."""
+        if not terms:
+            return dict.fromkeys(self.courses, 0.0)
+        scores = None
+        for term in terms:
+            hits = self._prefix(term)
+            scores = hits if scores is None else {pk: scores[pk] + hits[pk] for pk in scores.keys() & hits.keys()}
+            if not scores:
+                return {}
+        return scores
+
+
+def get_index():
+    """The in-process index, rebuilt if courses or materials changed since it was built."""
+    global _index
+    state = collect_state(courses=Course.objects.all(), materials=CourseMaterial.objects.all())
+    with _index_lock:
+        if _index is None or _index.state != state:
+            material_titles = defaultdict(list)
+            for course_id, title in CourseMaterial.objects.order_by('pk').values_list('course_id', 'title'):
+                material_titles[course_id].append(title)
+            courses = list(Course.objects.order_by('pk').values('id', 'title', 'description', *FACETS))
+            _index = InvertedIndex(state, courses, material_titles)
+        return _index
+
+
+def facet_counts(combinations, filters):
+    """Counts per facet value from ``(category, language, framework, count)`` rows."""
+    counts = {facet: Counter() for facet in FACETS}
+    for *values, count in combinations:
+        values = dict(zip(FACETS, values))
+        for facet in FACETS:
+            if all(values[other] == filters[other] for other in FACETS if other != facet and filters.get(other)):
+                counts[facet][values[facet]] += count
+    return {
+        facet: [
+            {'value': value, 'label': label, 'count': counts[facet][value]}
+            for value, label in Course._meta.get_field(facet).choices
+        ]
+        for facet in FACETS
+    }
+
+
+def search_query(terms):
+    """A prefix-matching tsquery requiring every term."""
+    # Terms are letters and digits only, so they are safe to place in raw tsquery syntax.
+    return SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config='simple')
+
+
+def _postgres_search(terms, filters, limit, offset):
+    matched = Course.objects.all()
+    if terms:
+        query = search_query(terms)
+        matched = matched.filter(search_vector=query)
+        rank, ordering = SearchRank(F('search_vector'), query), ('-rank', 'pk')
+    else:
+        rank, ordering = Value(0.0, output_field=FloatField()), ('title', 'pk')
+    combinations = list(matched.order_by().values_list(*FACETS).annotate(count=Count('pk')))
+    selected = matched.filter(**{facet: value for facet, value in filters.items() if value}).annotate(rank=rank)
+    page = list(selected.order_by(*ordering).values('id', 'title', 'description', *FACETS, 'rank')[offset:offset + limit])
+    total = sum(count for *values, count in combinations if all(
+        not filters.get(facet) or value == filters[facet] for facet, value in zip(FACETS, values)
+    ))
+    return total, page, combinations
+
+
+def _index_search(terms, filters, limit, offset):
+    index = get_index()
+    scores = index.match(terms)
+    combinations = Counter(tuple(index.courses[pk][facet] for facet in FACETS) for pk in scores)
+    selected = [
+        pk for pk in scores
+        if all(not filters.get(facet) or index.courses[pk][facet] == filters[facet] for facet in FACETS)
+    ]
+    if terms:
+        selected.sort(key=lambda pk: (-scores[pk], pk))
+    else:
+        selected.sort(key=lambda pk: (index.courses[pk]['title'], pk))
+    page = [{**index.courses[pk], 'rank': scores[pk]} for pk in selected[offset:offset + limit]]
+    return len(selected), page, [(*values, count) for values, count in combinations.items()]
+
+
+def search_courses(text, filters, limit, offset=0):
+    """Return ``{'count', 'results', 'facets'}`` for the query `text` and exact-match facet `filters`."""
+    terms = parse_terms(text)
+    backend = _postgres_search if connection.vendor == 'postgresql' else _index_search
+    total, page, combinations = backend(terms, filters, limit, offset)
+
+    materials = defaultdict(list)
+    if terms and page:
+        rows = CourseMaterial.objects.filter(course_id__in=[row['id'] for row in page]).order_by('pk')
+        for material in rows.values('id', 'course_id', 'title', 'material_type'):
+            if _matches(material['title'], terms):
+                materials[material.pop('course_id')].append(material)
+    for row in page:
+        row['rank'] = round(float(row['rank']), 4)
+        row['matched_materials'] = materials.get(row['id'], [])
+    return {'count': total, 'results': page, 'facets': facet_counts(combinations, filters)}
@@ -0,0 +1,130 @@
+"""
+Reproducible benchmark data.
+
+`seed` writes users, courses, materials, timetables, internships and
+projects with `bulk_create`, in ratios close to production. The same
+`seed` value gives the same rows, except that dates are laid out relative
+to today so upcoming-session windows always have data. Writes are
+announced with `bulk_saved` and `bulk_written`, as imports are, so
+internship IDs, counters, caches and dashboards stay consistent.
+
+Seeded rows are marked (emails at SEED_DOMAIN, course titles starting
+with SEED_PREFIX) so `flush_seed` can remove them again.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from main.models import Course, CourseMaterial, CustomUser, Internship, Project, Timetable
+from .bulk import bulk_saved, bulk_written
+
+SEED_DOMAIN = 'seed.invalid'
+SEED_PREFIX = '[seed] '
+
+USERS_PER_COURSE = 25
+MATERIALS_PER_COURSE = 8
+SESSIONS_PER_COURSE = 24
+PROJECTS_PER_USER = 0.25
+# How many internships a user has, and the chance of each.
+INTERNSHIPS_PER_USER = ((0, 0.05), (1, 0.85), (2, 0.10))
+INTERNSHIP_STATUSES = (('Ongoing', 0.60), ('Pending', 0.20), ('Completed', 0.15), ('Cancelled', 0.05))
+MATERIAL_TYPES = (('pdf', 0.70), ('video', 0.20), ('image', 0.10))
+EXTENSIONS = {'pdf': 'pdf', 'video': 'mp4', 'image': 'jpg'}
+DURATION_MONTHS = (3, 6, 9, 12)
+
+
+def _pick(rng, weighted):
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights)[0]
+
+
+def _create(model, objects, batch_size):
+    objects = model.objects.bulk_create(objects, batch_size=batch_size)
+    bulk_saved.send(sender=model, created=objects, updated=[], previous={})
+    transaction.on_commit(lambda: bulk_written.send(sender=model, instances=objects))
+    return objects
+
+
+def seed(users, seed=0, batch_size=1000):
+    """Create `users` users and everything that hangs off them; returns ``{model name: rows created}``."""
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    now = timezone.now().replace(minute=0, second=0, microsecond=0)
+    # One hash for every seeded user: hashing each would dominate the run.
+    password = make_password('seed-password')
+
+    with transaction.atomic():
+        start = CustomUser.objects.filter(email__endswith=f'@{SEED_DOMAIN}').count()
+        first_course = Course.objects.filter(title__startswith=SEED_PREFIX).count()
+        people = CustomUser.objects.bulk_create(
+            [CustomUser(email=f'user{start + i}@{SEED_DOMAIN}', password=password) for i in range(users)],
+            batch_size=batch_size,
+        )
+
+        courses = _create(Course, [
+            Course(
+                title=f'{SEED_PREFIX}Course {first_course + i}',
+                description="Seeded for benchmarks.",
+                category=rng.choice(Course.COURSE_CHOICES)[0],
+                language=rng.choice(Course.LANGUAGE_CHOICES)[0],
+                framework=rng.choice(Course.FRAMEWORK_CHOICES)[0],
+            )
+            for i in range(max(1, users // USERS_PER_COURSE))
+        ], batch_size)
+
+        materials, sessions = [], []
+        for course in courses:
+            for i in range(MATERIALS_PER_COURSE):
+                material_type = _pick(rng, MATERIAL_TYPES)
+                name = f'course_materials/seed/{course.pk}-{i}.{EXTENSIONS[material_type]}'
+                # No file is written, so mark renditions as done instead of queueing jobs that would fail.
+                materials.append(CourseMaterial(
+                    course=course, title=f'Material {i}', material_type=material_type, file=name, renditions={'source': name},
+                ))
+            # Weekly sessions, half behind and half ahead of today.
+            first = now - timedelta(weeks=SESSIONS_PER_COURSE // 2, hours=rng.randrange(0, 24 * 7))
+            for i in range(SESSIONS_PER_COURSE):
+                begins = first + timedelta(weeks=i)
+                sessions.append(Timetable(
+                    course=course, title=f'Week {i + 1}', start_time=begins, end_time=begins + timedelta(hours=2),
+                    is_live_session=rng.random() < 0.3, location=rng.choice(['Online', 'Lab 1', 'Lab 2', None]),
+                ))
+        materials = _create(CourseMaterial, materials, batch_size)
+        sessions = _create(Timetable, sessions, batch_size)
+
+        internships, projects = [], []
+        for user in people:
+            for course in rng.sample(courses, min(len(courses), _pick(rng, INTERNSHIPS_PER_USER))):
+                starting = today - timedelta(days=rng.randrange(0, 365))
+                internships.append(Internship(
+                    intern=user, course=course, starting_date=starting,
+                    completion_date=starting + timedelta(days=30 * rng.choice(DURATION_MONTHS)),
+                    status=_pick(rng, INTERNSHIP_STATUSES),
+                ))
+            if rng.random() < PROJECTS_PER_USER:
+                projects.append(Project(
+                    user=user, email=user.email, title=f'Project for {user.email}', description="Seeded for benchmarks.",
+                    status=rng.choice(['Pending', 'Processing', 'Completed']),
+                ))
+        internships = _create(Internship, internships, batch_size)
+        projects = _create(Project, projects, batch_size)
+
+    return {
+        'users': len(people),
+        'courses': len(courses),
+        'materials': len(materials),
+        'timetables': len(sessions),
+        'internships': len(internships),
+        'projects': len(projects),
+    }
+
+
+def flush_seed():
+    """Delete every seeded row; returns the number of objects deleted."""
+    with transaction.atomic():
+        deleted, _ = CustomUser.objects.filter(email__endswith=f'@{SEED_DOMAIN}').delete()
+        courses, _ = Course.objects.filter(title__startswith=SEED_PREFIX).delete()
+    return deleted + courses
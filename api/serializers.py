@@ -1,10 +1,123 @@
+from django.db.models import QuerySet
+from django.db.models.manager import BaseManager
 from rest_framework import serializers
 from main.models import Internship, Profile, CustomUser, Course, CourseMaterial, Timetable, InternshipApplication
 
 from rest_framework import serializers
-from main.models import Project
+from main.models import Project, ChunkedUpload
+from main.transitions import MACHINES, effective_status
+from . import cache
+import os
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.urls import reverse
 
-class ProjectSerializer(serializers.ModelSerializer):
+
+class EagerLoadingMixin:
+    """
+    Lets a serializer declare the relations it reads so querysets can be
+    prepared up front instead of issuing one query per nested row.
+
+    Nested serializers that also use this mixin are walked automatically:
+    a `many=True` child becomes a prefetch, a single child a select_related.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def get_related_lookups(cls, prefix='', in_prefetch=False):
+        select = [prefix + name for name in cls.select_related_fields]
+        prefetch = [prefix + name for name in cls.prefetch_related_fields]
+        if in_prefetch:
+            prefetch, select = select + prefetch, []
+
+        for name, field in cls._declared_fields.items():
+            child = getattr(field, 'child', field)
+            if not isinstance(child, EagerLoadingMixin):
+                continue
+            path = prefix + (field.source or name)
+            many = child is not field
+            if many or in_prefetch:
+                prefetch.append(path)
+            else:
+                select.append(path)
+            nested_select, nested_prefetch = child.get_related_lookups(path + '__', in_prefetch or many)
+            select.extend(nested_select)
+            prefetch.extend(nested_prefetch)
+        return select, prefetch
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        select, prefetch = cls.get_related_lookups()
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        # Querysets handed to `many=True` are optimized transparently.
+        if args and isinstance(args[0], QuerySet):
+            args = (cls.setup_eager_loading(args[0]),) + args[1:]
+        return super().many_init(*args, **kwargs)
+
+def parse_fields(value):
+    """Turn ``id,course.title`` into ``{'id': {}, 'course': {'title': {}}}``."""
+    tree = {}
+    for path in filter(None, (part.strip() for part in value.split(','))):
+        node = tree
+        for name in path.split('.'):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def prune(data, tree):
+    """Drop everything from `data` that is not named in `tree`."""
+    if not tree:
+        return data
+    if isinstance(data, list):
+        return [prune(item, tree) for item in data]
+    if isinstance(data, dict):
+        return {key: prune(value, tree[key]) for key, value in data.items() if key in tree}
+    return data
+
+
+class SparseFieldsetMixin:
+    """
+    Honours ``?fields=`` on list endpoints, e.g. ``?fields=id,status,course.title``.
+
+    Unrequested top-level fields are never serialized; nested payloads are
+    trimmed after rendering.
+    """
+
+    def get_field_tree(self):
+        # Only the serializer at the top of a response (or the child of a
+        # top-level list) reads the parameter.
+        if not (self.root is self or self.parent is self.root):
+            return {}
+        request = self.context.get('request')
+        value = request.query_params.get('fields') if request is not None else None
+        return parse_fields(value) if value else {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        tree = self.get_field_tree()
+        if tree:
+            fields = {name: field for name, field in fields.items() if name in tree}
+        return fields
+
+    def to_representation(self, instance):
+        ret = super().to_representation(instance)
+        for name, subtree in self.get_field_tree().items():
+            if subtree and name in ret:
+                ret[name] = prune(ret[name], subtree)
+        return ret
+
+
+class ProjectSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = ['id', 'user', 'email', 'title', 'description', 'created_at', 'expected_completion_date', 'status', 'payment_status']
@@ -14,27 +127,86 @@ class CustomUserSerializer(serializers.ModelSerializer):
         model = CustomUser
         fields = ['id', 'email', 'is_staff', 'is_active']
         
+class RenditionsField(serializers.ReadOnlyField):
+    """URLs of the renditions written by `process_media`, e.g. ``{'thumb': {'width', 'height', 'jpg', 'webp'}}``."""
+
+    def to_representation(self, value):
+        sizes = {
+            name: {**entry, 'jpg': default_storage.url(entry['jpg']), 'webp': default_storage.url(entry['webp'])}
+            for name, entry in value.get('sizes', {}).items()
+        }
+        if value.get('poster'):
+            sizes['poster'] = default_storage.url(value['poster'])
+        return sizes
+
 class ProfileSerializer(serializers.ModelSerializer):
+    renditions = RenditionsField()
+
     class Meta:
         model = Profile
-        fields = ['id', 'user', 'profile_pic', 'first_name', 'last_name', 'date_of_birth']
+        fields = ['id', 'user', 'profile_pic', 'renditions', 'first_name', 'last_name', 'date_of_birth']
         
 class InternshipApplicationSerializer(serializers.ModelSerializer):
     class Meta:
         model = InternshipApplication
         fields = ['email', 'mode']
         
-class CourseMaterialSerializer(serializers.ModelSerializer):
+class CourseMaterialSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    # Enrollment-checked, range-capable path; the raw `file` URL would bypass the check.
+    download_url = serializers.SerializerMethodField()
+    renditions = RenditionsField()
+
     class Meta:
         model = CourseMaterial
-        fields = ['id', 'title', 'material_type', 'file', 'uploaded_at']
+        fields = ['id', 'title', 'material_type', 'download_url', 'renditions', 'uploaded_at']
 
-class TimetableSerializer(serializers.ModelSerializer):
+    def get_download_url(self, obj):
+        return reverse('material-download', args=[obj.pk])
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChunkedUpload
+        fields = ['id', 'filename', 'size', 'offset', 'status']
+        read_only_fields = ['id', 'offset', 'status']
+
+    def validate_filename(self, value):
+        value = os.path.basename(value)
+        for validator in CourseMaterial._meta.get_field('file').validators:
+            try:
+                validator(File(None, name=value))
+            except DjangoValidationError as e:
+                raise serializers.ValidationError(e.messages)
+        return value
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Size must be between 1 and {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+class TransitionSerializer(serializers.Serializer):
+    MODELS = {'project': Project, 'internship': Internship}
+
+    model = serializers.ChoiceField(choices=list(MODELS))
+    field = serializers.CharField(default='status')
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=settings.TRANSITION_MAX_IDS)
+    target = serializers.CharField()
+    note = serializers.CharField(max_length=255, allow_blank=True, default='')
+
+    def validate(self, attrs):
+        attrs['model'] = self.MODELS[attrs['model']]
+        machine = MACHINES.get((attrs['model']._meta.label, attrs['field']))
+        if machine is None:
+            raise serializers.ValidationError({'field': [f'"{attrs["field"]}" has no transitions.']})
+        if not machine.sources(attrs['target']):
+            raise serializers.ValidationError({'target': [f"Expected one of: {', '.join(machine.targets)}."]})
+        return attrs
+
+class TimetableSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Timetable
         fields = ['id', 'title', 'start_time', 'end_time', 'is_live_session', 'location']
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     materials = CourseMaterialSerializer(many=True, read_only=True)
     timetables = TimetableSerializer(many=True, read_only=True)  # Include timetables
 
@@ -42,11 +214,62 @@ class CourseSerializer(serializers.ModelSerializer):
         model = Course
         fields = ['id', 'title', 'description', 'category', 'language', 'framework', 'created_at', 'materials', 'timetables']
 
-class InternshipSerializer(serializers.ModelSerializer):
-    course = CourseSerializer(read_only=True)
+class CachedCourseField(serializers.Field):
+    """Renders a course from the versioned catalogue cache instead of the database."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return instance.course_id
+
+    def to_representation(self, course_id):
+        payloads = self.context.get('course_payloads')
+        if payloads is None or course_id not in payloads:
+            payloads = cache.get_course_payloads([course_id])
+        return payloads.get(course_id)
+
+
+class InternshipListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        internships = list(data.all() if isinstance(data, BaseManager) else data)
+        tree = self.child.get_field_tree()
+        if not tree or 'course' in tree:
+            # Fetch every course payload in one round-trip before rendering the rows.
+            self._context = {
+                **self._context,
+                'course_payloads': cache.get_course_payloads(internship.course_id for internship in internships),
+            }
+        return super().to_representation(internships)
+
+
+class InternshipSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    course = CachedCourseField()
+    duration = serializers.CharField(read_only=True)
+    status = serializers.SerializerMethodField()
 
     class Meta:
         model = Internship
         fields = '__all__'
+        list_serializer_class = InternshipListSerializer
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return super().setup_eager_loading(queryset).with_effective_status()
+
+    def get_status(self, internship):
+        """The status the dates imply, which the stored one only catches up with nightly."""
+        if hasattr(internship, 'effective_status'):
+            return internship.effective_status
+        return effective_status(internship.status, internship.starting_date, internship.completion_date)
+
+
+
 
+class InternshipRowSerializer(InternshipSerializer):
+    """An internship with its course as an id; the dashboard read model stores courses separately."""
+    course = serializers.PrimaryKeyRelatedField(read_only=True)
 
+    class Meta(InternshipSerializer.Meta):
+        list_serializer_class = serializers.ListSerializer
@@ -0,0 +1,167 @@
+"""
+Upcoming sessions across an intern's courses, and iCalendar feeds.
+
+A session overlaps the window [start, end) when ``start_time < end`` and
+``end_time > start``. `Timetable.clean()` caps sessions at
+TIMETABLE_MAX_SESSION_LENGTH, which adds a lower bound on start_time. The
+whole predicate is then a range scan of the (course, start_time) index.
+Each course's first rows are read in index order, and the combined rows are
+sorted in Python.
+
+Calendar feeds are assembled from one block of VEVENTs per course, kept in
+the versioned catalogue cache. A timetable change rebuilds only its course's
+block.
+"""
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from main.models import Course, Timetable
+from main.transitions import effective_status_q
+from . import cache
+
+CALENDAR_SALT = 'api.sessions.calendar'
+
+
+def enrolled_courses(user_id):
+    """``{course_id: title}`` for the user's ongoing internships."""
+    return dict(
+        Course.objects.filter(effective_status_q(['Ongoing'], prefix='internships__'), internships__intern_id=user_id)
+        .order_by('pk').distinct().values_list('pk', 'title')
+    )
+
+
+def _parse_moment(name, value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({name: "Use an ISO 8601 date or datetime."})
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_window(params):
+    """Read ``from``, ``to`` and ``limit`` from query parameters, with defaults and bounds."""
+    try:
+        start = _parse_moment('from', params['from']) if params.get('from') else timezone.now()
+        end = _parse_moment('to', params['to']) if params.get('to') else start + settings.UPCOMING_SESSIONS_DEFAULT_WINDOW
+    except ValueError:
+        raise ValidationError({'from': "Invalid date."})
+    if end <= start:
+        raise ValidationError({'to': "Must be after `from`."})
+    if end - start > settings.UPCOMING_SESSIONS_MAX_WINDOW:
+        raise ValidationError({'to': f"Windows are limited to {settings.UPCOMING_SESSIONS_MAX_WINDOW.days} days."})
+    try:
+        limit = int(params.get('limit', 50))
+    except ValueError:
+        raise ValidationError({'limit': "Must be an integer."})
+    return start, end, max(1, min(limit, settings.UPCOMING_SESSIONS_MAX_LIMIT))
+
+
+def overlapping(start, end, **filters):
+    return Timetable.objects.filter(
+        start_time__gte=start - settings.TIMETABLE_MAX_SESSION_LENGTH,
+        start_time__lt=end,
+        end_time__gt=start,
+        **filters,
+    ).order_by('start_time', 'id')
+
+
+def upcoming_sessions(course_ids, start, end, limit):
+    """The first `limit` sessions of `course_ids` overlapping [start, end), in start order."""
+    course_ids = list(course_ids)
+    if not course_ids:
+        return []
+    if len(course_ids) == 1 or not connection.features.supports_slicing_ordering_in_compound:
+        return list(overlapping(start, end, course_id__in=course_ids)[:limit])
+
+    # One index range scan per course, sent as a single UNION ALL round trip.
+    per_course = [overlapping(start, end, course_id=course_id)[:limit] for course_id in course_ids]
+    rows = per_course[0].union(*per_course[1:], all=True)
+    # UNION ALL promises no row order, so sort the at most len(course_ids) * limit rows here.
+    return sorted(rows, key=lambda row: (row.start_time, row.pk))[:limit]
+
+
+def calendar_token(user_id):
+    """Opaque token for the user's calendar feed URL, which calendar apps fetch without credentials."""
+    return signing.dumps(str(user_id), salt=CALENDAR_SALT)
+
+
+def user_for_calendar_token(token):
+    try:
+        return signing.loads(token, salt=CALENDAR_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def _escape(text):
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _fold(line):
+    # RFC 5545: at most 75 octets per line; continuation lines start with a space.
+    data = line.encode()
+    if len(data) <= 75:
+        return line
+    parts, limit = [], 75
+    while data:
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1  # don't split a UTF-8 sequence
+        parts.append(data[:cut].decode())
+        data, limit = data[cut:], 74
+    return '\r\n '.join(parts)
+
+
+def _stamp(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _render_events(course_ids):
+    titles = dict(Course.objects.filter(pk__in=course_ids).values_list('pk', 'title'))
+    since = timezone.now() - timezone.timedelta(days=settings.CALENDAR_HISTORY_DAYS)
+    blocks = {course_id: [] for course_id in titles}
+    sessions = Timetable.objects.filter(course_id__in=titles, end_time__gte=since).order_by('course_id', 'start_time', 'id')
+    for session in sessions:
+        lines = [
+            'BEGIN:VEVENT',
+            f'UID:timetable-{session.pk}@quantumstack',
+            f'DTSTAMP:{_stamp(session.updated_at)}',
+            f'DTSTART:{_stamp(session.start_time)}',
+            f'DTEND:{_stamp(session.end_time)}',
+            f'SUMMARY:{_escape(titles[session.course_id] + ": " + session.title)}',
+        ]
+        if session.location:
+            lines.append(f'LOCATION:{_escape(session.location)}')
+        lines.append('END:VEVENT')
+        blocks[session.course_id].extend(_fold(line) for line in lines)
+    return {course_id: '\r\n'.join(lines) for course_id, lines in blocks.items()}
+
+
+def calendar_versions(course_ids):
+    """Validator state for `conditional.respond_conditionally`."""
+    return {str(course_id): (version, None) for course_id, version in cache.get_course_versions(course_ids).items()}
+
+
+def render_calendar(name, course_ids):
+    """A complete VCALENDAR for `course_ids`, built from cached per-course event blocks."""
+    # The history cut-off moves daily, so blocks are cached per day as well as per course version.
+    blocks = cache.read_through(f'ical:{timezone.now().date()}', course_ids, _render_events)
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Quantum Stack//Timetable//EN',
+        'CALSCALE:GREGORIAN',
+        _fold(f'X-WR-CALNAME:{_escape(name)}'),
+    ]
+    lines.extend(blocks[course_id] for course_id in course_ids if blocks.get(course_id))
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines) + '\r\n'
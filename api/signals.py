@@ -0,0 +1,136 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from main.identifiers import assign_internship_ids
+from main.transitions import transitioned
+from main.models import Course, CourseMaterial, Internship, InternshipApplication, Profile, Project, Timetable
+from .bulk import bulk_saved, bulk_written
+from .cache import bump_course_version, invalidate_course
+from .dashboard import refresh_courses, refresh_internship, refresh_internships
+from .metrics import instrument
+from .renditions import enqueue_renditions, needs_renditions
+from .stats import COUNTED, count_bulk, count_deleted, count_saved, count_transitions
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    instrument(connection)
+
+
+@receiver([post_save, post_delete], sender=Course)
+def invalidate_course_cache(sender, instance, **kwargs):
+    invalidate_course(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=CourseMaterial)
+@receiver([post_save, post_delete], sender=Timetable)
+def invalidate_course_children_cache(sender, instance, **kwargs):
+    invalidate_course(instance.course_id)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=CourseMaterial)
+def queue_renditions(sender, instance, **kwargs):
+    if needs_renditions(instance):
+        enqueue_renditions(instance)
+
+
+@receiver(bulk_written, sender=CourseMaterial)
+def queue_imported_renditions(sender, instances, **kwargs):
+    for instance in instances:
+        if needs_renditions(instance):
+            enqueue_renditions(instance)
+
+
+@receiver(pre_save, sender=Project)
+@receiver(pre_save, sender=Internship)
+def remember_previous_row(sender, instance, **kwargs):
+    # Stat counters move from the stored values, and an internship moved to
+    # another intern must leave the old owner's dashboard.
+    instance._previous_row = None
+    if instance.pk is not None:
+        fields = [*COUNTED[sender.__name__][1], 'created_at', *(['intern_id'] if sender is Internship else [])]
+        instance._previous_row = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver([post_save, post_delete], sender=Internship)
+def refresh_internship_dashboard(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_row', None) or {}
+    intern_ids = {instance.intern_id, previous.get('intern_id')} - {None}
+    refresh_internship(instance.pk, intern_ids)
+
+
+@receiver(post_save, sender=InternshipApplication)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Internship)
+def count_saved_row(sender, instance, created, **kwargs):
+    count_saved(instance, created, getattr(instance, '_previous_row', None))
+
+
+@receiver(post_delete, sender=InternshipApplication)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Internship)
+def count_deleted_row(sender, instance, **kwargs):
+    count_deleted(instance)
+
+
+@receiver([post_save, post_delete], sender=Course)
+def refresh_course_dashboards(sender, instance, **kwargs):
+    refresh_courses([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=CourseMaterial)
+@receiver([post_save, post_delete], sender=Timetable)
+def refresh_course_children_dashboards(sender, instance, **kwargs):
+    refresh_courses([instance.course_id])
+
+
+@receiver(post_save, sender=Internship)
+def assign_internship_id_on_approval(sender, instance, **kwargs):
+    if instance.status in ('Ongoing', 'Completed'):
+        assign_internship_ids([instance.intern_id])
+
+
+@receiver(bulk_written, sender=Internship)
+def assign_internship_ids_after_import(sender, instances, **kwargs):
+    assign_internship_ids({instance.intern_id for instance in instances if instance.status in ('Ongoing', 'Completed')})
+
+
+@receiver(transitioned, sender=Internship)
+def apply_internship_transitions(sender, target, rows, **kwargs):
+    internship_ids = [pk for pk, source in rows]
+    if target in ('Ongoing', 'Completed'):
+        assign_internship_ids(Internship.objects.filter(pk__in=internship_ids).values_list('intern_id', flat=True).distinct())
+    refresh_internships(internship_ids)
+
+
+@receiver(transitioned)
+def count_transitioned_rows(sender, field, target, rows, **kwargs):
+    count_transitions(sender, field, target, rows)
+
+
+@receiver(bulk_saved, sender=InternshipApplication)
+@receiver(bulk_saved, sender=Project)
+@receiver(bulk_saved, sender=Internship)
+def count_bulk_saved_rows(sender, created, updated, previous, **kwargs):
+    count_bulk(sender, created, updated, previous)
+
+
+@receiver(bulk_written)
+def invalidate_bulk_written_courses(sender, instances, **kwargs):
+    if sender is Course:
+        course_ids = {instance.pk for instance in instances}
+    elif sender in (CourseMaterial, Timetable):
+        course_ids = {instance.course_id for instance in instances}
+    else:
+        return
+    # bulk_written is sent after commit, so bump right away.
+    for course_id in course_ids:
+        bump_course_version(course_id)
+    refresh_courses(course_ids)
+
+
+@receiver(bulk_written, sender=Internship)
+def refresh_imported_internship_dashboards(sender, instances, **kwargs):
+    refresh_internships([instance.pk for instance in instances])
@@ -0,0 +1,92 @@
+'use strict';
+// Uploads the CourseMaterial file in Content-Range chunks before the form is
+// submitted, so large videos never pass through a worker in one request.
+// An interrupted upload resumes from the server's offset when the same file
+// is picked again.
+(function() {
+    const CHUNK_SIZE = 5 * 1024 * 1024;
+
+    function csrfToken() {
+        const match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+        return match ? decodeURIComponent(match[1]) : '';
+    }
+
+    async function request(method, url, body, headers) {
+        const response = await fetch(url, {
+            method: method,
+            body: body,
+            credentials: 'same-origin',
+            headers: Object.assign({'X-CSRFToken': csrfToken()}, headers || {}),
+        });
+        const data = await response.json();
+        if (!response.ok && response.status !== 409) {
+            throw new Error(data.detail || JSON.stringify(data));
+        }
+        return data;
+    }
+
+    async function startOrResume(baseUrl, file) {
+        const key = 'chunked-upload:' + [file.name, file.size, file.lastModified].join(':');
+        const saved = localStorage.getItem(key);
+        if (saved) {
+            try {
+                return {key: key, upload: await request('GET', baseUrl + saved + '/')};
+            } catch (e) {
+                localStorage.removeItem(key);
+            }
+        }
+        const upload = await request('POST', baseUrl, JSON.stringify({filename: file.name, size: file.size}),
+                                     {'Content-Type': 'application/json'});
+        localStorage.setItem(key, upload.id);
+        return {key: key, upload: upload};
+    }
+
+    async function upload(baseUrl, file, onProgress) {
+        let {key, upload} = await startOrResume(baseUrl, file);
+        while (upload.status !== 'complete') {
+            const start = upload.offset;
+            const end = Math.min(start + CHUNK_SIZE, file.size) - 1;
+            onProgress(start / file.size);
+            upload = await request('PUT', baseUrl + upload.id + '/', file.slice(start, end + 1), {
+                'Content-Type': 'application/octet-stream',
+                'Content-Range': 'bytes ' + start + '-' + end + '/' + file.size,
+            });
+        }
+        localStorage.removeItem(key);
+        onProgress(1);
+        return upload;
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        const hidden = document.getElementById('id_upload');
+        const input = document.getElementById('id_file');
+        if (!hidden || !input) {
+            return;
+        }
+        const status = document.createElement('p');
+        status.className = 'help';
+        input.insertAdjacentElement('afterend', status);
+        const submits = input.form.querySelectorAll('[type=submit]');
+
+        input.addEventListener('change', async function() {
+            const file = input.files[0];
+            if (!file) {
+                return;
+            }
+            submits.forEach(function(button) { button.disabled = true; });
+            try {
+                const result = await upload(hidden.dataset.uploadUrl, file, function(fraction) {
+                    status.textContent = 'Uploading ' + file.name + ': ' + Math.floor(fraction * 100) + '%';
+                });
+                hidden.value = result.id;
+                // The file is already on the server; don't send it again with the form.
+                input.value = '';
+                status.textContent = 'Uploaded ' + file.name + '. Save to attach it.';
+            } catch (e) {
+                status.textContent = 'Upload failed: ' + e.message + '. Pick the file again to resume.';
+            } finally {
+                submits.forEach(function(button) { button.disabled = false; });
+            }
+        });
+    });
+})();
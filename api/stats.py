@@ -0,0 +1,251 @@
+"""
+Staff statistics over applications, projects and internships.
+
+Counts live in `StatCounter` rows. Examples: metric ``projects.status``
+with key ``Pending``, metric ``internships.course_status`` with key
+``<course id>:Ongoing``, and metric ``applications.day`` with key
+``2026-10-18``. Signal handlers in `api.signals` adjust them in the same
+transaction as the write. Single saves and deletes apply their deltas, and
+batch transitions and bulk writes apply one delta per key. Reading the statistics is one query
+over the counters, whatever the size of the tables, and the shaped result
+is cached in the shared cache for STATS_CACHE_TIMEOUT seconds.
+
+`compute_counters` derives every counter from the live tables;
+`rebuild_stats` uses it to check or repair them.
+"""
+from collections import Counter
+from datetime import date, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+# model name: (metric prefix, counted fields)
+COUNTED = {
+    'InternshipApplication': ('applications', ('mode',)),
+    'Project': ('projects', ('status', 'payment_status')),
+    'Internship': ('internships', ('course_id', 'status')),
+}
+BUCKETS = ('day', 'week', 'month')
+
+
+def _metrics(model_name):
+    prefix, fields = COUNTED[model_name]
+    if model_name == 'Internship':
+        return [f'{prefix}.course_status', f'{prefix}.day']
+    return [f'{prefix}.{field}' for field in fields] + [f'{prefix}.day']
+
+
+def row_keys(model_name, row):
+    """The ``(metric, key)`` counters one row contributes 1 to; `row` maps field names to values."""
+    prefix, fields = COUNTED[model_name]
+    if model_name == 'Internship':
+        keys = [(f'{prefix}.course_status', f"{row['course_id']}:{row['status']}")]
+    else:
+        keys = [(f'{prefix}.{field}', row[field]) for field in fields]
+    if row.get('created_at') is not None:
+        keys.append((f'{prefix}.day', timezone.localdate(row['created_at']).isoformat()))
+    return keys
+
+
+def instance_row(instance):
+    return {field: getattr(instance, field) for field in (*COUNTED[type(instance).__name__][1], 'created_at')}
+
+
+def adjust(changes):
+    """Apply ``{(metric, key): delta}`` to the counters, creating missing rows."""
+    from main.models import StatCounter
+
+    changes = sorted((key, delta) for key, delta in changes.items() if delta)
+    if not changes:
+        return
+    StatCounter.objects.bulk_create(
+        [StatCounter(metric=metric, key=key) for (metric, key), _ in changes], ignore_conflicts=True,
+    )
+    for (metric, key), delta in changes:
+        StatCounter.objects.filter(metric=metric, key=key).update(count=F('count') + delta)
+
+
+def count_saved(instance, created, previous):
+    """Move `instance`'s counters from `previous` (its stored values before the save, if any)."""
+    model_name = type(instance).__name__
+    if not created and previous is None:
+        return
+    changes = Counter(row_keys(model_name, instance_row(instance)))
+    if previous is not None:
+        changes.subtract(row_keys(model_name, previous))
+    adjust(changes)
+
+
+def count_deleted(instance):
+    adjust({key: -1 for key in row_keys(type(instance).__name__, instance_row(instance))})
+
+
+def count_transitions(model, field, target, rows):
+    """Move the counters of a `transition` batch; `rows` are ``(pk, source)`` pairs."""
+    changes = Counter()
+    if model.__name__ == 'Internship':
+        course_ids = dict(model.objects.filter(pk__in=[pk for pk, _ in rows]).values_list('pk', 'course_id'))
+        for pk, source in rows:
+            changes[('internships.course_status', f'{course_ids[pk]}:{source}')] -= 1
+            changes[('internships.course_status', f'{course_ids[pk]}:{target}')] += 1
+    else:
+        metric = f'{COUNTED[model.__name__][0]}.{field}'
+        for pk, source in rows:
+            changes[(metric, source)] -= 1
+            changes[(metric, target)] += 1
+    adjust(changes)
+
+
+def count_bulk(model, created, updated, previous):
+    """Move the counters of a bulk write; `previous` maps each updated pk to the row it replaced."""
+    model_name = model.__name__
+    changes = Counter()
+    for instance in created:
+        changes.update(row_keys(model_name, instance_row(instance)))
+    for instance in updated:
+        old = instance_row(previous[instance.pk])
+        # Imports never change created_at, and their instances do not carry it.
+        changes.update(row_keys(model_name, {**instance_row(instance), 'created_at': old['created_at']}))
+        changes.subtract(row_keys(model_name, old))
+    adjust(changes)
+
+
+def compute_counters(model_names=tuple(COUNTED)):
+    """``{(metric, key): count}`` for `model_names`, from a grouped query per counted dimension and one per daily trend."""
+    counts = Counter()
+    for model_name in model_names:
+        model = apps.get_model('main', model_name)
+        fields = COUNTED[model_name][1]
+        for row in model.objects.order_by().values(*fields).annotate(n=Count('pk')):
+            for key in row_keys(model_name, row):
+                counts[key] += row['n']
+        prefix = COUNTED[model_name][0]
+        days = model.objects.order_by().annotate(day=TruncDate('created_at')).values('day').annotate(n=Count('pk'))
+        for row in days:
+            counts[(f'{prefix}.day', row['day'].isoformat())] += row['n']
+    return counts
+
+
+def rebuild_counters(model_names=tuple(COUNTED)):
+    """
+    Replace the counters of `model_names` with freshly computed ones; returns
+    how many were written. Writers to the counted tables wait until the new
+    counters are committed, so none of their deltas is lost or counted twice.
+    """
+    from main.models import StatCounter
+
+    metrics = [metric for model_name in model_names for metric in _metrics(model_name)]
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            tables = ', '.join(connection.ops.quote_name(apps.get_model('main', name)._meta.db_table) for name in model_names)
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {tables} IN SHARE MODE')
+        # On SQLite this first write takes the database's write lock.
+        StatCounter.objects.filter(metric__in=metrics).delete()
+        counts = compute_counters(model_names)
+        StatCounter.objects.bulk_create(
+            [StatCounter(metric=metric, key=key, count=count) for (metric, key), count in counts.items()],
+            batch_size=1000,
+        )
+    return len(counts)
+
+
+def stored_counters():
+    from main.models import StatCounter
+
+    return {(metric, key): count for metric, key, count in StatCounter.objects.values_list('metric', 'key', 'count')}
+
+
+def _period(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _periods(since, today, bucket):
+    periods, day = [], _period(since, bucket)
+    while day <= today:
+        periods.append(day)
+        day = (day + timedelta(days=32)).replace(day=1) if bucket == 'month' else day + timedelta(days=7 if bucket == 'week' else 1)
+    return periods
+
+
+def _choices(model_name, field, counts):
+    model = apps.get_model('main', model_name)
+    return [
+        {'value': value, 'label': label, 'count': counts.get(value, 0)}
+        for value, label in model._meta.get_field(field).choices
+    ]
+
+
+def build_stats(bucket='day', days=30, today=None):
+    """The statistics payload, from the counters alone."""
+    from main.models import Course, StatCounter
+
+    today = today or timezone.localdate()
+    since = today - timedelta(days=days - 1)
+    rows = StatCounter.objects.filter(
+        ~Q(metric__endswith='.day') | Q(metric__endswith='.day', key__gte=since.isoformat()),
+    ).values_list('metric', 'key', 'count')
+    metrics = {}
+    for metric, key, count in rows:
+        metrics.setdefault(metric, {})[key] = count
+
+    by_course, internship_status = {}, Counter()
+    for key, count in metrics.get('internships.course_status', {}).items():
+        course_id, status = key.split(':', 1)
+        by_course.setdefault(int(course_id), Counter())[status] += count
+        internship_status[status] += count
+    titles = dict(Course.objects.filter(pk__in=list(by_course)).values_list('pk', 'title'))
+
+    trends = {}
+    periods = _periods(since, today, bucket)
+    for model_name, (prefix, _) in COUNTED.items():
+        totals = Counter()
+        for key, count in metrics.get(f'{prefix}.day', {}).items():
+            totals[_period(date.fromisoformat(key), bucket)] += count
+        trends[prefix] = [{'period': period.isoformat(), 'count': totals[period]} for period in periods]
+
+    applications = metrics.get('applications.mode', {})
+    projects = metrics.get('projects.status', {})
+    return {
+        'applications': {
+            'total': sum(applications.values()),
+            'by_mode': _choices('InternshipApplication', 'mode', applications),
+        },
+        'projects': {
+            'total': sum(projects.values()),
+            'by_status': _choices('Project', 'status', projects),
+            'by_payment_status': _choices('Project', 'payment_status', metrics.get('projects.payment_status', {})),
+        },
+        'internships': {
+            'total': sum(internship_status.values()),
+            'by_status': _choices('Internship', 'status', internship_status),
+            'by_course': sorted(
+                (
+                    {'course': course_id, 'title': titles.get(course_id), 'total': sum(counts.values()), 'by_status': dict(counts)}
+                    for course_id, counts in by_course.items() if sum(counts.values())
+                ),
+                key=lambda row: (-row['total'], row['course']),
+            ),
+        },
+        'trends': {'bucket': bucket, 'since': since.isoformat(), **trends},
+        'generated_at': timezone.now(),
+    }
+
+
+def get_stats(bucket='day', days=30):
+    """`build_stats`, cached for STATS_CACHE_TIMEOUT seconds in the shared cache."""
+    key = f'stats:{timezone.localdate().isoformat()}:{bucket}:{days}'
+    stats = caches['shared'].get(key)
+    if stats is None:
+        stats = build_stats(bucket, days)
+        caches['shared'].set(key, stats, settings.STATS_CACHE_TIMEOUT)
+    return stats
@@ -1,3 +1,1389 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.core.files.storage import default_storage
+from django.core.cache import caches
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import connection
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+import msgpack
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from main.models import CustomUser, Course, CourseMaterial, Timetable, Internship, InternshipApplication, Project, OutboxMessage, ChunkedUpload, MediaJob, Profile, InternDashboard, TransitionLog
+from main import identifiers
+from main.hashers import HashingBusy
+from main.transitions import IllegalTransition, transition
+from api.admin import BoundedRelatedFieldListFilter, EstimatedCountPaginator
+from api.search import _index_search, _postgres_search, parse_terms
+from api.async_views import AsyncCourseTimetableView, AsyncDashboardView, AsyncProfileView
+from api.views import CustomTokenObtainPairSerializer
+from api.database import pool_stats
+from api.media import UploadError, append_chunk, attach_upload
+from api.renditions import process_batch
+from api.serializers import CourseMaterialSerializer, InternshipSerializer
+from api.dashboard import UNBUILT, get_dashboard, stale_dashboards
+from api.bulk import RESOURCES, import_rows, read_rows, stream_export
+from api.cache import cache_stats, reset_cache_stats
+from api.metrics import reset_metrics
+from api.renderers import ORJSONRenderer
+from api.seeding import SESSIONS_PER_COURSE, flush_seed, seed
+from api.throttling import LocalBuckets, parse_rate, reset_throttles, throttle_stats
+from api.notifications import deliver_batch, enqueue_application_email, enqueue_email
+
+
+def clear_caches():
+    caches['default'].clear()
+    caches['shared'].clear()
+    reset_cache_stats()
+
+
+def make_course(materials=2, timetables=2, **kwargs):
+    kwargs.setdefault('title', 'Backend Engineering')
+    kwargs.setdefault('category', 'software_dev')
+    kwargs.setdefault('language', 'python')
+    kwargs.setdefault('framework', 'django')
+    course = Course.objects.create(**kwargs)
+    for i in range(materials):
+        CourseMaterial.objects.create(course=course, title=f'Material {i}', material_type='pdf', file=f'course_materials/m{i}.pdf')
+    start = timezone.now()
+    for i in range(timetables):
+        Timetable.objects.create(
+            course=course,
+            title=f'Week {i}',
+            start_time=start + timedelta(days=7 * i),
+            end_time=start + timedelta(days=7 * i, hours=2),
+        )
+    return course
+
+
+def make_internship(intern, course, **kwargs):
+    kwargs.setdefault('starting_date', date.today())
+    kwargs.setdefault('completion_date', date.today() + timedelta(days=90))
+    kwargs.setdefault('status', 'Ongoing')
+    return Internship.objects.create(intern=intern, course=course, **kwargs)
+
+
+class QueryCountTests(TestCase):
+    """The nested internship tree must load in a fixed number of queries."""
+
+    def setUp(self):
+        clear_caches()
+        self.user = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        clear_caches()  # measure the cold path, where course payloads are loaded too
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_dashboard_is_a_single_read_model_fetch(self):
+        make_internship(self.user, make_course(materials=1, timetables=1))
+        self.client.get(reverse('dashboard'))  # first call builds the read model
+
+        for i in range(5):
+            make_internship(self.user, make_course(materials=4, timetables=6, title=f'Course {i}'))
+        for name in ('dashboard', 'ongoing-internships'):
+            self.assertEqual(self.count_queries(reverse(name)), 1)
+
+    def test_profile_query_count_is_constant(self):
+        make_internship(self.user, make_course())
+        Project.objects.create(user=self.user, email=self.user.email, title='Site', description='...')
+        self.client.get(reverse('profile'))  # first call creates the profile row
+        baseline = self.count_queries(reverse('profile'))
+
+        for i in range(4):
+            make_internship(self.user, make_course(materials=3, timetables=3, title=f'Course {i}'))
+            Project.objects.create(user=self.user, email=self.user.email, title=f'Site {i}', description='...')
+        self.assertEqual(self.count_queries(reverse('profile')), baseline)
+
+    def test_course_details_query_count_is_constant(self):
+        small = make_internship(self.user, make_course(materials=1, timetables=1))
+        large = make_internship(self.user, make_course(materials=8, timetables=8, title='Large'))
+        self.assertEqual(
+            self.count_queries(reverse('course-details', args=[small.pk])),
+            self.count_queries(reverse('course-details', args=[large.pk])),
+        )
+
+
+class CatalogueCacheTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.course = make_course(materials=1, timetables=1)
+
+    def test_timetable_served_from_cache_until_course_changes(self):
+        url = reverse('course-timetable', args=[self.course.pk])
+        self.assertEqual(len(self.client.get(url).data['results']), 1)
+        with self.assertNumQueries(1):  # only the conditional GET aggregate
+            self.assertEqual(len(self.client.get(url).data['results']), 1)
+        self.assertEqual(cache_stats()['hits'], 1)
+        self.assertEqual(cache_stats()['misses'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Timetable.objects.create(
+                course=self.course, title='Extra', start_time=timezone.now(), end_time=timezone.now() + timedelta(hours=1),
+            )
+        self.assertEqual(len(self.client.get(url).data['results']), 2)
+
+    def test_dashboard_sees_material_deletion(self):
+        make_internship(self.user, self.course)
+        materials = self.client.get(reverse('dashboard')).data['results'][0]['course']['materials']
+        self.assertEqual(len(materials), 1)
+        self.assertNotIn('file', materials[0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.materials.all().delete()
+        self.assertEqual(self.client.get(reverse('dashboard')).data['results'][0]['course']['materials'], [])
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_dashboard_cursor_walks_every_internship_once(self):
+        course = make_course(materials=0, timetables=0)
+        created = {make_internship(self.user, course).pk for _ in range(5)}
+
+        seen, url = [], reverse('dashboard') + '?page_size=2'
+        while url:
+            data = self.client.get(url).data
+            seen.extend(row['id'] for row in data['results'])
+            url = data['next']
+        self.assertEqual(sorted(seen), sorted(created))
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_forged_cursor_is_not_found(self):
+        make_internship(self.user, make_course(materials=0, timetables=0))
+        for position in ([1, 'x'], [1], 'x'):
+            cursor = base64.urlsafe_b64encode(json.dumps({'p': position, 'r': False}).encode()).decode()
+            response = self.client.get(reverse('dashboard'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+    def test_sparse_fieldset(self):
+        make_internship(self.user, make_course())
+        row = self.client.get(reverse('dashboard') + '?fields=id,status,course.title').data['results'][0]
+        self.assertEqual(set(row), {'id', 'status', 'course'})
+        self.assertEqual(set(row['course']), {'title'})
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.internship = make_internship(self.user, make_course())
+
+    def test_unchanged_dashboard_is_not_modified(self):
+        response = self.client.get(reverse('dashboard'))
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Timetable.objects.filter(course=self.internship.course).delete()
+        response = self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_deleted_rows_are_not_hidden_by_if_modified_since(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertNotIn('Last-Modified', response)
+
+        Timetable.objects.filter(course=self.internship.course).delete()
+        response = self.client.get(
+            reverse('dashboard'), HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60),
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_application_email_is_queued_then_sent_once(self):
+        response = self.client.post(reverse('submit-initial-application'), {'email': 'new@example.com', 'mode': 'remote'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+
+        application = InternshipApplication.objects.get()
+        enqueue_application_email(application)  # duplicate key is ignored
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+        self.assertEqual(deliver_batch(), (1, 0))
+        self.assertEqual(deliver_batch(), (0, 0))
+        self.assertEqual(mail.outbox[0].to, ['new@example.com'])
+        self.assertEqual(OutboxMessage.objects.get().status, 'sent')
+
+    def test_failed_send_is_retried_later(self):
+        enqueue_email('test:1', 'someone@example.com', 'Hello', 'Body')
+        with mock.patch('api.notifications.EmailMessage.send', side_effect=OSError('connection refused')):
+            self.assertEqual(deliver_batch(), (0, 1))
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_batch(), (0, 0))  # not due yet
+
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_batch(), (1, 0))
+
+    def test_connection_failure_reschedules_the_batch(self):
+        enqueue_email('test:1', 'someone@example.com', 'Hello', 'Body')
+        enqueue_email('test:2', 'other@example.com', 'Hello', 'Body')
+        with mock.patch('api.notifications.get_connection', side_effect=OSError('authentication failed')):
+            self.assertEqual(deliver_batch(), (0, 2))
+
+        for message in OutboxMessage.objects.all():
+            self.assertEqual((message.status, message.attempts), ('pending', 1))
+            self.assertEqual(message.last_error, 'authentication failed')
+            self.assertGreater(message.next_attempt_at, timezone.now())
+
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_batch(), (2, 0))
+
+
+class BulkImportExportTests(TestCase):
+    def test_import_reports_bad_rows_and_round_trips(self):
+        course = make_course(materials=0, timetables=0)
+        CustomUser.objects.create_user(email='intern@example.com', password='x')
+        rows = io.StringIO(
+            'id,intern,course,starting_date,completion_date,duration,status\n'
+            f',intern@example.com,{course.pk},2025-01-01,2025-04-01,3 Months,Ongoing\n'
+            f',missing@example.com,{course.pk},2025-01-01,2025-04-01,3 Months,Ongoing\n'
+            f',intern@example.com,{course.pk},2025-04-01,2025-01-01,3 Months,Ongoing\n'
+        )
+        result = import_rows(RESOURCES['internships'], read_rows(rows, 'csv'), batch_size=2)
+        self.assertEqual((result.created, result.updated), (1, 0))
+        self.assertEqual([line for line, problems in result.errors], [3, 4])
+        self.assertIn('intern', result.errors[0][1])
+
+        exported = ''.join(stream_export(RESOURCES['internships'], Internship.objects.all(), 'csv'))
+        exported = exported.replace('Ongoing', 'Completed')
+        result = import_rows(RESOURCES['internships'], read_rows(io.StringIO(exported), 'csv'))
+        self.assertEqual((result.created, result.updated, result.errors), (0, 1, []))
+        self.assertEqual(Internship.objects.get().status, 'Completed')
+
+    def test_status_changes_follow_the_state_machine(self):
+        course = make_course(materials=0, timetables=0)
+        intern = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        staff = CustomUser.objects.create_user(email='staff@example.com', password='x', is_staff=True)
+        done = make_internship(intern, course, status='Completed')
+        ongoing = make_internship(intern, course, status='Ongoing')
+        rows = io.StringIO(
+            'id,intern,course,starting_date,completion_date,status\n'
+            f'{done.pk},intern@example.com,{course.pk},2025-01-01,2025-04-01,Pending\n'
+            f'{ongoing.pk},intern@example.com,{course.pk},2025-01-01,2025-05-01,Completed\n'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_rows(RESOURCES['internships'], read_rows(rows, 'csv'), user_id=staff.pk)
+        self.assertEqual((result.updated, [(line, list(problems)) for line, problems in result.errors]), (1, [(2, ['status'])]))
+        self.assertEqual(Internship.objects.get(pk=done.pk).status, 'Completed')
+        ongoing.refresh_from_db()
+        self.assertEqual((ongoing.status, ongoing.completion_date), ('Completed', date(2025, 5, 1)))
+        log = TransitionLog.objects.get()
+        self.assertEqual(
+            (log.object_id, log.source, log.target, log.user_id, log.note), (ongoing.pk, 'Ongoing', 'Completed', staff.pk, 'imported'),
+        )
+
+    def test_malformed_rows_do_not_abort_the_import(self):
+        course = make_course(materials=0, timetables=0)
+        rows = io.StringIO(
+            f'{{"course": {course.pk}, "title": "Intro", "material_type": "pdf", "file": "a.pdf"}}\n'
+            f'{{"id": "abc", "course": {course.pk}, "title": "Bad id", "material_type": "pdf", "file": "b.pdf"}}\n'
+            '{"course": "x", "title": "Bad course", "material_type": "pdf", "file": "c.pdf"}\n'
+            '{"course": \n'
+            '["not", "an", "object"]\n'
+            f'{{"course": {course.pk}, "title": "Outro", "material_type": "pdf", "file": "d.pdf"}}\n'
+        )
+        result = import_rows(RESOURCES['materials'], read_rows(rows, 'jsonl'), batch_size=10)
+        self.assertEqual((result.created, result.updated), (2, 0))
+        self.assertEqual(
+            [(line, sorted(problems)) for line, problems in result.errors],
+            [(2, ['id']), (3, ['course']), (4, [NON_FIELD_ERRORS]), (5, [NON_FIELD_ERRORS])],
+        )
+
+
+class QueryPlanTests(TestCase):
+    """Hot lookups must be served by an index, never a full table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        cls.internship = make_internship(cls.user, make_course())
+
+    def assertUsesIndex(self, queryset):
+        table = queryset.model._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny test tables are always cheapest to scan; make the planner prove an index applies.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        if connection.vendor == 'postgresql':
+            self.assertNotIn(f'Seq Scan on {table}', plan)
+        else:
+            # "SCAN t USING INDEX i" is fine for partial indexes; a bare "SCAN t" is not.
+            self.assertNotRegex(plan, rf'SCAN {table}(?! USING (COVERING )?INDEX)')
+
+    def test_hot_lookups(self):
+        user = self.user
+        self.assertUsesIndex(Internship.objects.filter(intern=user).order_by('-created_at', '-id'))
+        self.assertUsesIndex(Internship.objects.filter(id=self.internship.pk, intern=user))
+        self.assertUsesIndex(Project.objects.filter(user=user).order_by('-created_at', '-id'))
+        self.assertUsesIndex(Timetable.objects.filter(course_id=self.internship.course_id).order_by('start_time', 'id'))
+
+    def test_admin_filters(self):
+        self.assertUsesIndex(Internship.objects.filter(status='Ongoing'))
+        self.assertUsesIndex(Project.objects.filter(status='Pending'))
+        self.assertUsesIndex(Project.objects.filter(payment_status='Failed'))
+        self.assertUsesIndex(CourseMaterial.objects.filter(material_type='video'))
+        self.assertUsesIndex(Timetable.objects.filter(is_live_session=True))
+
+    def test_reconcile_lookups(self):
+        today = date.today()
+        self.assertUsesIndex(Internship.objects.filter(status='Pending', starting_date__lte=today))
+        self.assertUsesIndex(Internship.objects.filter(status='Ongoing', completion_date__lte=today))
+
+
+class InternshipIdTests(TestCase):
+    def test_approval_allocates_unique_ids(self):
+        course = make_course(materials=0, timetables=0)
+        users = [CustomUser.objects.create_user(email=f'intern{i}@example.com', password='x') for i in range(3)]
+        for user in users:
+            internship = make_internship(user, course, status='Pending')
+            self.assertIsNone(CustomUser.objects.get(pk=user.pk).internship_id)
+            internship.status = 'Ongoing'
+            internship.save()
+
+        ids = list(CustomUser.objects.filter(is_intern=True).values_list('internship_id', flat=True))
+        self.assertEqual(len(set(ids)), 3)
+        self.assertTrue(all(re.fullmatch(r'QTS-\d{3}-\d{4}', value) for value in ids))
+
+    def test_validate_internship(self):
+        user = CustomUser.objects.create_user(email='intern@example.com', password='x', is_intern=True)
+        client = APIClient()
+        client.force_authenticate(user)
+        url = reverse('validate-internship')
+        self.assertEqual(client.post(url, {'internship_id': user.internship_id.lower()}).status_code, 200)
+        self.assertEqual(client.post(url, {'internship_id': 'QTS-999-9999'}).status_code, 403)
+        for value in (12345, ['QTS'], None, {'id': 1}):
+            self.assertEqual(client.post(url, {'internship_id': value}, format='json').status_code, 403)
+
+
+class StatelessJWTTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = CustomUser.objects.create_user(email='intern@example.com', password='secret-pass', is_intern=True)
+        make_internship(self.user, make_course())
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post(reverse('token_obtain_pair'), {'email': self.user.email, 'password': 'secret-pass'})
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return response.data
+
+    def test_requests_do_not_load_the_user(self):
+        self.login()
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'main_customuser' in q['sql']])
+
+    def test_deleted_or_inactive_user_is_rejected_when_loaded(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.login()
+        self.assertEqual(self.client.get(reverse('stats')).status_code, 200)
+
+        # StatsView lists SessionAuthentication first, which sends no challenge, so DRF answers 403.
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(reverse('stats')).status_code, 403)
+        CustomUser.objects.filter(pk=self.user.pk).delete()
+        self.assertEqual(self.client.get(reverse('stats')).status_code, 403)
+
+    def test_blacklisted_access_token_is_rejected(self):
+        access = AccessToken(self.login()['access'])
+        outstanding = OutstandingToken.objects.create(
+            user=self.user, jti=access['jti'], token=str(access), expires_at=timezone.now() + timedelta(hours=1),
+        )
+        BlacklistedToken.objects.create(token=outstanding)
+        with mock.patch('api.authentication._blacklist_checks', {}):
+            self.assertEqual(self.client.get(reverse('dashboard')).status_code, 401)
+
+    def test_rotated_refresh_token_is_blacklisted(self):
+        refresh = self.login()['refresh']
+        self.assertEqual(self.client.post(reverse('token_refresh'), {'refresh': refresh}).status_code, 200)
+        self.assertEqual(self.client.post(reverse('token_refresh'), {'refresh': refresh}).status_code, 401)
+
+
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_register_hashes_with_argon2_and_rejects_duplicates(self):
+        payload = {'email': 'new@example.com', 'password': 'secret-pass'}
+        self.assertEqual(self.client.post(reverse('register'), payload).status_code, 201)
+        self.assertEqual(self.client.post(reverse('register'), payload).status_code, 400)
+        user = CustomUser.objects.get(email='new@example.com')
+        self.assertTrue(user.password.startswith('argon2$'))
+        self.assertTrue(user.check_password('secret-pass'))
+
+    def test_login_upgrades_pbkdf2_hashes(self):
+        user = CustomUser.objects.create(email='old@example.com', password=make_password('secret-pass', hasher='pbkdf2_sha256'))
+        response = self.client.post(reverse('token_obtain_pair'), {'email': user.email, 'password': 'secret-pass'})
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+
+    def test_busy_hashing_pool_returns_503(self):
+        with mock.patch('main.models.hash_password', side_effect=HashingBusy):
+            response = self.client.post(reverse('register'), {'email': 'new@example.com', 'password': 'secret-pass'})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+
+class AsyncViewTests(TransactionTestCase):
+    # ProfileView queries from pool threads, which cannot see a TestCase transaction.
+
+    def setUp(self):
+        clear_caches()
+        self.user = CustomUser.objects.create_user(email='intern@example.com', password='x', is_intern=True)
+        self.course = make_course()
+        make_internship(self.user, self.course)
+        Project.objects.create(user=self.user, email=self.user.email, title='Site', description='...')
+        self.token = str(CustomTokenObtainPairSerializer.get_token(self.user).access_token)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def get_async(self, view, path, headers=None, **kwargs):
+        headers = {'Authorization': f'Bearer {self.token}', **(headers or {})}
+        request = AsyncRequestFactory().get(path, headers=headers)
+        return async_to_sync(view.as_view())(request, **kwargs)
+
+    def test_payloads_match_sync_views(self):
+        cases = [
+            (AsyncDashboardView, reverse('dashboard'), {}),
+            (AsyncProfileView, reverse('profile'), {}),
+            (AsyncCourseTimetableView, reverse('course-timetable', args=[self.course.pk]), {'course_id': self.course.pk}),
+        ]
+        self.client.get(reverse('profile'))  # creates the profile
+        for view, path, kwargs in cases:
+            with self.subTest(path=path):
+                expected = self.client.get(path)
+                response = self.get_async(view, path, **kwargs)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(json.loads(response.content), json.loads(expected.content))
+                self.assertEqual(response['ETag'], expected['ETag'])
+
+    def test_not_modified_and_unauthenticated(self):
+        etag = self.get_async(AsyncDashboardView, reverse('dashboard'))['ETag']
+        response = self.get_async(AsyncDashboardView, reverse('dashboard'), {'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        response = self.get_async(AsyncDashboardView, reverse('dashboard'), {'Authorization': ''})
+        self.assertEqual(response.status_code, 401)
+
+    def test_renderers_and_throttles_match_sync_views(self):
+        path = reverse('course-timetable', args=[self.course.pk])
+        kwargs = {'course_id': self.course.pk}
+        expected = self.client.get(path, HTTP_ACCEPT='application/msgpack')
+        response = self.get_async(AsyncCourseTimetableView, path, {'Accept': 'application/msgpack'}, **kwargs)
+        self.assertEqual((response['Content-Type'], response.content), (expected['Content-Type'], expected.content))
+        self.assertIn('Accept', response['Vary'])
+        response = self.get_async(AsyncCourseTimetableView, path, {'Accept': 'text/csv'}, **kwargs)
+        self.assertEqual((response.status_code, response['Content-Type']), (406, 'application/json'))
+
+        class Closed(BaseThrottle):
+            def allow_request(self, request, view):
+                return False
+
+            def wait(self):
+                return 7.2
+
+        with mock.patch.object(AsyncCourseTimetableView, 'throttle_classes', [Closed]):
+            response = self.get_async(AsyncCourseTimetableView, path, **kwargs)
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '8'))
+
+
+class DatabasePoolTests(TestCase):
+    def test_pool_stats_are_staff_only(self):
+        user = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assertEqual(client.get(reverse('db-pool')).status_code, 403)
+
+        CustomUser.objects.filter(pk=user.pk).update(is_staff=True)
+        user.refresh_from_db()
+        client.force_authenticate(user)
+        response = client.get(reverse('db-pool'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['default']['vendor'], connection.vendor)
+        self.assertEqual(response.data['default']['pooled'], connection.settings_dict['OPTIONS'].get('pool') is not None)
+
+    @skipUnless(connection.settings_dict['OPTIONS'].get('pool'), "Database is not pooled")
+    def test_pool_reports_checked_out_connection(self):
+        connection.ensure_connection()
+        stats = pool_stats()['default']
+        self.assertGreaterEqual(stats['in_use'], 1)
+        self.assertLessEqual(stats['size'], stats['max_size'])
+
+
+class MaterialDeliveryTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        overrides = override_settings(MEDIA_ROOT=media_root, CHUNKED_UPLOAD_DIR=os.path.join(media_root, 'parts'))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.user = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        self.course = make_course(materials=0, timetables=0)
+        self.material = CourseMaterial(course=self.course, title='Lecture', material_type='video')
+        self.content = bytes(range(256)) * 40
+        self.material.file.save('lecture.mp4', ContentFile(self.content))
+        self.url = reverse('material-download', args=[self.material.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, **headers):
+        response = self.client.get(self.url, **headers)
+        # Reading streaming_content to the end closes the response; closing it again here would
+        # send request_finished outside the test client and drop the test's connection.
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_requires_active_enrollment(self):
+        make_internship(self.user, self.course, status='Pending', starting_date=date.today() + timedelta(days=7))
+        self.assertEqual(self.download()[0].status_code, 403)
+        Internship.objects.filter(intern=self.user).update(status='Ongoing')
+        response, body = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_byte_ranges(self):
+        make_internship(self.user, self.course)
+        response, body = self.download(HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.content[100:200])
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+
+        response, body = self.download(HTTP_RANGE='bytes=-10')
+        self.assertEqual(body, self.content[-10:])
+        response, body = self.download(HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        response, body = self.download(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='Mon, 01 Jan 1990 00:00:00 GMT')
+        self.assertEqual((response.status_code, body), (200, self.content))
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_accel_redirect(self):
+        make_internship(self.user, self.course)
+        response, body = self.download()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.material.file.name)
+        self.assertEqual(body, b'')
+
+    def test_resumable_upload(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.user.refresh_from_db()
+        self.client.force_authenticate(self.user)
+        upload = self.client.post(reverse('chunked-upload'), {'filename': 'big.mp4', 'size': len(self.content)}).data
+        url = reverse('chunked-upload-detail', args=[upload['id']])
+
+        def put(start, end):
+            return self.client.put(
+                url, self.content[start:end + 1], content_type='application/octet-stream',
+                HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.content)}',
+            )
+
+        self.assertEqual(put(0, 999).data['offset'], 1000)
+        response = put(2000, 2999)
+        self.assertEqual((response.status_code, response.data['offset']), (409, 1000))
+        self.assertEqual(put(1000, len(self.content) - 1).data['status'], 'complete')
+
+        upload = ChunkedUpload.objects.get(pk=upload['id'])
+        other = CustomUser.objects.create_user(email='staff@example.com', password='x', is_staff=True)
+        data = {'course': self.course.pk, 'title': 'Big', 'material_type': 'video', 'upload': upload.pk}
+        for user, valid in ((other, False), (self.user, True)):
+            request = RequestFactory().get('/')
+            request.user = user
+            form = admin.site._registry[CourseMaterial].get_form(request)(data)
+            self.assertEqual(form.is_valid(), valid, user.email)
+
+        material = CourseMaterial(course=self.course, title='Big', material_type='video')
+        attach_upload(upload, material.file)
+        material.save()
+        with material.file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_chunk_claimed_by_a_racing_request_is_discarded(self):
+        upload = ChunkedUpload.objects.create(user=self.user, filename='big.mp4', size=len(self.content))
+
+        class RacingStream(io.BytesIO):
+            def read(self, size=-1):
+                # Another request commits the same range while this one is still reading its body.
+                ChunkedUpload.objects.filter(pk=upload.pk).update(offset=1000)
+                return super().read(size)
+
+        with self.assertRaises(UploadError) as caught:
+            append_chunk(upload.pk, self.user.pk, f'bytes 0-999/{len(self.content)}', RacingStream(b'x' * 1000))
+        self.assertEqual((caught.exception.status, caught.exception.upload.offset), (409, 1000))
+        self.assertEqual(os.listdir(os.path.dirname(upload.path)), [])
+
+    def test_abandoned_uploads_expire(self):
+        abandoned, active = (
+            ChunkedUpload.objects.create(user=self.user, filename=f'{name}.mp4', size=10) for name in ('old', 'new')
+        )
+        parts = os.path.dirname(active.path)
+        os.makedirs(parts)
+        stray = os.path.join(parts, 'gone.part.0123')
+        for path in (abandoned.path, active.path, stray):
+            with open(path, 'wb') as f:
+                f.write(b'12345')
+        day_ago = time.time() - 25 * 60 * 60
+        for path in (abandoned.path, stray):
+            os.utime(path, (day_ago, day_ago))
+        ChunkedUpload.objects.filter(pk=abandoned.pk).update(updated_at=timezone.now() - timedelta(hours=25))
+
+        out = io.StringIO()
+        call_command('expire_uploads', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'uploads=1 files=2')
+        self.assertEqual(list(ChunkedUpload.objects.values_list('pk', flat=True)), [active.pk])
+        self.assertEqual(os.listdir(parts), [os.path.basename(active.path)])
+
+
+class MediaRenditionTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        overrides = override_settings(MEDIA_ROOT=media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.course = make_course(materials=0, timetables=0)
+
+    def jpeg_with_exif(self, size=(2000, 1500)):
+        exif = Image.Exif()
+        exif[0x010F] = 'CameraMaker'
+        buffer = io.BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(buffer, 'JPEG', exif=exif)
+        return ContentFile(buffer.getvalue())
+
+    def process(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            return process_batch(executor)
+
+    def test_image_material_gets_stripped_renditions(self):
+        material = CourseMaterial(course=self.course, title='Diagram', material_type='image')
+        material.file.save('diagram.jpg', self.jpeg_with_exif())
+        self.assertEqual(MediaJob.objects.count(), 1)
+        self.assertEqual(self.process(), (1, 0))
+
+        material.refresh_from_db()
+        self.assertEqual(material.renditions['source'], material.file.name)
+        thumb = material.renditions['sizes']['thumb']
+        self.assertEqual((thumb['width'], thumb['height']), (160, 120))
+        with default_storage.open(thumb['webp']) as f, Image.open(f) as image:
+            self.assertEqual(image.format, 'WEBP')
+        with default_storage.open(thumb['jpg']) as f, Image.open(f) as image:
+            self.assertEqual(len(image.getexif()), 0)
+
+        # Saving again without a new file queues nothing.
+        material.save()
+        self.assertEqual(self.process(), (0, 0))
+        data = CourseMaterialSerializer(material).data['renditions']
+        self.assertEqual(data['thumb']['webp'], default_storage.url(thumb['webp']))
+
+    def test_pdfs_are_skipped_and_replaced_files_are_not_overwritten(self):
+        material = CourseMaterial(course=self.course, title='Notes', material_type='pdf')
+        material.file.save('notes.pdf', ContentFile(b'%PDF-1.4'))
+        self.assertFalse(MediaJob.objects.exists())
+
+        profile = Profile.objects.create(user=CustomUser.objects.create_user(email='a@example.com', password='x'))
+        profile.profile_pic.save('me.jpg', self.jpeg_with_exif((300, 300)))
+        job = MediaJob.objects.get()
+        profile.profile_pic.save('me-2.jpg', self.jpeg_with_exif((300, 300)))
+        MediaJob.objects.exclude(pk=job.pk).delete()
+        self.assertEqual(self.process(), (1, 0))
+        profile.refresh_from_db()
+        self.assertEqual(profile.renditions, {})
+
+
+class DashboardReadModelTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        self.other = CustomUser.objects.create_user(email='other@example.com', password='x')
+        self.course = make_course()
+        self.internship = make_internship(self.user, self.course)
+        for user in (self.user, self.other):
+            get_dashboard(user.pk)
+
+    def assertCurrent(self):
+        self.assertEqual(list(stale_dashboards([self.user.pk, self.other.pk])), [])
+
+    def test_writes_patch_the_stored_document(self):
+        CourseMaterial.objects.create(course=self.course, title='Extra', material_type='pdf', file='course_materials/x.pdf')
+        Timetable.objects.filter(course=self.course).first().delete()
+        Course.objects.filter(pk=self.course.pk).first().save()
+        second = make_internship(self.user, make_course(title='Second'))
+        self.assertCurrent()
+
+        second.intern = self.other
+        second.save()
+        self.assertCurrent()
+        self.assertIn(str(second.pk), get_dashboard(self.other.pk).document['internships'])
+        self.assertNotIn(str(second.course_id), get_dashboard(self.user.pk).document['courses'])
+
+        self.internship.delete()
+        self.assertCurrent()
+        self.assertEqual(get_dashboard(self.user.pk).document, {'internships': {}, 'courses': {}})
+
+    def test_statuses_moved_by_the_date_are_not_stale(self):
+        make_internship(self.other, self.course, status='Pending', starting_date=date.today() + timedelta(days=1))
+        self.assertEqual(get_dashboard(self.other.pk).document['internships'].popitem()[1]['status'], 'Pending')
+        with mock.patch('django.utils.timezone.localdate', return_value=date.today() + timedelta(days=2)):
+            self.assertCurrent()
+
+    def test_unbuilt_row_is_built_under_its_lock(self):
+        InternDashboard.objects.filter(intern=self.other).update(document={'internships': {}, 'courses': {}}, version=UNBUILT)
+        internship = make_internship(self.other, self.course)  # writers leave the unbuilt row alone
+        self.assertEqual(InternDashboard.objects.get(intern=self.other).version, UNBUILT)
+
+        dashboard = get_dashboard(self.other.pk)
+        self.assertNotEqual(dashboard.version, UNBUILT)
+        self.assertIn(str(internship.pk), dashboard.document['internships'])
+        self.assertCurrent()
+
+    def test_dashboard_matches_live_serializer(self):
+        make_internship(self.user, make_course(title='Second'))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        live = InternshipSerializer(Internship.objects.filter(intern=self.user).order_by('-created_at', '-id'), many=True).data
+        self.assertEqual(json.loads(json.dumps(client.get(reverse('dashboard')).data['results'])), json.loads(json.dumps(live)))
+
+    def test_check_and_rebuild_commands(self):
+        InternDashboard.objects.filter(intern=self.user).update(document={'internships': {}, 'courses': {}})
+        with self.assertRaises(CommandError):
+            call_command('check_dashboards', stdout=io.StringIO())
+        call_command('check_dashboards', '--fix', stdout=io.StringIO())
+        self.assertCurrent()
+
+        InternDashboard.objects.all().delete()
+        call_command('rebuild_dashboards', stdout=io.StringIO())
+        self.assertEqual(InternDashboard.objects.count(), 1)
+        self.assertCurrent()
+
+
+class UpcomingSessionsTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.now = timezone.now().replace(microsecond=0)
+        self.first = make_course(materials=0, timetables=0)
+        self.second = make_course(materials=0, timetables=0, title='Data Science')
+        make_internship(self.user, self.first)
+        make_internship(self.user, self.second)
+
+    def session(self, course, title, start, hours=2):
+        return Timetable.objects.create(course=course, title=title, start_time=start, end_time=start + timedelta(hours=hours))
+
+    def test_merges_enrolled_courses_in_start_order(self):
+        in_progress = self.session(self.first, 'Running', self.now - timedelta(hours=1))
+        self.session(self.first, 'Finished', self.now - timedelta(hours=3))
+        later = self.session(self.first, 'Later', self.now + timedelta(days=2))
+        soon = self.session(self.second, 'Soon', self.now + timedelta(hours=5))
+        self.session(self.second, 'Outside', self.now + timedelta(days=8))
+        self.session(make_course(materials=0, timetables=0, title='Other'), 'Not enrolled', self.now + timedelta(hours=1))
+
+        response = self.client.get(reverse('upcoming-sessions'), {'from': self.now.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [in_progress.pk, soon.pk, later.pk])
+        self.assertEqual(response.data['results'][1]['course'], {'id': self.second.pk, 'title': 'Data Science'})
+
+        response = self.client.get(reverse('upcoming-sessions'), {'from': self.now.isoformat(), 'limit': 2})
+        self.assertEqual([row['id'] for row in response.data['results']], [in_progress.pk, soon.pk])
+
+    def test_rejects_bad_windows(self):
+        url = reverse('upcoming-sessions')
+        self.assertEqual(self.client.get(url, {'from': 'tomorrow'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': '2025-01-02', 'to': '2025-01-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': '2025-01-01', 'to': '2026-01-01'}).status_code, 400)
+
+    def test_session_length_is_bounded(self):
+        too_long = Timetable(course=self.first, title='Marathon', start_time=self.now, end_time=self.now + timedelta(days=2))
+        with self.assertRaises(ValidationError):
+            too_long.full_clean()
+
+    def test_calendar_feed(self):
+        session = self.session(self.first, 'Kick-off; intro, Q&A', self.now + timedelta(hours=1))
+        calendar_url = self.client.get(reverse('upcoming-sessions')).data['calendar_url']
+
+        feed = APIClient().get(calendar_url)
+        self.assertEqual(feed.status_code, 200)
+        self.assertEqual(feed['Content-Type'], 'text/calendar; charset=utf-8')
+        body = feed.content.decode()
+        self.assertIn(f'UID:timetable-{session.pk}@quantumstack\r\n', body)
+        self.assertIn('SUMMARY:Backend Engineering: Kick-off\; intro\\, Q&A\r\n', body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+        etag = feed['ETag']
+        self.assertEqual(APIClient().get(calendar_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.assertNumQueries(1):
+            APIClient().get(calendar_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.session(self.second, 'Added', self.now + timedelta(hours=3))
+        feed = APIClient().get(calendar_url)
+        self.assertNotEqual(feed['ETag'], etag)
+        self.assertIn('SUMMARY:Data Science: Added', feed.content.decode())
+
+        self.assertEqual(APIClient().get(reverse('calendar-feed', args=['forged'])).status_code, 404)
+        course_feed = self.client.get(reverse('course-calendar', args=[self.first.pk]))
+        self.assertNotIn('Added', course_feed.content.decode())
+
+
+class ThrottleTests(TestCase):
+    def setUp(self):
+        reset_throttles()
+        self.addCleanup(reset_throttles)
+        self.client = APIClient()
+
+    def register(self, email, address='198.51.100.1'):
+        return self.client.post(reverse('register'), {'email': email, 'password': 'secret-pass'}, REMOTE_ADDR=address)
+
+    def test_email_bucket_rejects_before_any_work(self):
+        for _ in range(3):
+            self.register('flood@example.com')
+        with self.assertNumQueries(0):
+            response = self.register('flood@example.com', address='198.51.100.2')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(self.register('other@example.com', address='198.51.100.2').status_code, 201)
+
+    def test_rejected_request_costs_no_other_bucket(self):
+        for _ in range(12):
+            self.register('flood@example.com')  # the email bucket rejects all but 3
+        self.assertEqual(self.register('other@example.com').status_code, 201)
+
+    @override_settings(THROTTLE_BACKEND='shared')
+    def test_ip_bucket_in_shared_backend(self):
+        caches['shared'].clear()
+        statuses = [self.register(f'user{i}@example.com').status_code for i in range(11)]
+        self.assertEqual(statuses, [201] * 10 + [429])
+        self.assertEqual(CustomUser.objects.count(), 10)
+        self.assertEqual(self.register('user11@example.com', address='198.51.100.9').status_code, 201)
+        self.assertEqual(throttle_stats()['rejections'], {'register': 1})
+
+    def test_bucket_refills(self):
+        buckets = LocalBuckets(max_keys=10)
+        self.assertEqual([buckets.take([('k', 2, 60)], 0) for _ in range(3)], [0, 0, 30])
+        self.assertEqual(buckets.take([('k', 2, 60)], 30), 0)
+        self.assertEqual(parse_rate('5/15min'), (5, 900))
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        reset_metrics()
+        self.addCleanup(reset_metrics)
+        self.user = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        self.course = make_course()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sample(self, body, name, **labels):
+        text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+        match = re.search(rf'^{name}{{{re.escape(text)}}} (\S+)$', body, re.M)
+        return float(match.group(1)) if match else None
+
+    @override_settings(METRICS_SERVER_TIMING=True, METRICS_TOKEN='scrape-me')
+    def test_records_queries_and_exposes_prometheus_text(self):
+        url = reverse('course-timetable', args=[self.course.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        # Read now: the next request resets the connection's query log.
+        query_count = len(queries)
+        self.assertRegex(response['Server-Timing'], rf'^db;dur=[\d.]+;desc="{query_count} queries", render;dur=[\d.]+, total;dur=[\d.]+$')
+
+        self.assertEqual(APIClient().get('/metrics').status_code, 404)
+        scrape = APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(scrape.status_code, 200)
+        body = scrape.content.decode()
+        labels = {'endpoint': 'course-timetable', 'method': 'GET'}
+        self.assertEqual(self.sample(body, 'api_requests_total', **labels, status='200'), 1)
+        self.assertEqual(self.sample(body, 'api_request_sql_queries_sum', **labels), query_count)
+        self.assertEqual(self.sample(body, 'api_request_duration_seconds_bucket', **labels, le='+Inf'), 1)
+        self.assertGreater(self.sample(body, 'api_request_render_duration_seconds_sum', **labels), 0)
+        self.assertEqual(self.sample(body, 'api_response_size_bytes_sum', **labels), len(response.content))
+        self.assertIn('# TYPE api_catalogue_cache_lookups_total counter', body)
+        self.assertIn('api_catalogue_cache_lookups_total{result="miss"}', body)
+
+    @override_settings(METRICS_SERVER_TIMING=False)
+    def test_server_timing_is_opt_in(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('dashboard')))
+
+
+class SeedAndBenchmarkTests(TransactionTestCase):
+    def setUp(self):
+        # The ID allocator's cached block would outlive the truncated IdentifierBlock table.
+        patcher = mock.patch.object(identifiers, '_block_allocator', identifiers.BlockAllocator('internship_id'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_seed_is_reproducible_and_flushable(self):
+        counts = seed(60, seed=7)
+        self.assertEqual(counts['courses'], 2)
+        self.assertEqual(Timetable.objects.count(), 2 * SESSIONS_PER_COURSE)
+        interns = CustomUser.objects.filter(internship__status__in=['Ongoing', 'Completed']).distinct()
+        self.assertFalse(interns.filter(internship_id__isnull=True).exists())
+        layout = list(Internship.objects.order_by('pk').values_list('status', 'completion_date', 'intern__email'))
+
+        self.assertGreater(flush_seed(), 0)
+        self.assertFalse(CustomUser.objects.exists() or Course.objects.exists())
+        seed(60, seed=7)
+        self.assertEqual(list(Internship.objects.order_by('pk').values_list('status', 'completion_date', 'intern__email')), layout)
+
+    def test_bench_api_reports_every_endpoint(self):
+        seed(30)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            call_command('bench_api', requests=60, warmup=5, concurrency=1, output=path, stderr=io.StringIO())
+            with open(path) as fh:
+                report = json.load(fh)
+        self.assertEqual(report['overall']['errors'], 0)
+        self.assertEqual(sum(stats['count'] for stats in report['endpoints'].values()), 60)
+        self.assertTrue(all(stats['queries_per_request'] is not None for stats in report['endpoints'].values()))
+
+
+class RendererTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        reset_throttles()
+        self.user = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        make_internship(self.user, make_course())
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_orjson_matches_drf_output(self):
+        data = InternshipSerializer(Internship.objects.all(), many=True).data
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render({'when': timezone.now().replace(microsecond=0)})[-3:], b'Z"}')
+
+    def test_msgpack_is_negotiated(self):
+        as_json = self.client.get(reverse('dashboard'))
+        as_msgpack = self.client.get(reverse('dashboard'), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(as_msgpack['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(as_msgpack.content), json.loads(as_json.content))
+
+    def test_parsers(self):
+        client = APIClient()
+        payload = {'email': 'packed@example.com', 'password': 'secret-pass'}
+        response = client.post(reverse('register'), msgpack.packb(payload), content_type='application/msgpack')
+        self.assertEqual(response.status_code, 201)
+        response = client.post(reverse('register'), b'{"email": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class CourseSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.django = make_course(materials=0, timetables=0, title='Django REST APIs', description='Build web services.')
+        CourseMaterial.objects.create(course=self.django, title='Serializers deep dive', material_type='pdf', file='course_materials/s.pdf')
+        make_course(materials=0, timetables=0, title='React for beginners', framework='react', language='javascript')
+        self.pandas = make_course(
+            materials=0, timetables=0, title='Data wrangling', description='Pandas and Django ORM exports.',
+            category='data_science', framework='flask',
+        )
+
+    def search(self, **params):
+        response = self.client.get(reverse('course-search'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def counts(self, data, facet):
+        return {row['value']: row['count'] for row in data['facets'][facet] if row['count']}
+
+    def test_ranks_prefix_matches_and_reports_materials(self):
+        data = self.search(q='djan')
+        self.assertEqual([row['id'] for row in data['results']], [self.django.pk, self.pandas.pk])
+        self.assertGreater(data['results'][0]['rank'], data['results'][1]['rank'])
+
+        data = self.search(q='serial')
+        self.assertEqual([row['id'] for row in data['results']], [self.django.pk])
+        self.assertEqual([m['title'] for m in data['results'][0]['matched_materials']], ['Serializers deep dive'])
+        self.assertEqual(self.search(q='django cobol')['count'], 0)
+
+    def test_facets_ignore_their_own_filter(self):
+        data = self.search(category='software_dev')
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(self.counts(data, 'category'), {'software_dev': 2, 'data_science': 1})
+        self.assertEqual(self.counts(data, 'framework'), {'django': 1, 'react': 1})
+        self.assertEqual(len(data['facets']['language']), len(Course.LANGUAGE_CHOICES))
+
+    def test_index_follows_writes(self):
+        self.assertEqual(self.search(q='kubernetes')['count'], 0)
+        CourseMaterial.objects.create(course=self.pandas, title='Kubernetes basics', material_type='pdf', file='course_materials/k.pdf')
+        self.assertEqual([row['id'] for row in self.search(q='kubernetes')['results']], [self.pandas.pk])
+        self.assertEqual(self.client.get(reverse('course-search'), {'category': 'cooking'}).status_code, 400)
+
+    def test_search_vector_is_never_loaded(self):
+        with CaptureQueriesContext(connection) as ctx:
+            course = Course.objects.get(pk=self.pandas.pk)
+            course.title = 'Pandas in depth'
+            course.save()
+        self.assertFalse([q for q in ctx.captured_queries if 'search_vector' in q['sql']])
+
+    def stored_vector(self, course):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT lexeme, weights FROM main_course, unnest(search_vector) WHERE main_course.id = %s', [course.pk],
+            )
+            return {lexeme: ''.join(sorted(weights)) for lexeme, weights in cursor.fetchall()}
+
+    @skipUnless(connection.vendor == 'postgresql', "search_vector is maintained by Postgres triggers")
+    def test_triggers_follow_course_and_material_writes(self):
+        course = make_course(
+            materials=0, timetables=0, title='Vue.js dashboards', description='Charts', language='javascript', framework='vue',
+        )
+        base = {'vue': 'AB', 'js': 'A', 'dashboards': 'A', 'software': 'B', 'dev': 'B', 'javascript': 'B', 'charts': 'C'}
+        self.assertEqual(self.stored_vector(course), base)
+
+        material = CourseMaterial.objects.create(course=course, title='Intro to Pinia', material_type='pdf', file='course_materials/p.pdf')
+        self.assertEqual(self.stored_vector(course), {**base, 'intro': 'D', 'to': 'D', 'pinia': 'D'})
+        self.assertEqual([row['id'] for row in self.search(q='pini')['results']], [course.pk])
+
+        material.title = 'Pinia stores'
+        material.save()
+        self.assertEqual(self.stored_vector(course), {**base, 'pinia': 'D', 'stores': 'D'})
+        material.course = self.pandas
+        material.save()
+        self.assertEqual(self.stored_vector(course), base)
+        self.assertEqual([row['id'] for row in self.search(q='pinia stores')['results']], [self.pandas.pk])
+        material.delete()
+        self.assertEqual(self.search(q='pinia')['count'], 0)
+
+        course.title = 'Nuxt dashboards'
+        course.save()
+        del base['js']
+        self.assertEqual(self.stored_vector(course), {**base, 'nuxt': 'A', 'vue': 'B'})
+        self.assertEqual(self.search(q='js')['count'], 0)
+
+    @skipUnless(connection.vendor == 'postgresql', "compares the Postgres backend with the in-process index")
+    def test_backends_match_the_same_courses(self):
+        make_course(materials=0, timetables=0, title='E-commerce with Vue.js', description="O'Reilly-style café guide.", framework='vue')
+        make_course(materials=0, timetables=0, title='Running the numbers: 3.5 ways', category='data_science', description=None)
+        make_course(materials=0, timetables=0, title='Straße und École', description='naïve–test, “quoted”.')
+        queries = ['djan', 'django rest', 'vue', 'js', 'e commerce', 'commerce', 'software dev', 'data_sci', 'run', 'running',
+                   'the', 'numbers 3', '5', 'reilly', 'café', 'straße', 'école', 'naïve test', 'quoted', 'serial', 'nothing']
+        for text in queries:
+            terms = parse_terms(text)
+            postgres, index = _postgres_search(terms, {}, 100, 0), _index_search(terms, {}, 100, 0)
+            self.assertEqual(postgres[0], index[0], text)
+            self.assertEqual({row['id'] for row in postgres[1]}, {row['id'] for row in index[1]}, text)
+            self.assertEqual(sorted(postgres[2]), sorted(index[2]), text)
+
+    @skipUnless(connection.vendor == 'postgresql', "the admin searches the vector on Postgres only")
+    def test_admin_search_uses_the_vector(self):
+        staff = CustomUser.objects.create_superuser(email='staff@example.com', password='x')
+        self.client.force_login(staff)
+        response = self.client.get(reverse('admin:main_course_changelist'), {'q': 'serial'})
+        self.assertEqual([course.pk for course in response.context['cl'].result_list], [self.django.pk])
+
+
+class StatusTransitionTests(TestCase):
+    def setUp(self):
+        self.course = make_course(materials=0, timetables=0)
+        self.interns = [CustomUser.objects.create_user(email=f'intern{i}@example.com', password='x') for i in range(5)]
+        self.pending = [make_internship(intern, self.course, status='Pending') for intern in self.interns]
+        self.completed = make_internship(self.interns[0], self.course, status='Completed')
+        for intern in self.interns:
+            get_dashboard(intern.pk)
+
+    def test_moves_legal_rows_with_one_guarded_update_per_batch(self):
+        ids = [internship.pk for internship in self.pending] + [self.completed.pk, 999999]
+        with CaptureQueriesContext(connection) as queries:
+            result = transition(Internship, 'status', ids, 'Ongoing', note='cohort start', batch_size=2)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "main_internship"')]
+        # Four batches; the last holds nothing movable and writes nothing.
+        self.assertEqual(len(updates), 3)
+        self.assertIn('"status" IN', updates[0])
+
+        self.assertEqual(result.moved, 5)
+        self.assertEqual(result.skipped, [self.completed.pk, 999999])
+        self.assertEqual(Internship.objects.filter(status='Ongoing').count(), 5)
+        self.assertEqual(
+            set(TransitionLog.objects.filter(batch=result.batch).values_list('object_id', 'source', 'target', 'note')),
+            {(internship.pk, 'Pending', 'Ongoing', 'cohort start') for internship in self.pending},
+        )
+        self.assertEqual(CustomUser.objects.filter(pk__in=[u.pk for u in self.interns], internship_id__isnull=True).count(), 0)
+        self.assertEqual(list(stale_dashboards([intern.pk for intern in self.interns])), [])
+
+        # Running it again moves nothing and logs nothing.
+        self.assertEqual(transition(Internship, 'status', ids, 'Ongoing').moved, 0)
+        self.assertEqual(TransitionLog.objects.count(), 5)
+
+    def test_undeclared_edges_are_rejected(self):
+        with self.assertRaises(IllegalTransition):
+            transition(Internship, 'status', [self.completed.pk], 'Pending')
+        with self.assertRaises(IllegalTransition):
+            transition(Internship, 'duration', [self.completed.pk], '6 Months')
+
+        project = Project.objects.create(email='client@example.com', title='Site', description='x')
+        project = Project.objects.get(pk=project.pk)
+        project.status = 'Completed'
+        with self.assertRaises(ValidationError) as raised:
+            project.full_clean()
+        self.assertIn('status', raised.exception.message_dict)
+        project.status = 'Processing'
+        project.full_clean()
+
+    def test_admin_action_and_endpoint(self):
+        projects = [Project.objects.create(email='client@example.com', title=f'Site {i}', description='x') for i in range(3)]
+        staff = CustomUser.objects.create_superuser(email='staff@example.com', password='x')
+        self.client.force_login(staff)
+        response = self.client.post(reverse('admin:main_project_changelist'), {
+            'action': 'transition_status_processing', '_selected_action': [p.pk for p in projects[:2]],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Project.objects.filter(status='Processing').count(), 2)
+        self.assertEqual(TransitionLog.objects.filter(model='main.Project', user=staff).count(), 2)
+
+        client = APIClient()
+        client.force_authenticate(self.interns[0])
+        payload = {'model': 'project', 'ids': [p.pk for p in projects], 'target': 'Completed'}
+        self.assertEqual(client.post(reverse('transitions'), payload, format='json').status_code, 403)
+
+        client.force_authenticate(staff)
+        response = client.post(reverse('transitions'), payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['moved'], response.data['skipped']), (2, [projects[2].pk]))
+        response = client.post(reverse('transitions'), {**payload, 'target': 'Shipped'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('target', response.data)
+
+
+class EffectiveStatusTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        course = make_course(materials=0, timetables=0)
+        today = date.today()
+        rows = {
+            # name: (stored status, days from today to start, to completion, effective status)
+            'not_started': ('Pending', 10, 100, 'Pending'),
+            'started': ('Pending', -10, 80, 'Ongoing'),
+            'approved_early': ('Ongoing', 10, 100, 'Ongoing'),
+            'pending_past': ('Pending', -100, -10, 'Completed'),
+            'ongoing_past': ('Ongoing', -100, -10, 'Completed'),
+            'cancelled': ('Cancelled', -100, -10, 'Cancelled'),
+        }
+        self.internships, self.expected = {}, {}
+        for name, (stored, start, end, effective) in rows.items():
+            internship = make_internship(
+                self.user, course, status=stored,
+                starting_date=today + timedelta(days=start), completion_date=today + timedelta(days=end),
+            )
+            self.internships[name] = internship
+            self.expected[internship.pk] = effective
+
+    def test_annotation_and_filters_agree(self):
+        annotated = dict(Internship.objects.with_effective_status().values_list('pk', 'effective_status'))
+        self.assertEqual(annotated, self.expected)
+        for status in ('Pending', 'Ongoing', 'Completed', 'Cancelled'):
+            matched = set(Internship.objects.effective_status_in([status]).values_list('pk', flat=True))
+            self.assertEqual(matched, {pk for pk, effective in self.expected.items() if effective == status}, status)
+        self.assertEqual(self.internships['started'].duration, '3 Months')
+
+    def test_access_follows_the_dates(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(reverse('course-details', args=[self.internships['started'].pk])).status_code, 200)
+        self.assertEqual(client.get(reverse('course-details', args=[self.internships['not_started'].pk])).status_code, 403)
+
+    def test_responses_show_the_effective_status(self):
+        clear_caches()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        started = self.internships['started']
+        self.assertEqual(client.get(reverse('course-details', args=[started.pk])).data['status'], 'Ongoing')
+        profile = client.get(reverse('profile')).data['internships']
+        self.assertEqual({row['id']: row['status'] for row in profile}, self.expected)
+        dashboard = client.get(reverse('dashboard') + '?page_size=100').data['results']
+        self.assertEqual({row['id']: row['status'] for row in dashboard}, self.expected)
+        self.assertEqual(Internship.objects.get(pk=started.pk).status, 'Pending')
+
+    def test_reconcile_stores_and_logs_each_step(self):
+        out = io.StringIO()
+        call_command('reconcile_internships', '--batch-size', '2', stdout=out)
+        self.assertEqual(out.getvalue().split(), ['ongoing=2', 'skipped_ongoing=0', 'completed=2', 'skipped_completed=0'])
+        self.assertEqual(dict(Internship.objects.values_list('pk', 'status')), self.expected)
+        steps = TransitionLog.objects.filter(object_id=self.internships['pending_past'].pk).order_by('pk')
+        self.assertEqual(list(steps.values_list('source', 'target')), [('Pending', 'Ongoing'), ('Ongoing', 'Completed')])
+        self.assertIsNotNone(CustomUser.objects.get(pk=self.user.pk).internship_id)
+
+        call_command('reconcile_internships', stdout=out)
+        self.assertEqual(TransitionLog.objects.count(), 4)
+
+
+class StatsTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.course = make_course(materials=0, timetables=0)
+        self.intern = CustomUser.objects.create_user(email='intern@example.com', password='x')
+        self.staff = CustomUser.objects.create_user(email='staff@example.com', password='x', is_staff=True)
+        InternshipApplication.objects.create(email='a@example.com', mode='siwes')
+        InternshipApplication.objects.create(email='b@example.com', mode='remote')
+        self.project = Project.objects.create(email='client@example.com', title='Site', description='x')
+        Project.objects.create(email='client@example.com', title='App', description='x', status='Processing')
+        self.internship = make_internship(self.intern, self.course, status='Pending')
+
+    def assertCountersCurrent(self):
+        call_command('rebuild_stats', '--check', stdout=io.StringIO())
+
+    def test_counters_follow_every_write_path(self):
+        self.assertCountersCurrent()
+        self.project.status = 'Processing'
+        self.project.save()
+        Project.objects.get(title='App').delete()
+        transition(Internship, 'status', [self.internship.pk], 'Ongoing')
+        transition(Project, 'payment_status', [self.project.pk], 'Paid')
+        self.internship.course = make_course(materials=0, timetables=0, title='Second')
+        self.internship.save()
+        self.assertCountersCurrent()
+
+        rows = io.StringIO(
+            'id,intern,course,starting_date,completion_date,status\n'
+            f'{self.internship.pk},intern@example.com,{self.course.pk},2025-01-01,2025-04-01,Completed\n'
+            f',intern@example.com,{self.course.pk},2025-01-01,2025-04-01,Ongoing\n'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            import_rows(RESOURCES['internships'], read_rows(rows, 'csv'))
+        self.assertCountersCurrent()
+
+    def test_staff_endpoint_reads_counters_and_caches(self):
+        client = APIClient()
+        client.force_authenticate(self.intern)
+        self.assertEqual(client.get(reverse('stats')).status_code, 403)
+
+        client.force_authenticate(self.staff)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('stats'), {'bucket': 'week', 'days': 14})
+            self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), 2)
+        data = response.data
+        self.assertEqual({row['value']: row['count'] for row in data['applications']['by_mode']}, {'siwes': 1, 'bootcamp': 0, 'remote': 1})
+        self.assertEqual({row['value']: row['count'] for row in data['projects']['by_status'] if row['count']}, {'Pending': 1, 'Processing': 1})
+        self.assertEqual(data['internships']['by_course'], [
+            {'course': self.course.pk, 'title': self.course.title, 'total': 1, 'by_status': {'Pending': 1}},
+        ])
+        self.assertEqual(sum(row['count'] for row in data['trends']['projects']), 2)
+        self.assertEqual(data['trends']['projects'][-1]['count'], 2)
+
+        Project.objects.create(email='client@example.com', title='Later', description='x')
+        with CaptureQueriesContext(connection) as queries:
+            cached = client.get(reverse('stats'), {'bucket': 'week', 'days': 14}).data
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(cached['projects']['total'], 2)
+        self.assertEqual(client.get(reverse('stats'), {'bucket': 'year'}).status_code, 400)
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.staff = CustomUser.objects.create_superuser(email='staff@example.com', password='x')
+        self.client.force_login(self.staff)
+        self.rows = 0
+
+    def populate(self, n):
+        for _ in range(n):
+            self.rows += 1
+            i = self.rows
+            user = CustomUser.objects.create(email=f'user{i}@example.com', password='!')
+            Profile.objects.create(user=user, first_name='Ada', last_name=f'L{i}')
+            InternshipApplication.objects.create(email=user.email, mode='siwes')
+            project = Project.objects.create(user=user, email=user.email, title=f'Project {i}', description='x')
+            transition(Project, 'status', [project.pk], 'Processing', user_id=self.staff.pk)
+            make_internship(user, make_course(materials=1, timetables=1, title=f'Course {i}'))
+            OutboxMessage.objects.create(idempotency_key=f'mail-{i}', recipient=user.email, subject='Hi', body='x')
+            MediaJob.objects.create(idempotency_key=f'job-{i}', model='main.Profile', object_id=i, field='profile_pic', source='p.jpg')
+
+    def changelist_queries(self):
+        counts = {}
+        for model in admin.site._registry:
+            if model._meta.app_label != 'main':
+                continue
+            url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200, url)
+            counts[model._meta.label] = len(queries)
+        return counts
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.populate(2)
+        few = self.changelist_queries()
+        self.populate(5)
+        many = self.changelist_queries()
+        self.assertEqual(many, few)
+        # Session and user, one COUNT, the page, a bounded course filter where there is one,
+        # and the session save (three statements). Postgres first reads the planner's estimate.
+        with_course_filter = {'main.Internship', 'main.CourseMaterial', 'main.Timetable'}
+        estimate = 1 if connection.vendor == 'postgresql' else 0
+        for label, count in many.items():
+            self.assertEqual(count, (8 if label in with_course_filter else 7) + estimate, label)
+
+    @override_settings(ADMIN_FILTER_MAX_CHOICES=2)
+    def test_related_filters_are_bounded(self):
+        self.populate(4)
+        selected = Course.objects.order_by('-pk').first()
+        response = self.client.get(reverse('admin:main_timetable_changelist'), {'course__id__exact': selected.pk})
+        spec = next(spec for spec in response.context['cl'].filter_specs if isinstance(spec, BoundedRelatedFieldListFilter))
+        self.assertEqual(len(spec.lookup_choices), 3)
+        self.assertIn(selected.pk, [pk for pk, title in spec.lookup_choices])
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1000)
+    def test_large_unfiltered_tables_use_the_estimate(self):
+        self.populate(1)
+        with mock.patch('api.admin.estimated_row_count', return_value=250000):
+            self.assertEqual(EstimatedCountPaginator(Project.objects.order_by('pk'), 100).count, 250000)
+            self.assertEqual(EstimatedCountPaginator(Project.objects.filter(status='Processing').order_by('pk'), 100).count, 1)
+        with mock.patch('api.admin.estimated_row_count', return_value=10):
+            self.assertEqual(EstimatedCountPaginator(Project.objects.order_by('pk'), 100).count, 1)
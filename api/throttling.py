@@ -0,0 +1,176 @@
+"""
+Token-bucket throttling for the endpoints that accept anonymous writes.
+
+A rule such as ``'ip': '10/hour'`` is a bucket of 10 tokens, refilled at 10
+per hour. It is keyed by the view's `throttle_scope` and by one of:
+- the client IP;
+- the submitted email;
+- nothing, meaning one bucket for the whole endpoint.
+
+Each bucket is stored as its GCRA "theoretical arrival time": one float
+per key. The local backend keeps buckets in process memory. The shared
+backend keeps them in CACHES['shared'], so every worker draws on the same
+budget.
+
+A request takes one token from each of its buckets, or from none: a
+bucket that rejects it does not cost the others a token.
+
+DRF checks throttles in `APIView.initial()`, before the handler runs, so a
+rejected request never reaches a serializer or the database. The 429
+response carries Retry-After.
+"""
+import hashlib
+import math
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import ParseError
+from rest_framework.throttling import BaseThrottle
+
+RATE_RE = re.compile(r'^(\d+)/(\d*)([a-z]+)$')
+PERIODS = {'s': 1, 'sec': 1, 'second': 1, 'm': 60, 'min': 60, 'minute': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+_stats_lock = threading.Lock()
+_rejections = {}
+
+
+def parse_rate(rate):
+    """``'10/hour'`` or ``'5/15min'`` -> ``(10, 3600)`` or ``(5, 900)``."""
+    match = RATE_RE.match(rate.replace(' ', '').lower())
+    if match is None or match.group(3) not in PERIODS:
+        raise ValueError(f"Invalid throttle rate {rate!r}")
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * PERIODS[unit]
+
+
+def gcra(tat, count, period, now):
+    """
+    Take one token from a bucket of `count` tokens refilled over `period`.
+
+    Returns ``(new_tat, wait)``: wait is 0 when the token was granted,
+    otherwise the seconds until one will be (and `tat` is unchanged).
+    """
+    tat = max(tat, now)
+    new_tat = tat + period / count
+    allowed_at = new_tat - period
+    if allowed_at > now:
+        return tat, allowed_at - now
+    return new_tat, 0
+
+
+class LocalBuckets:
+    """Buckets in this process's memory: no round trip, but each worker has its own budget."""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._tats = {}
+        self._lock = threading.Lock()
+
+    def take(self, limits, now):
+        """Take a token from every ``(key, count, period)`` bucket in `limits`, or from none; returns the wait."""
+        with self._lock:
+            results = {key: gcra(self._tats.get(key, now), count, period, now) for key, count, period in limits}
+            wait = max((wait for tat, wait in results.values()), default=0)
+            if not wait:
+                self._tats.update((key, tat) for key, (tat, _) in results.items())
+                if len(self._tats) > self.max_keys:
+                    # A bucket whose arrival time has passed is full again.
+                    self._tats = {k: v for k, v in self._tats.items() if v > now}
+            return wait
+
+    def clear(self):
+        with self._lock:
+            self._tats.clear()
+
+
+class SharedBuckets:
+    """
+    Buckets in the shared cache. The read and the write are separate calls,
+    so racing workers can let a few extra requests through; the limits still
+    hold to within the number of workers.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def take(self, limits, now):
+        store = caches[self.alias]
+        stored = store.get_many([key for key, count, period in limits])
+        results = {key: gcra(stored.get(key, now), count, period, now) for key, count, period in limits}
+        wait = max((wait for tat, wait in results.values()), default=0)
+        if not wait:
+            for key, (tat, _) in results.items():
+                store.set(key, tat, math.ceil(tat - now) + 1)
+        return wait
+
+    def clear(self):
+        pass
+
+
+_buckets = {}
+
+
+def get_buckets():
+    backend = settings.THROTTLE_BACKEND
+    if backend not in _buckets:
+        if backend == 'shared':
+            _buckets[backend] = SharedBuckets('shared')
+        elif backend == 'local':
+            _buckets[backend] = LocalBuckets(settings.THROTTLE_LOCAL_MAX_KEYS)
+        else:
+            raise ValueError(f"Unknown THROTTLE_BACKEND {backend!r}")
+    return _buckets[backend]
+
+
+def throttle_stats():
+    with _stats_lock:
+        return {'rejections': dict(_rejections)}
+
+
+def reset_throttles():
+    with _stats_lock:
+        _rejections.clear()
+    for buckets in _buckets.values():
+        buckets.clear()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Applies ``settings.THROTTLE_RULES[view.throttle_scope]``."""
+
+    def identity(self, kind, request):
+        if kind == 'ip':
+            return self.get_ident(request)
+        if kind == 'email':
+            try:
+                email = request.data.get('email') if hasattr(request.data, 'get') else None
+            except ParseError:
+                # The view reports the malformed body itself.
+                return None
+            if not isinstance(email, str) or not email.strip():
+                return None
+            return hashlib.sha1(email.strip().lower().encode()).hexdigest()
+        if kind == 'endpoint':
+            return '*'
+        raise ValueError(f"Unknown throttle key {kind!r}")
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rules = settings.THROTTLE_RULES.get(scope) if settings.THROTTLE_ENABLED else None
+        if not rules:
+            return True
+        limits = []
+        for kind, rate in rules.items():
+            ident = self.identity(kind, request)
+            if ident is not None:
+                limits.append((f'throttle:{scope}:{kind}:{ident}', *parse_rate(rate)))
+        self.wait_seconds = get_buckets().take(limits, time.time())
+        if self.wait_seconds:
+            with _stats_lock:
+                _rejections[scope] = _rejections.get(scope, 0) + 1
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
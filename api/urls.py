@@ -1,6 +1,15 @@
 from django.urls import path
-from .views import RegisterView, LoginView, ProfileView, CourseTimetableView, SubmitProjectRequestView, ProjectDetailView, SubmitInitialApplicationView, CourseDetailsView, DashboardView,OngoingInternships, ValidateInternshipView
+from .views import RegisterView, LoginView, ProfileView, CourseTimetableView, SubmitProjectRequestView, ProjectDetailView, SubmitInitialApplicationView, CourseDetailsView, DashboardView,OngoingInternships, ValidateInternshipView, DatabasePoolView, CourseMaterialDownloadView, ChunkedUploadView, ChunkedUploadDetailView, UpcomingSessionsView, CourseCalendarView, CalendarFeedView, CourseSearchView, TransitionView, StatsView
 from rest_framework_simplejwt.views import TokenRefreshView
+from django.conf import settings
+
+if settings.API_ASYNC_VIEWS:
+    # Served by uvicorn through src.asgi; see api/async_views.py
+    from .async_views import (
+        AsyncDashboardView as DashboardView,
+        AsyncProfileView as ProfileView,
+        AsyncCourseTimetableView as CourseTimetableView,
+    )
 
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="register"),
@@ -14,10 +23,20 @@ urlpatterns = [
     path("internships/new/", OngoingInternships.as_view(), name="ongoing-internships"),
     path("internships/<int:pk>/", CourseDetailsView.as_view(), name="course-details"),
     path('courses/<int:course_id>/timetable/', CourseTimetableView.as_view(), name='course-timetable'),
+    path('courses/<int:course_id>/calendar.ics', CourseCalendarView.as_view(), name='course-calendar'),
+    path('search/', CourseSearchView.as_view(), name='course-search'),
+    path('sessions/upcoming/', UpcomingSessionsView.as_view(), name='upcoming-sessions'),
+    path('calendar/<str:token>.ics', CalendarFeedView.as_view(), name='calendar-feed'),
     path('submit-initial-application/', SubmitInitialApplicationView.as_view(), name='submit-initial-application'),
     path('submit-project-request/', SubmitProjectRequestView.as_view(), name='submit-project-request'),
     path('projects/<int:pk>/', ProjectDetailView.as_view(), name='project-detail'),
     path('profile/', ProfileView.as_view(), name='profile'),
+    path('db-pool/', DatabasePoolView.as_view(), name='db-pool'),
+    path('materials/<int:pk>/download/', CourseMaterialDownloadView.as_view(), name='material-download'),
+    path('uploads/', ChunkedUploadView.as_view(), name='chunked-upload'),
+    path('uploads/<uuid:pk>/', ChunkedUploadDetailView.as_view(), name='chunked-upload-detail'),
+    path('transitions/', TransitionView.as_view(), name='transitions'),
+    path('stats/', StatsView.as_view(), name='stats'),
     
     
     # ADMIN VIEW HERE
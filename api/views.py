@@ -3,35 +3,83 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from main.models import CustomUser, Timetable, Internship, Project, Profile
-from .serializers import InternshipSerializer, ProfileSerializer, ProjectSerializer, TimetableSerializer, InternshipApplicationSerializer
+from main.models import CustomUser, Course, CourseMaterial, Timetable, Internship, Project, Profile, ChunkedUpload
+from .serializers import InternshipSerializer, ProfileSerializer, ProjectSerializer, TimetableSerializer, InternshipApplicationSerializer, ChunkedUploadSerializer, TransitionSerializer
+from .cache import get_timetable_page
+from .pagination import paginate, CreatedAtCursorPagination, ProjectsCursorPagination
+from .conditional import conditional_get, respond_conditionally
+from .dashboard import dashboard_page, dashboard_state, get_dashboard
+from .notifications import enqueue_application_email, enqueue_project_email
+from .database import pool_stats
+from .metrics import exposition, scrape_allowed
+from .media import UploadError, append_chunk, serve_file
+from .search import FACETS, search_courses
+from .stats import BUCKETS, get_stats
+from .sessions import calendar_token, calendar_versions, enrolled_courses, parse_window, render_calendar, upcoming_sessions, user_for_calendar_token
+from .authentication import StatelessJWTAuthentication
+from .throttling import TokenBucketThrottle
+from rest_framework.authentication import SessionAuthentication
+from django.db.models import Exists, OuterRef
+from main.hashers import HashingBusy
+from main.transitions import transition
 from django.contrib.auth import get_user_model 
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.db import transaction
+from django.http import HttpResponse
+from django.urls import reverse
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.exceptions import NotAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 
 
 
-# from django.core.mail import send_mail
+def hashing_busy_response():
+    return Response(
+        {"error": "Too many sign-ins right now, please retry shortly."},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': '1'},
+    )
+
+
+def internship_querysets(request):
+    user_id = request.user.pk
+    return {
+        'internships': Internship.objects.filter(intern_id=user_id),
+        'courses': Course.objects.filter(internships__intern_id=user_id),
+        'materials': CourseMaterial.objects.filter(course__internships__intern_id=user_id),
+        'timetables': Timetable.objects.filter(course__internships__intern_id=user_id),
+    }
+
+
+def profile_querysets(request):
+    return {
+        **internship_querysets(request),
+        'profile': Profile.objects.filter(user_id=request.user.pk),
+        'projects': Project.objects.filter(user_id=request.user.pk),
+    }
+
+
+def timetable_querysets(request, course_id):
+    return {'timetables': Timetable.objects.filter(course_id=course_id)}
 
-# def send_application_email(self, email):
-#     subject = "Complete Your Internship Application"
-#     message = f"Thank you for your interest! Please complete your application here: [Link to Form]"
-#     from_email = "noreply@quantumstack.com"
-#     recipient_list = [email]
-#     send_mail(subject, message, from_email, recipient_list)
 
 class SubmitProjectRequestView(APIView):
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'project-request'
+
     def post(self, request):
         serializer = ProjectSerializer(data=request.data)
         if serializer.is_valid():
-            # Associate the project with the logged-in user if available
-            if request.user.is_authenticated:
-                serializer.save(user=request.user)
-            else:
-                serializer.save()
+            with transaction.atomic():
+                # Associate the project with the logged-in user if available
+                if request.user.is_authenticated:
+                    serializer.validated_data.pop('user', None)
+                    project = serializer.save(user_id=request.user.pk)
+                else:
+                    project = serializer.save()
+                enqueue_project_email(project)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -45,22 +93,23 @@ class ProjectDetailView(APIView):
             return Response({"detail": "Project not found."}, status=status.HTTP_404_NOT_FOUND)
 
 class ProfileView(APIView):
+    @conditional_get(profile_querysets)
     def get(self, request):
         user = request.user
         
         # Get or create profile for the user
-        profile, created = Profile.objects.get_or_create(user=user)
+        profile, created = Profile.objects.get_or_create(user_id=user.pk)
         
         # Fetch internship and project data
-        internships = Internship.objects.filter(intern=user)
-        projects = Project.objects.filter(user=user)
+        internships = Internship.objects.filter(intern_id=user.pk)
+        projects = Project.objects.filter(user_id=user.pk)
         
         # Serialize profile data
         profile_data = ProfileSerializer(profile).data
         
         # Add related data to the response
-        profile_data['internships'] = InternshipSerializer(internships, many=True).data
-        profile_data['projects'] = ProjectSerializer(projects, many=True).data
+        profile_data['internships'] = InternshipSerializer(internships, many=True, context={'request': request}).data
+        profile_data['projects'] = paginate(request, self, projects, ProjectSerializer, ProjectsCursorPagination)
         
         return Response(profile_data, status=status.HTTP_200_OK)
     
@@ -74,10 +123,12 @@ class ValidateInternshipView(APIView):
 
     def post(self, request):
         internship_id = request.data.get('internship_id')
+        # Anything but a string (a number, a list, JSON null) can never match.
+        internship_id = internship_id.strip().upper() if isinstance(internship_id, str) else ''
         user = request.user
 
-        # Check if the user has the provided internship_id and is an intern
-        if user.internship_id == internship_id and user.is_intern:
+        # Check if the user has the provided internship_id and is an intern (unique index point lookup)
+        if internship_id and CustomUser.objects.filter(internship_id=internship_id, pk=user.pk, is_intern=True).exists():
             return Response({"message": "Access granted"}, status=status.HTTP_200_OK)
         return Response(
             {"error": "Invalid internship ID or you do not have permission"},
@@ -88,19 +139,19 @@ class OngoingInternships(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        user = request.user
-        internships = Internship.objects.filter(intern=user)
-        serializer = InternshipSerializer(internships, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        dashboard = get_dashboard(request.user.pk)
+        data = dashboard_page(request, dashboard, CreatedAtCursorPagination)
+        return Response(data, status=status.HTTP_200_OK)
     
 class CourseDetailsView(APIView):
     def get(self, request, pk):
         user = request.user
         try:
-            internship = Internship.objects.get(id=pk, intern=user)
-            if internship.status == 'Pending':
+            internships = InternshipSerializer.setup_eager_loading(Internship.objects.all())
+            internship = internships.get(id=pk, intern_id=user.pk)
+            if internship.effective_status == 'Pending':
                 return Response({"detail": "Your application is still pending. Please wait for approval."}, status=status.HTTP_403_FORBIDDEN)
-            serializer = InternshipSerializer(internship)
+            serializer = InternshipSerializer(internship, context={'request': request})
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Internship.DoesNotExist:
             return Response({"detail": "Course not found."}, status=status.HTTP_404_NOT_FOUND)
@@ -112,27 +163,182 @@ class DashboardView(APIView):
         if not request.user.is_authenticated:
             raise NotAuthenticated("You are not authenticated.")
 
-        internships = Internship.objects.filter(intern=request.user)
-        serializer = InternshipSerializer(internships, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # One row fetch: the read model's version doubles as the validator.
+        dashboard = get_dashboard(request.user.pk)
+        return respond_conditionally(
+            request,
+            dashboard_state(dashboard),
+            lambda: Response(dashboard_page(request, dashboard, CreatedAtCursorPagination), status=status.HTTP_200_OK),
+        )
 
 
 class CourseTimetableView(APIView):
+    @conditional_get(timetable_querysets)
+    def get(self, request, course_id):
+        return Response(get_timetable_page(course_id, request, self), status=status.HTTP_200_OK)
+
+class UpcomingSessionsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        start, end, limit = parse_window(request.query_params)
+        courses = enrolled_courses(request.user.pk)
+        results = []
+        for session in upcoming_sessions(courses, start, end, limit):
+            row = TimetableSerializer(session).data
+            row['course'] = {'id': session.course_id, 'title': courses[session.course_id]}
+            results.append(row)
+        calendar_url = request.build_absolute_uri(reverse('calendar-feed', args=[calendar_token(request.user.pk)]))
+        return Response(
+            {'from': start, 'to': end, 'results': results, 'calendar_url': calendar_url},
+            status=status.HTTP_200_OK,
+        )
+
+def calendar_response(request, name, course_ids):
+    return respond_conditionally(
+        request,
+        calendar_versions(course_ids),
+        lambda: HttpResponse(render_calendar(name, course_ids), content_type='text/calendar; charset=utf-8'),
+    )
+
+class CourseCalendarView(APIView):
     def get(self, request, course_id):
+        course = get_object_or_404(Course.objects.only('title'), pk=course_id)
+        return calendar_response(request, course.title, [course.pk])
+
+class CalendarFeedView(APIView):
+    # Calendar apps subscribe to the URL without credentials; the signed token identifies the intern.
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, token):
+        user_id = user_for_calendar_token(token)
+        if user_id is None:
+            return Response({"detail": "Calendar not found."}, status=status.HTTP_404_NOT_FOUND)
+        return calendar_response(request, "Quantum Stack sessions", list(enrolled_courses(user_id)))
+
+class CourseSearchView(APIView):
+    # The catalogue is public, so visitors can search it before signing up.
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        params = request.query_params
+        errors, filters = {}, {}
+        for facet in FACETS:
+            value = params.get(facet)
+            if value and value not in dict(Course._meta.get_field(facet).choices):
+                errors[facet] = [f'"{value}" is not a valid choice.']
+            filters[facet] = value
         try:
-            timetables = Timetable.objects.filter(course_id=course_id)
-            serializer = TimetableSerializer(timetables, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Timetable.DoesNotExist:
-            return Response({"error": "Timetable not found"}, status=status.HTTP_404_NOT_FOUND)
+            limit = min(max(int(params.get('limit', 20)), 1), 50)
+            offset = max(int(params.get('offset', 0)), 0)
+        except ValueError:
+            errors['limit'] = ["limit and offset must be integers."]
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(search_courses(params.get('q', ''), filters, limit, offset), status=status.HTTP_200_OK)
+
+class MetricsView(APIView):
+    # Scraped by Prometheus with a static token rather than a JWT.
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        if not scrape_allowed(request):
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+        return HttpResponse(exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+class DatabasePoolView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(pool_stats(), status=status.HTTP_200_OK)
+
+class CourseMaterialDownloadView(APIView):
+    def get(self, request, pk):
+        enrolled = Internship.objects.effective_status_in(('Ongoing', 'Completed')).filter(
+            intern_id=request.user.pk, course_id=OuterRef('course_id'),
+        )
+        material = CourseMaterial.objects.annotate(enrolled=Exists(enrolled)).filter(pk=pk).first()
+        if material is None or not material.file:
+            return Response({"detail": "Material not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not material.enrolled:
+            return Response({"detail": "You are not enrolled in this course."}, status=status.HTTP_403_FORBIDDEN)
+        return serve_file(request, material.file)
+
+class ChunkedUploadView(APIView):
+    # The admin's upload script authenticates with its session.
+    authentication_classes = [SessionAuthentication, StatelessJWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = ChunkedUploadSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save(user_id=request.user.pk)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+class ChunkedUploadDetailView(APIView):
+    authentication_classes = [SessionAuthentication, StatelessJWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, pk):
+        upload = get_object_or_404(ChunkedUpload, pk=pk, user_id=request.user.pk)
+        return Response(ChunkedUploadSerializer(upload).data, status=status.HTTP_200_OK)
+
+    def put(self, request, pk):
+        get_object_or_404(ChunkedUpload, pk=pk, user_id=request.user.pk)
+        try:
+            upload = append_chunk(pk, request.user.pk, request.META.get('HTTP_CONTENT_RANGE'), request.stream)
+        except UploadError as e:
+            data = {"detail": e.detail}
+            if e.upload is not None:
+                data.update(ChunkedUploadSerializer(e.upload).data)
+            return Response(data, status=e.status)
+        return Response(ChunkedUploadSerializer(upload).data, status=status.HTTP_200_OK)
+
+class TransitionView(APIView):
+    # Staff move projects and internships in bulk, from the admin or scripts.
+    authentication_classes = [SessionAuthentication, StatelessJWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = TransitionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        result = transition(
+            data['model'], data['field'], data['ids'], data['target'], user_id=request.user.pk, note=data['note'],
+        )
+        return Response(
+            {'batch': result.batch, 'moved': result.moved, 'skipped': result.skipped}, status=status.HTTP_200_OK,
+        )
+
+class StatsView(APIView):
+    authentication_classes = [SessionAuthentication, StatelessJWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        bucket = request.query_params.get('bucket', 'day')
+        if bucket not in BUCKETS:
+            return Response({"bucket": [f"Expected one of: {', '.join(BUCKETS)}."]}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), settings.STATS_MAX_DAYS)
+        except ValueError:
+            return Response({"days": ["days must be an integer."]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(get_stats(bucket, days), status=status.HTTP_200_OK)
 
 class SubmitInitialApplicationView(APIView):
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'application'
+
     def post(self, request):
         serializer = InternshipApplicationSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
-            # Send email with link to full application form
-            # self.send_application_email(serializer.validated_data['email'])
+            with transaction.atomic():
+                application = serializer.save()
+                # Email with link to full application form, sent by the outbox worker
+                enqueue_application_email(application)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -143,6 +349,8 @@ class SubmitInitialApplicationView(APIView):
 @method_decorator(csrf_exempt, name='dispatch')
 class RegisterView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'register'
     
     def post(self, request):
         email = request.data.get("email")
@@ -155,29 +363,29 @@ class RegisterView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Check if email already exists
-        if CustomUser.objects.filter(email=email).exists():
-            return Response(
-                {"error": "Email already exists"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
         try:
-            # Create user
-            user = CustomUser.objects.create_user(
+            # Create user; None means the email already exists
+            user = CustomUser.objects.create_user_if_absent(
                 email=email,
                 password=password
             )
-            
-            # Generate tokens
-            refresh = RefreshToken.for_user(user)
+            if user is None:
+                return Response(
+                    {"error": "Email already exists"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # Generate tokens (with the same claims as LoginView)
+            refresh = CustomTokenObtainPairSerializer.get_token(user)
             
             return Response({
                 "message": "User registered successfully",
                 "access_token": str(refresh.access_token),
                 "refresh_token": str(refresh)
             }, status=status.HTTP_201_CREATED)
-            
+
+        except HashingBusy:
+            return hashing_busy_response()
         except Exception as e:
             return Response(
                 {"error": str(e)},
@@ -189,7 +397,9 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
-        # You can add custom claims here if needed
+        # Claims read by StatelessJWTAuthentication so most requests skip the user query
+        token['is_intern'] = user.is_intern
+        token['internship_id'] = user.internship_id
         return token
 
     def validate(self, attrs):
@@ -204,4 +414,10 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 class LoginView(TokenObtainPairView):
-    serializer_class = CustomTokenObtainPairSerializer
\ No newline at end of file
+    serializer_class = CustomTokenObtainPairSerializer
+
+    def post(self, request, *args, **kwargs):
+        try:
+            return super().post(request, *args, **kwargs)
+        except HashingBusy:
+            return hashing_busy_response()
\ No newline at end of file
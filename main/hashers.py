@@ -0,0 +1,71 @@
+"""
+Password hashing: Argon2 with parameters from settings, run on a bounded pool.
+
+argon2-cffi releases the GIL while hashing, so request threads are not
+serialised behind one another. The pool caps how many hashes run at once, so
+a signup burst cannot take more CPU and memory (ARGON2_MEMORY_COST KiB per
+hash) than the box has. Callers wait up to PASSWORD_HASHING_TIMEOUT seconds
+for a slot and get `HashingBusy` after that.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, make_password, verify_password
+
+
+class HashingBusy(Exception):
+    """Every hashing slot stayed taken for PASSWORD_HASHING_TIMEOUT seconds."""
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id with costs taken from settings; older hashes are upgraded on login."""
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _pool():
+    global _executor, _slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                workers = settings.PASSWORD_HASHING_THREADS
+                # Workers plus a short queue; anything past that waits for a slot.
+                _slots = threading.BoundedSemaphore(workers * 2)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+    return _executor, _slots
+
+
+def run_hashing(func, *args):
+    """Run `func(*args)` on the hashing pool and wait for the result."""
+    executor, slots = _pool()
+    if not slots.acquire(timeout=settings.PASSWORD_HASHING_TIMEOUT):
+        raise HashingBusy
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def hash_password(raw_password):
+    return run_hashing(make_password, raw_password)
+
+
+def check_password_hash(raw_password, encoded):
+    """Return (is_correct, must_update) for `encoded`, computed on the pool."""
+    return run_hashing(verify_password, raw_password, encoded)
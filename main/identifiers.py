@@ -0,0 +1,95 @@
+"""
+Internship ID allocation.
+
+IDs look like ``QTS-000-0000`` and are derived from an increasing integer.
+On Postgres the integer comes from a sequence: ``nextval`` never blocks and
+is not rolled back with the caller's transaction. Other databases reserve
+blocks of numbers from an `IdentifierBlock` row and hand them out from
+memory, so the counter row is touched once per block rather than per ID.
+"""
+import threading
+
+from django.db import connection, transaction
+from django.db.models import F
+
+INTERNSHIP_ID_PREFIX = 'QTS'
+INTERNSHIP_ID_CAPACITY = 1000 * 10000
+INTERNSHIP_ID_SEQUENCE = 'main_internship_id_seq'
+BLOCK_SIZE = 20
+
+
+def format_internship_id(number):
+    if not 0 < number < INTERNSHIP_ID_CAPACITY:
+        raise ValueError(f"Internship ID space exhausted at {number}")
+    return f'{INTERNSHIP_ID_PREFIX}-{number // 10000:03d}-{number % 10000:04d}'
+
+
+def parse_internship_id(value):
+    """Inverse of `format_internship_id`; returns None for anything else."""
+    parts = (value or '').split('-')
+    if len(parts) != 3 or parts[0] != INTERNSHIP_ID_PREFIX or not (parts[1] + parts[2]).isdigit():
+        return None
+    if len(parts[1]) != 3 or len(parts[2]) != 4:
+        return None
+    return int(parts[1]) * 10000 + int(parts[2])
+
+
+class BlockAllocator:
+    """
+    Per-process counter refilled BLOCK_SIZE numbers at a time from the database.
+
+    A reservation made inside a transaction that later rolls back can be
+    handed out again; the unique index on `internship_id` turns that into an
+    IntegrityError rather than a duplicate. Postgres uses the sequence instead.
+    """
+
+    def __init__(self, name, block_size=BLOCK_SIZE):
+        self.name = name
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = self._end = 0
+
+    def _reserve_block(self):
+        from main.models import IdentifierBlock
+
+        with transaction.atomic():
+            IdentifierBlock.objects.get_or_create(name=self.name)
+            IdentifierBlock.objects.filter(name=self.name).update(next_value=F('next_value') + self.block_size)
+            end = IdentifierBlock.objects.get(name=self.name).next_value
+        return end - self.block_size, end
+
+    def allocate(self):
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = self._reserve_block()
+            number = self._next
+            self._next += 1
+            return number
+
+
+_block_allocator = BlockAllocator('internship_id')
+
+
+def next_internship_number():
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT nextval(%s)', [INTERNSHIP_ID_SEQUENCE])
+            return cursor.fetchone()[0]
+    return _block_allocator.allocate()
+
+
+def allocate_internship_id():
+    return format_internship_id(next_internship_number())
+
+
+def assign_internship_ids(user_ids):
+    """Mark users with an approved internship as interns, allocating IDs where missing."""
+    from main.models import CustomUser
+
+    missing = CustomUser.objects.filter(pk__in=user_ids, internship_id__isnull=True).values_list('pk', flat=True)
+    for user_id in list(missing):
+        # Guarded update: a concurrent approval that got there first simply wins.
+        CustomUser.objects.filter(pk=user_id, internship_id__isnull=True).update(
+            internship_id=allocate_internship_id(), is_intern=True,
+        )
+    CustomUser.objects.filter(pk__in=user_ids, is_intern=False).update(is_intern=True)
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_alter_profile_date_of_birth'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='internship',
+            index=models.Index(fields=['intern', 'created_at', 'id'], name='internship_intern_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='project_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timetable',
+            index=models.Index(fields=['course', 'start_time', 'id'], name='timetable_course_start_idx'),
+        ),
+    ]
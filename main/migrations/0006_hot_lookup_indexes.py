@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coursematerial',
+            index=models.Index(fields=['material_type', 'course'], name='material_type_course_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='internship',
+            index=models.Index(condition=models.Q(('status__in', ['Completed', 'Cancelled']), _negated=True), fields=['intern', 'status'], name='internship_intern_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='internship',
+            index=models.Index(fields=['status', 'course'], name='internship_status_course_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('status__in', ['Completed', 'Cancelled']), _negated=True), fields=['user', 'status'], name='project_user_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', 'payment_status'], name='project_status_payment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['payment_status'], name='project_payment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timetable',
+            index=models.Index(condition=models.Q(('is_live_session', True)), fields=['start_time'], name='timetable_live_start_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:29
+
+from django.db import migrations, models
+
+
+def seed_allocator(apps, schema_editor):
+    CustomUser = apps.get_model('main', 'CustomUser')
+    IdentifierBlock = apps.get_model('main', 'IdentifierBlock')
+
+    # Blank IDs would collide under the new unique index.
+    CustomUser.objects.filter(internship_id='').update(internship_id=None)
+
+    # Start numbering after any QTS-000-0000 IDs that were entered by hand.
+    highest = 0
+    for value in CustomUser.objects.filter(internship_id__startswith='QTS-').values_list('internship_id', flat=True):
+        digits = value[4:].replace('-', '')
+        if digits.isdigit():
+            highest = max(highest, int(digits))
+
+    # Hand-entered IDs may repeat. The oldest account keeps its ID and the
+    # others get fresh ones, so the unique index below can be built.
+    duplicated = (
+        CustomUser.objects.exclude(internship_id=None).order_by().values('internship_id')
+        .annotate(users=models.Count('pk')).filter(users__gt=1).values_list('internship_id', flat=True)
+    )
+    kept = set()
+    for pk, value in CustomUser.objects.filter(internship_id__in=list(duplicated)).order_by('pk').values_list('pk', 'internship_id'):
+        if value not in kept:
+            kept.add(value)
+            continue
+        highest += 1
+        CustomUser.objects.filter(pk=pk).update(internship_id=f'QTS-{highest // 10000:03d}-{highest % 10000:04d}')
+    IdentifierBlock.objects.update_or_create(name='internship_id', defaults={'next_value': highest + 1})
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'CREATE SEQUENCE IF NOT EXISTS main_internship_id_seq START WITH {highest + 1} CACHE 20')
+
+
+def drop_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP SEQUENCE IF EXISTS main_internship_id_seq')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdentifierBlock',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(seed_allocator, drop_sequence),
+        migrations.AlterField(
+            model_name='customuser',
+            name='internship_id',
+            field=models.CharField(blank=True, max_length=12, null=True, unique=True),
+        ),
+    ]
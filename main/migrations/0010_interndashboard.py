@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_media_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InternDashboard',
+            fields=[
+                ('intern', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dashboard', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('document', models.JSONField(default=dict)),
+                ('version', models.PositiveBigIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:57
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Weights: A title, B category/language/framework, C description, D material titles.
+COURSE_VECTOR = """
+    setweight(to_tsvector('english', coalesce({row}.title, '')), 'A')
+    || setweight(to_tsvector('english', concat_ws(' ', {row}.category, {row}.language, {row}.framework)), 'B')
+    || setweight(to_tsvector('english', coalesce({row}.description, '')), 'C')
+    || setweight(to_tsvector('english', coalesce(
+        (SELECT string_agg(m.title, ' ') FROM main_coursematerial m WHERE m.course_id = {row}.id), ''
+    )), 'D')
+"""
+
+CREATE_SQL = [
+    f"""
+    CREATE OR REPLACE FUNCTION main_course_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {COURSE_VECTOR.format(row='NEW')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER main_course_search_vector_update
+    BEFORE INSERT OR UPDATE ON main_course
+    FOR EACH ROW EXECUTE FUNCTION main_course_search_vector()
+    """,
+    # A material change rewrites its course's vector by touching the course row.
+    """
+    CREATE OR REPLACE FUNCTION main_coursematerial_touch_course() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP <> 'INSERT' THEN
+            UPDATE main_course SET search_vector = NULL WHERE id = OLD.course_id;
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            UPDATE main_course SET search_vector = NULL WHERE id = NEW.course_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER main_coursematerial_search_insert_delete
+    AFTER INSERT OR DELETE ON main_coursematerial
+    FOR EACH ROW EXECUTE FUNCTION main_coursematerial_touch_course()
+    """,
+    """
+    CREATE TRIGGER main_coursematerial_search_update
+    AFTER UPDATE OF title, course_id ON main_coursematerial
+    FOR EACH ROW
+    WHEN (OLD.title IS DISTINCT FROM NEW.title OR OLD.course_id IS DISTINCT FROM NEW.course_id)
+    EXECUTE FUNCTION main_coursematerial_touch_course()
+    """,
+    f"UPDATE main_course SET search_vector = {COURSE_VECTOR.format(row='main_course')}",
+    "CREATE INDEX main_course_search_vector_gin ON main_course USING gin (search_vector)",
+]
+
+DROP_SQL = [
+    "DROP INDEX IF EXISTS main_course_search_vector_gin",
+    "DROP TRIGGER IF EXISTS main_coursematerial_search_update ON main_coursematerial",
+    "DROP TRIGGER IF EXISTS main_coursematerial_search_insert_delete ON main_coursematerial",
+    "DROP FUNCTION IF EXISTS main_coursematerial_touch_course()",
+    "DROP TRIGGER IF EXISTS main_course_search_vector_update ON main_course",
+    "DROP FUNCTION IF EXISTS main_course_search_vector()",
+]
+
+
+def create_search_triggers(apps, schema_editor):
+    # Other databases search with the in-process index in api/search.py.
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in CREATE_SQL:
+            schema_editor.execute(statement)
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in DROP_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_interndashboard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_course_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransitionLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('field', models.CharField(max_length=50)),
+                ('source', models.CharField(max_length=20)),
+                ('target', models.CharField(max_length=20)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('batch', models.UUIDField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'object_id', 'created_at'], name='transition_object_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_transition_log'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='internship',
+            name='duration',
+        ),
+        migrations.AddIndex(
+            model_name='internship',
+            index=models.Index(condition=models.Q(('status', 'Pending')), fields=['starting_date'], name='internship_pending_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='internship',
+            index=models.Index(condition=models.Q(('status', 'Ongoing')), fields=['completion_date'], name='internship_ongoing_end_idx'),
+        ),
+    ]
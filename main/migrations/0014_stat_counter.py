@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:06
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+# model name: (metric prefix, counted fields), as api.stats.COUNTED stood when the counters were added.
+COUNTED = {
+    'InternshipApplication': ('applications', ('mode',)),
+    'Project': ('projects', ('status', 'payment_status')),
+    'Internship': ('internships', ('course_id', 'status')),
+}
+
+
+def fill_counters(apps, schema_editor):
+    counts = Counter()
+    for model_name, (prefix, fields) in COUNTED.items():
+        model = apps.get_model('main', model_name)
+        for row in model.objects.order_by().values(*fields).annotate(n=Count('pk')):
+            if model_name == 'Internship':
+                counts[(f'{prefix}.course_status', f"{row['course_id']}:{row['status']}")] += row['n']
+            else:
+                for field in fields:
+                    counts[(f'{prefix}.{field}', row[field])] += row['n']
+        days = model.objects.order_by().annotate(day=TruncDate('created_at')).values('day').annotate(n=Count('pk'))
+        for row in days:
+            counts[(f'{prefix}.day', row['day'].isoformat())] += row['n']
+
+    StatCounter = apps.get_model('main', 'StatCounter')
+    StatCounter.objects.bulk_create(
+        [StatCounter(metric=metric, key=key, count=count) for (metric, key), count in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_derived_internship_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=50)),
+                ('key', models.CharField(max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('metric', 'key'), name='stat_counter_metric_key_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
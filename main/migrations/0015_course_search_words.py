@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:12
+
+from django.db import migrations
+
+# Words are runs of Unicode letters and digits, as api.search.TOKEN_RE reads them, and are matched
+# unstemmed ('simple'), so the vector holds exactly the tokens of the in-process index.
+WORDS_FUNCTION = r"""
+    CREATE OR REPLACE FUNCTION main_search_words(text) RETURNS text AS $$
+        SELECT regexp_replace(coalesce($1, ''), '[\W_]+', ' ', 'g')
+    $$ LANGUAGE sql IMMUTABLE
+"""
+
+# Weights: A title, B category/language/framework, C description, D material titles.
+COURSE_VECTOR = """
+    setweight(to_tsvector('simple', main_search_words({row}.title)), 'A')
+    || setweight(to_tsvector('simple', main_search_words(concat_ws(' ', {row}.category, {row}.language, {row}.framework))), 'B')
+    || setweight(to_tsvector('simple', main_search_words({row}.description)), 'C')
+    || setweight(to_tsvector('simple', main_search_words(
+        (SELECT string_agg(m.title, ' ') FROM main_coursematerial m WHERE m.course_id = {row}.id)
+    )), 'D')
+"""
+
+# As migration 0011 created it.
+ENGLISH_COURSE_VECTOR = """
+    setweight(to_tsvector('english', coalesce({row}.title, '')), 'A')
+    || setweight(to_tsvector('english', concat_ws(' ', {row}.category, {row}.language, {row}.framework)), 'B')
+    || setweight(to_tsvector('english', coalesce({row}.description, '')), 'C')
+    || setweight(to_tsvector('english', coalesce(
+        (SELECT string_agg(m.title, ' ') FROM main_coursematerial m WHERE m.course_id = {row}.id), ''
+    )), 'D')
+"""
+
+
+def vector_sql(vector):
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION main_course_search_vector() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {vector.format(row='NEW')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        f"UPDATE main_course SET search_vector = {vector.format(row='main_course')}",
+    ]
+
+
+def use_search_words(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in [WORDS_FUNCTION, *vector_sql(COURSE_VECTOR)]:
+            schema_editor.execute(statement)
+
+
+def use_english_config(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in [*vector_sql(ENGLISH_COURSE_VECTOR), "DROP FUNCTION IF EXISTS main_search_words(text)"]:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_stat_counter'),
+    ]
+
+    operations = [
+        migrations.RunPython(use_search_words, use_english_config),
+    ]
@@ -1,9 +1,17 @@
-from django.db import models 
+from django.db import IntegrityError, connections, models, router, transaction
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import FileExtensionValidator
 from django.core.validators import EmailValidator
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
+from django.conf import settings
+import os
+import uuid
+from .hashers import hash_password
+from .identifiers import allocate_internship_id
+from .transitions import TracksTransitions, check_transitions, effective_status_expression, effective_status_q
 
 
 # models.py
@@ -20,6 +28,51 @@ class CustomUserManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
+    def create_user_if_absent(self, email, password, **extra_fields):
+        """
+        Create a user in one round trip, or return None if the email is taken.
+
+        Uses INSERT ... ON CONFLICT (email) DO NOTHING RETURNING id, so a
+        concurrent signup with the same email cannot slip in between a check and
+        the insert. The password is hashed on the hashing pool first. Backends
+        without ON CONFLICT fall back to create_user() and the unique index.
+        """
+        email = self.normalize_email(email)
+        user = self.model(email=email, **extra_fields)
+        user.password = hash_password(password)
+        if user.is_intern and not user.internship_id:
+            user.internship_id = allocate_internship_id()
+        db = self._db or router.db_for_write(self.model)
+        connection = connections[db]
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            try:
+                with transaction.atomic(using=db):
+                    user.save(using=db)
+            except IntegrityError:
+                return None
+            return user
+
+        opts = self.model._meta
+        fields = [f for f in opts.concrete_fields if not f.primary_key]
+        qn = connection.ops.quote_name
+        sql = 'INSERT INTO %s (%s) VALUES (%s) ON CONFLICT (%s) DO NOTHING RETURNING %s' % (
+            qn(opts.db_table),
+            ', '.join(qn(f.column) for f in fields),
+            ', '.join(['%s'] * len(fields)),
+            qn(opts.get_field('email').column),
+            qn(opts.pk.column),
+        )
+        params = [f.get_db_prep_save(f.pre_save(user, True), connection) for f in fields]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        user.pk = row[0]
+        user._state.adding = False
+        user._state.db = db
+        return user
+
     def create_superuser(self, email, password=None, **extra_fields):
         extra_fields.setdefault('is_staff', True)
         extra_fields.setdefault('is_superuser', True)
@@ -32,7 +85,7 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     username = models.CharField(max_length=150, null=True, blank=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
-    internship_id = models.CharField(max_length=12, blank=True, null=True)
+    internship_id = models.CharField(max_length=12, blank=True, null=True, unique=True)
     is_intern = models.BooleanField(default=False)   
     date_joined = models.DateTimeField(auto_now_add=True)
 
@@ -41,6 +94,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
+    def save(self, *args, **kwargs):
+        # IDs are auto generated, in the format QTS-000-0000
+        if not self.internship_id:
+            self.internship_id = allocate_internship_id() if self.is_intern else None
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.email
     
@@ -58,15 +117,19 @@ class Profile(models.Model):
     first_name = models.CharField(max_length=150)
     last_name = models.CharField(max_length=150)
     date_of_birth = models.DateField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Downscaled JPEG/WebP copies of profile_pic, written by `process_media`
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
     
 
-class Project(models.Model):
+class Project(TracksTransitions, models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True)  # Optional if user is logged in
     email = models.EmailField(validators=[EmailValidator()], null=False, blank=False)
     title = models.CharField(max_length=100, null=False, blank=False)
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     expected_completion_date = models.DateField(null=True, blank=True)  # Set by admin
+    updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(
         max_length=20,
         choices=[
@@ -87,9 +150,34 @@ class Project(models.Model):
         default="Pending",
     )
 
+    class Meta:
+        indexes = [
+            # ProfileView's keyset pagination: WHERE user_id = ? ORDER BY created_at, id
+            models.Index(fields=['user', 'created_at', 'id'], name='project_user_created_idx'),
+            # A user's open projects; finished ones never need this lookup
+            models.Index(
+                fields=['user', 'status'],
+                condition=~models.Q(status__in=['Completed', 'Cancelled']),
+                name='project_user_open_idx',
+            ),
+            # Admin list filters
+            models.Index(fields=['status', 'payment_status'], name='project_status_payment_idx'),
+            models.Index(fields=['payment_status'], name='project_payment_idx'),
+        ]
+
+    def clean(self):
+        # Status changes follow the edges declared in main.transitions.
+        check_transitions(self)
+
     def __str__(self):
         return f"{self.title} - {self.get_status_display()}"
 
+class CourseManager(models.Manager):
+    def get_queryset(self):
+        # The search vector is only ever filtered and ranked on in SQL; never load it.
+        return super().get_queryset().defer('search_vector')
+
+
 class Course(models.Model):
     COURSE_CHOICES = [
         ('software_dev', 'Software Development'),
@@ -121,6 +209,11 @@ class Course(models.Model):
     language = models.CharField(max_length=50, choices=LANGUAGE_CHOICES, help_text="Language used in the course")
     framework = models.CharField(max_length=50, choices=FRAMEWORK_CHOICES, help_text="Framework used in the course")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Kept current by Postgres triggers (migration 0011) from the course and its material titles; see api/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = CourseManager()
 
     def __str__(self):
         return f"{self.title} ({self.language} - {self.framework})"
@@ -140,21 +233,26 @@ class InternshipApplication(models.Model):
     def __str__(self):
         return f"{self.email} - {self.get_mode_display()}"
     
-class Internship(models.Model):
+DAYS_PER_MONTH = 365.25 / 12
+
+
+class InternshipQuerySet(models.QuerySet):
+    def with_effective_status(self, today=None):
+        """Annotate ``effective_status``: the stored status moved forward by the dates."""
+        return self.annotate(effective_status=effective_status_expression(today))
+
+    def effective_status_in(self, statuses, today=None):
+        return self.filter(effective_status_q(statuses, today))
+
+
+class Internship(TracksTransitions, models.Model):
     intern = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='internships')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     starting_date = models.DateField()
     completion_date = models.DateField()
-    duration = models.CharField(
-        max_length=20,
-        choices=[
-            ("3 Months", "3 Months"),
-            ("6 Months", "6 Months"),
-            ("9 Months", "9 Months"),
-            ("12 Months", "12 Months"),
-        ],
-    )
+    # Staff set Pending, Ongoing or Cancelled; the dates move it on (see main.transitions).
     status = models.CharField(
         max_length=20,
         choices=[
@@ -166,10 +264,38 @@ class Internship(models.Model):
         default="Pending",
     )
 
+    class Meta:
+        indexes = [
+            # Dashboard keyset pagination: WHERE intern_id = ? ORDER BY created_at, id
+            models.Index(fields=['intern', 'created_at', 'id'], name='internship_intern_created_idx'),
+            # An intern's active internships
+            models.Index(
+                fields=['intern', 'status'],
+                condition=~models.Q(status__in=['Completed', 'Cancelled']),
+                name='internship_intern_active_idx',
+            ),
+            # Admin status filter and per-course enrolment counts
+            models.Index(fields=['status', 'course'], name='internship_status_course_idx'),
+            # reconcile_internships and effective-status filters: rows the dates have moved on
+            models.Index(fields=['starting_date'], condition=models.Q(status='Pending'), name='internship_pending_start_idx'),
+            models.Index(fields=['completion_date'], condition=models.Q(status='Ongoing'), name='internship_ongoing_end_idx'),
+        ]
+
+    objects = InternshipQuerySet.as_manager()
+
+    @property
+    def duration(self):
+        """Length in whole months, e.g. "3 Months", from the two dates."""
+        if not (self.starting_date and self.completion_date):
+            return None
+        months = max(1, round((self.completion_date - self.starting_date).days / DAYS_PER_MONTH))
+        return f"{months} Month{'s' if months != 1 else ''}"
+
     def clean(self):
         # Ensure completion_date is after starting_date
         if self.completion_date <= self.starting_date:
             raise ValidationError("Completion date must be after the starting date.")
+        check_transitions(self)
 
     def __str__(self):
         return f"{self.intern.email} Internship ({self.course.title})"
@@ -193,6 +319,15 @@ class CourseMaterial(models.Model):
         help_text="Upload a video, image, or PDF file"
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Thumbnails (and a poster frame for videos), written by `process_media`
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Admin material_type filter, optionally narrowed to a course
+            models.Index(fields=['material_type', 'course'], name='material_type_course_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.get_material_type_display()})"
@@ -205,6 +340,163 @@ class Timetable(models.Model):
     is_live_session = models.BooleanField(default=False, help_text="Is this a live session?")
     location = models.CharField(max_length=255, blank=True, null=True, help_text="Location of the session (if applicable)")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Timetable keyset pagination: WHERE course_id = ? ORDER BY start_time, id
+            models.Index(fields=['course', 'start_time', 'id'], name='timetable_course_start_idx'),
+            # Live sessions are a small slice of the table
+            models.Index(fields=['start_time'], condition=models.Q(is_live_session=True), name='timetable_live_start_idx'),
+        ]
+
+    def clean(self):
+        # Range queries only look back this far for sessions that started before the window.
+        if self.start_time and self.end_time:
+            if self.end_time <= self.start_time:
+                raise ValidationError({'end_time': "End time must be after the start time."})
+            if self.end_time - self.start_time > settings.TIMETABLE_MAX_SESSION_LENGTH:
+                raise ValidationError({'end_time': f"Sessions can last at most {settings.TIMETABLE_MAX_SESSION_LENGTH}."})
+
+    def __str__(self):
+        return f"{self.title} ({self.course.title})"
+
+class OutboxMessage(models.Model):
+    """An outgoing email, stored with the write that caused it and sent by `process_outbox`."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # process_outbox: WHERE status = 'pending' AND next_attempt_at <= now ORDER BY next_attempt_at
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.status})"
+
+
+class MediaJob(models.Model):
+    """Rendition work for an uploaded image or video, picked up by `process_media`."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    model = models.CharField(max_length=100)  # app_label.ModelName
+    object_id = models.BigIntegerField()
+    field = models.CharField(max_length=50)
+    source = models.CharField(max_length=255)  # file name when the job was queued
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # process_media: WHERE status = 'pending' AND next_attempt_at <= now ORDER BY next_attempt_at
+            models.Index(fields=['status', 'next_attempt_at'], name='media_job_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id} {self.field} ({self.status})"
+
+
+class InternDashboard(models.Model):
+    """Precomputed dashboard payload for one intern, kept current by `api.dashboard`."""
+    intern = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='dashboard')
+    # {"internships": {id: row with course id}, "courses": {id: course payload}}
+    document = models.JSONField(default=dict)
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Dashboard for {self.intern_id} (v{self.version})"
+
+
+class TransitionLog(models.Model):
+    """One status change made by `main.transitions.transition`; rows are only ever inserted."""
+    model = models.CharField(max_length=100)  # app_label.ModelName
+    object_id = models.BigIntegerField()
+    field = models.CharField(max_length=50)
+    source = models.CharField(max_length=20)
+    target = models.CharField(max_length=20)
+    user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    note = models.CharField(max_length=255, blank=True)
+    batch = models.UUIDField()  # shared by every row moved in one call
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # An object's history: WHERE model = ? AND object_id = ? ORDER BY created_at
+            models.Index(fields=['model', 'object_id', 'created_at'], name='transition_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id} {self.field} {self.source} -> {self.target}"
+
+
+class StatCounter(models.Model):
+    """A running count kept by `api.stats`, e.g. metric "projects.status", key "Pending"."""
+    metric = models.CharField(max_length=50)
+    key = models.CharField(max_length=100)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'key'], name='stat_counter_metric_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric}[{self.key}] = {self.count}"
+
+
+class IdentifierBlock(models.Model):
+    """High-water mark for numbers handed out in blocks by `main.identifiers.BlockAllocator`."""
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
+class ChunkedUpload(models.Model):
+    """A resumable upload, appended to `path` one Content-Range chunk at a time."""
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='chunked_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{self.pk}.part')
 
     def __str__(self):
-        return f"{self.title} ({self.course.title})"
\ No newline at end of file
+        return f"{self.filename} ({self.offset}/{self.size})"
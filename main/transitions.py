@@ -0,0 +1,235 @@
+"""
+Status state machines for projects and internships.
+
+Each `Machine` declares the legal edges of one status field. `transition`
+moves any number of rows to a target state in batches. Each batch runs in
+one transaction: it locks the candidate rows, runs a single guarded
+``UPDATE ... WHERE id IN (...) AND <field> IN (<legal sources>)``, bulk
+inserts one `TransitionLog` row per moved record and sends `transitioned`.
+Rows that are already at the target, in a state the target cannot be
+reached from, or missing are skipped rather than failing the batch.
+
+Single records edited through a form go through ``clean()`` instead, which
+checks the edge against the value the row was loaded with.
+
+Internships also move on their own dates: from its starting date an
+internship counts as Ongoing and from its completion date as Completed.
+Queries see that straight away through `effective_status_q` and the
+``effective_status`` annotation; `reconcile_internships` stores it nightly.
+"""
+import uuid
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.dispatch import Signal
+from django.utils import timezone
+
+# Sent inside the batch's transaction; .update() skips post_save.
+transitioned = Signal()  # sender=model, field, target, rows=[(pk, source)]
+
+
+class IllegalTransition(Exception):
+    """No declared edge leads to the requested state."""
+
+
+class Machine:
+    def __init__(self, model_label, field, edges):
+        self.model_label = model_label
+        self.field = field
+        self.edges = edges
+
+    @property
+    def targets(self):
+        return sorted({target for targets in self.edges.values() for target in targets})
+
+    def sources(self, target):
+        return sorted(source for source, targets in self.edges.items() if target in targets)
+
+    def allows(self, source, target):
+        return source == target or target in self.edges.get(source, ())
+
+
+MACHINES = {
+    ('main.Project', 'status'): Machine('main.Project', 'status', {
+        'Pending': {'Processing', 'Cancelled'},
+        'Processing': {'Completed', 'Cancelled'},
+    }),
+    ('main.Project', 'payment_status'): Machine('main.Project', 'payment_status', {
+        'Pending': {'Paid', 'Failed'},
+        'Failed': {'Pending', 'Paid'},
+    }),
+    ('main.Internship', 'status'): Machine('main.Internship', 'status', {
+        'Pending': {'Ongoing', 'Cancelled'},
+        'Ongoing': {'Completed', 'Cancelled'},
+    }),
+}
+
+
+def machines_for(model):
+    return [machine for (label, _), machine in MACHINES.items() if label == model._meta.label]
+
+
+def get_machine(model, field):
+    machine = MACHINES.get((model._meta.label, field))
+    if machine is None:
+        raise IllegalTransition(f"{model._meta.label}.{field} has no state machine.")
+    return machine
+
+
+class TracksTransitions:
+    """Model mixin remembering the states a row was loaded with, for `check_transitions`."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_states = {
+            machine.field: instance.__dict__[machine.field]
+            for machine in machines_for(cls) if machine.field in instance.__dict__
+        }
+        return instance
+
+
+def check_transitions(instance):
+    """Raise ValidationError if a loaded instance's status fields moved along an undeclared edge."""
+    loaded = getattr(instance, '_loaded_states', {})
+    errors = {}
+    for machine in machines_for(type(instance)):
+        source, target = loaded.get(machine.field), getattr(instance, machine.field)
+        if source is not None and not machine.allows(source, target):
+            errors[machine.field] = [f"Cannot move from {source} to {target}."]
+    if errors:
+        raise ValidationError(errors)
+
+
+@dataclass
+class TransitionResult:
+    batch: uuid.UUID
+    moved: int = 0
+    skipped: list = field(default_factory=list)  # ids not moved
+
+
+def transition(model, field, ids, target, user_id=None, note='', batch_size=None):
+    """
+    Move the rows of `model` with the given `ids` to `target` along the
+    declared edges of `field`. Raises IllegalTransition if no edge leads to
+    `target`; rows it cannot move are reported in ``result.skipped``.
+    """
+    from main.models import TransitionLog
+
+    machine = get_machine(model, field)
+    sources = machine.sources(target)
+    if not sources:
+        raise IllegalTransition(f"No {model._meta.label}.{field} transition leads to {target}.")
+    batch_size = batch_size or settings.TRANSITION_BATCH_SIZE
+    # Sorted, so concurrent callers lock rows in the same order.
+    ids = sorted({int(pk) for pk in ids})
+    result = TransitionResult(batch=uuid.uuid4())
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                model._default_manager.select_for_update()
+                .filter(pk__in=batch, **{f'{field}__in': sources})
+                .order_by('pk').values_list('pk', field)
+            )
+            if rows:
+                model._default_manager.filter(pk__in=[pk for pk, _ in rows], **{f'{field}__in': sources}).update(
+                    **{field: target, 'updated_at': now},
+                )
+                TransitionLog.objects.bulk_create([
+                    TransitionLog(
+                        model=model._meta.label, object_id=pk, field=field, source=source, target=target,
+                        user_id=user_id, note=note, batch=result.batch, created_at=now,
+                    )
+                    for pk, source in rows
+                ])
+                transitioned.send(sender=model, field=field, target=target, rows=rows)
+        moved = {pk for pk, _ in rows}
+        result.moved += len(moved)
+        result.skipped += [pk for pk in batch if pk not in moved]
+    return result
+
+
+INTERNSHIP_FINAL_STATES = ('Completed', 'Cancelled')
+
+
+def effective_status_expression(today=None):
+    """The ``effective_status`` annotation: the stored status, moved forward by the dates."""
+    today = today or timezone.localdate()
+    return Case(
+        When(status__in=INTERNSHIP_FINAL_STATES, then=F('status')),
+        When(completion_date__lte=today, then=Value('Completed')),
+        When(starting_date__lte=today, then=Value('Ongoing')),
+        default=F('status'),
+    )
+
+
+def effective_status(status, starting_date, completion_date, today=None):
+    """`effective_status_expression` for one row's values."""
+    today = today or timezone.localdate()
+    if status in INTERNSHIP_FINAL_STATES:
+        return status
+    if completion_date <= today:
+        return 'Completed'
+    if starting_date <= today:
+        return 'Ongoing'
+    return status
+
+
+def effective_status_q(statuses, today=None, prefix=''):
+    """
+    Internships whose effective status is one of `statuses`, as conditions on
+    the stored columns so the status indexes still apply. `prefix` reaches
+    internships through a relation, e.g. ``'internships__'``.
+    """
+    today = today or timezone.localdate()
+    conditions = {
+        'Pending': Q(status='Pending', starting_date__gt=today),
+        'Ongoing': (
+            Q(status='Ongoing', completion_date__gt=today)
+            | Q(status='Pending', starting_date__lte=today, completion_date__gt=today)
+        ),
+        'Completed': Q(status='Completed') | Q(status__in=('Pending', 'Ongoing'), completion_date__lte=today),
+        'Cancelled': Q(status='Cancelled'),
+    }
+    query = Q()
+    for status in statuses:
+        query |= conditions[status]
+    if prefix:
+        query = _prefixed(query, prefix)
+    return query
+
+
+def _prefixed(query, prefix):
+    children = [
+        _prefixed(child, prefix) if isinstance(child, Q) else (prefix + child[0], child[1])
+        for child in query.children
+    ]
+    return Q(*children, _connector=query.connector, _negated=query.negated)
+
+
+def reconcile_internships(today=None, batch_size=None):
+    """
+    Store the status the dates imply for every internship that has moved on,
+    through `transition` so each change is guarded, logged and announced.
+    Returns ``{target: TransitionResult}``.
+    """
+    from main.models import Internship
+
+    today = today or timezone.localdate()
+    due = {
+        # Pending rows past their completion date pass through Ongoing, so each step is a declared edge.
+        'Ongoing': Internship.objects.filter(status='Pending', starting_date__lte=today),
+        'Completed': Internship.objects.filter(status='Ongoing', completion_date__lte=today),
+    }
+    return {
+        target: transition(
+            Internship, 'status', queryset.values_list('pk', flat=True), target,
+            note="reconciled from dates", batch_size=batch_size,
+        )
+        for target, queryset in due.items()
+    }
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
+import tempfile
 from dotenv import load_dotenv
 from urllib.parse import urlparse
 
@@ -56,6 +57,7 @@ INSTALLED_APPS = [
     'main',
     'rest_framework',
     'corsheaders',
+    'rest_framework_simplejwt.token_blacklist',
 ]
 
 
@@ -67,17 +69,38 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Blacklist lookups are remembered per process for this many seconds.
+JWT_BLACKLIST_CACHE_TTL = 30
+JWT_BLACKLIST_CACHE_SIZE = 10000
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Trusts the token's claims; the user row is only loaded when a view needs it.
+        'api.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson for JSON; MessagePack for clients that ask for it. See api/renderers.py
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.renderers.ORJSONParser',
+        'api.renderers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # The platform router appends the client address to X-Forwarded-For; 0 trusts REMOTE_ADDR only.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
 }
 
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover the rest of the stack; see api/metrics.py
+    'api.metrics.MetricsMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     
     'django.middleware.security.SecurityMiddleware',
@@ -110,6 +133,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'src.wsgi.application'
+ASGI_APPLICATION = 'src.asgi.application'
+
+# Route the dashboard, profile and timetable endpoints to their async views.
+# Only worth it under ASGI (the `asgi` process in the Procfile).
+API_ASYNC_VIEWS = os.getenv('API_ASYNC_VIEWS', 'False') == 'True'
 
 
 # Database
@@ -122,20 +150,168 @@ from urllib.parse import urlparse
 
 load_dotenv()
 
-# Replace the DATABASES section of your settings.py with this
-tmpPostgres = urlparse(os.getenv("DATABASE_URL"))
+# Postgres when DATABASE_URL is set (tests then run against it too),
+# otherwise a local SQLite file for development.
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+if DATABASE_URL:
+    tmpPostgres = urlparse(DATABASE_URL)
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': tmpPostgres.path.replace('/', ''),
+            'USER': tmpPostgres.username,
+            'PASSWORD': tmpPostgres.password,
+            'HOST': tmpPostgres.hostname,
+            'PORT': tmpPostgres.port or 5432,
+            # Check a connection before handing it out, so one the server
+            # dropped is replaced instead of failing the request.
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': tmpPostgres.path.replace('/', ''),
-        'USER': tmpPostgres.username,
-        'PASSWORD': tmpPostgres.password,
-        'HOST': tmpPostgres.hostname,
-        'PORT': 5432,
+    if os.getenv('DB_POOL', 'True') == 'True':
+        # psycopg 3 pool. Every worker process opens its own pool lazily on
+        # first use (after the fork), so don't run gunicorn with --preload.
+        # Keep max_size at least the worker's thread count.
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 8)),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),  # seconds to wait for a free connection
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+            'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('CONN_MAX_AGE', 60))
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
     }
+
+
+# Caches
+# `default` is per-process; `shared` is visible to every worker and holds the
+# catalogue version counters, shared throttle buckets and the staff statistics.
+# It defaults to a directory every worker on this host reads, never to
+# LocMemCache, which would give each worker its own copy. Point it at
+# Redis/Memcached when workers run on more than one host, e.g.
+# SHARED_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'quantum-stack-local',
+    },
+    'shared': {
+        'BACKEND': os.getenv('SHARED_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('SHARED_CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'quantum-stack-shared')),
+    },
 }
 
+CATALOGUE_CACHE_TIMEOUT = int(os.getenv('CATALOGUE_CACHE_TIMEOUT', 60 * 60 * 24))
+
+
+# Throttling
+# Token buckets for the endpoints that accept anonymous writes; see api/throttling.py.
+# 'local' keeps buckets per process, 'shared' keeps them in CACHES['shared'] for all workers.
+
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', 'True') == 'True'
+THROTTLE_BACKEND = os.getenv('THROTTLE_BACKEND', 'local')
+THROTTLE_LOCAL_MAX_KEYS = 100_000
+THROTTLE_RULES = {
+    'register': {'ip': '10/hour', 'email': '3/hour'},
+    'application': {'ip': '10/hour', 'email': '3/hour'},
+    'project-request': {'ip': '20/hour', 'email': '5/hour'},
+}
+
+
+# Metrics
+# Exposed at /metrics in the Prometheus format; see api/metrics.py.
+# Scrapers send `Authorization: Bearer $METRICS_TOKEN`; with no token set, only DEBUG serves them.
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', str(DEBUG)) == 'True'
+
+
+# Email
+# Sent by `python manage.py process_outbox`, never inside a request.
+
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'False') == 'True'
+DEFAULT_FROM_EMAIL = "noreply@quantumstack.com"
+
+APPLICATION_FORM_URL = os.getenv('APPLICATION_FORM_URL', 'https://quantum-stack.vercel.app/apply')
+
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 6
+OUTBOX_BACKOFF_SECONDS = 30  # doubles after every failed attempt
+OUTBOX_MAX_BACKOFF_SECONDS = 60 * 60
+OUTBOX_LEASE_SECONDS = 5 * 60
+
+# process_media: longest edge in pixels of each rendition, stored as JPEG and WebP.
+MEDIA_RENDITIONS = {
+    'thumb': 160,
+    'small': 480,
+    'large': 1280,
+}
+MEDIA_POSTER_OFFSET_SECONDS = 1.0  # where the video poster frame is taken
+MEDIA_WORKERS = int(os.getenv('MEDIA_WORKERS', 2))
+MEDIA_JOB_BATCH_SIZE = 10
+MEDIA_JOB_MAX_ATTEMPTS = 3
+MEDIA_JOB_LEASE_SECONDS = 10 * 60
+
+# Upcoming sessions look back this far for sessions already in progress, so
+# Timetable.clean() caps session length at the same value.
+TIMETABLE_MAX_SESSION_LENGTH = timedelta(hours=12)
+UPCOMING_SESSIONS_DEFAULT_WINDOW = timedelta(days=7)
+UPCOMING_SESSIONS_MAX_WINDOW = timedelta(days=92)
+UPCOMING_SESSIONS_MAX_LIMIT = 200
+# iCalendar feeds include sessions that ended up to this many days ago.
+CALENDAR_HISTORY_DAYS = 30
+
+# Bulk status transitions (main/transitions.py): rows per guarded UPDATE, and
+# the most ids one request to the transitions endpoint may move.
+TRANSITION_BATCH_SIZE = int(os.getenv('TRANSITION_BATCH_SIZE', 1000))
+TRANSITION_MAX_IDS = 10000
+
+# Staff statistics (api/stats.py) are read from counters kept on write and
+# cached this many seconds; trends cover at most STATS_MAX_DAYS.
+STATS_CACHE_TIMEOUT = int(os.getenv('STATS_CACHE_TIMEOUT', 30))
+STATS_MAX_DAYS = 366
+
+# Admin changelists: unfiltered tables at least this large (by pg_class.reltuples)
+# show an estimated count instead of running COUNT(*); related-object filters
+# list at most ADMIN_FILTER_MAX_CHOICES objects.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv('ADMIN_ESTIMATED_COUNT_THRESHOLD', 100_000))
+ADMIN_FILTER_MAX_CHOICES = 50
+
+
+# Argon2id with the OWASP minimum costs by default; PBKDF2 hashes are
+# upgraded the next time their owner logs in.
+PASSWORD_HASHERS = [
+    'main.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', 19456))  # KiB
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', 1))
+
+# Hashes running at once per process, and how long a request waits for a slot.
+PASSWORD_HASHING_THREADS = int(os.getenv('PASSWORD_HASHING_THREADS', 4))
+PASSWORD_HASHING_TIMEOUT = float(os.getenv('PASSWORD_HASHING_TIMEOUT', 10))
+
+AUTHENTICATION_BACKENDS = ['api.authentication.PooledHashingBackend']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -175,6 +351,19 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# When set (e.g. /protected-media/), material downloads are handed to nginx
+# with X-Accel-Redirect: <prefix><file name>, after the enrollment check.
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+
+# Resumable admin uploads are assembled here, on the same filesystem as
+# MEDIA_ROOT so finished files are moved into place rather than copied.
+CHUNKED_UPLOAD_DIR = os.path.join(MEDIA_ROOT, 'chunked_uploads')
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_SIZE = 4 * 1024 * 1024 * 1024
+# Uploads no chunk has touched for this long are removed, with their part
+# files, by `manage.py expire_uploads`.
+CHUNKED_UPLOAD_EXPIRY_SECONDS = 24 * 60 * 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 